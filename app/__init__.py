@@ -7,8 +7,10 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 import os
 
-# 初始化数据库扩展
-db = SQLAlchemy()
+from app.utils.sqlite_tuning import RoutingSession
+
+# 初始化数据库扩展（会话按配置在只读引擎和写引擎之间路由）
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 
 def create_app(config_name=None):
@@ -30,8 +32,18 @@ def create_app(config_name=None):
     config_name = config_name or os.environ.get('FLASK_ENV', 'development')
     app.config.from_object(config[config_name])
     
+    # 使用 orjson 加速 JSON 序列化（未安装时保持默认实现）
+    from app.utils.json_provider import OrjsonProvider
+    if OrjsonProvider.is_available():
+        app.json = OrjsonProvider(app)
+    
     # 初始化扩展
     db.init_app(app)
+    
+    # SQLite 连接调优及读写分离
+    from app.utils.sqlite_tuning import init_sqlite
+    with app.app_context():
+        init_sqlite(app, db)
     CORS(app)  # 开发阶段允许跨域
     
     # 注册蓝图
@@ -41,8 +53,71 @@ def create_app(config_name=None):
     app.register_blueprint(main_bp)
     app.register_blueprint(api_bp, url_prefix='/api')
     
-    # 创建数据库表
-    with app.app_context():
-        db.create_all()
+    # 初始化查询缓存
+    from app.services.account_service import account_cache
+    account_cache.configure(
+        enabled=app.config['QUERY_CACHE_ENABLED'],
+        max_entries=app.config['QUERY_CACHE_MAX_ENTRIES'],
+        max_rows=app.config['QUERY_CACHE_MAX_ROWS'],
+        ttl=app.config['QUERY_CACHE_TTL']
+    )
+    
+    # 位于可信反向代理之后时由 ProxyFix 还原客户端 IP（限流和登录封禁都按 remote_addr 计）
+    if app.config['TRUSTED_PROXY_COUNT']:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXY_COUNT'])
+    
+    # 初始化 API 限流
+    from app.utils.rate_limiter import rate_limiter
+    rate_limiter.configure(
+        app.config['RATE_LIMITS'],
+        max_clients=app.config['RATE_LIMIT_MAX_CLIENTS'],
+        enabled=app.config['RATE_LIMIT_ENABLED']
+    )
+    
+    # 注册命令行工具
+    from app.cli import register_commands
+    register_commands(app)
+    
+    # 检查数据库结构版本（落后时执行轻量迁移，耗时迁移需运行 flask migrate）
+    from app.migrations import init_schema
+    init_schema(app)
+    
+    # 以下服务只读取配置，不访问数据库或文件，也不启动线程；
+    # 恢复日志、恢复导入任务等后台工作由服务进程调用 start_services 完成
+    
+    # 登录失败记录存储（SQLite 文件在第一次使用时创建）
+    from app.services.auth_service import AuthService
+    AuthService.init_app(app)
+    
+    # 历史记录写入
+    from app.services.history_writer import history_writer
+    history_writer.init_app(app)
+    
+    # 绑定 2FA 验证码推送（有订阅时才启动广播线程）
+    from app.services.code_stream_service import code_broadcaster
+    code_broadcaster.init_app(app)
+    
+    # 后台导入任务（线程池在第一次提交任务时创建）
+    from app.services.import_job_service import ImportJobService
+    ImportJobService.init_app(app)
     
     return app
+
+
+def start_services(app):
+    """
+    启动服务进程的后台工作（只由服务入口调用，flask migrate 等命令行工具不会执行）
+    
+    - 写后缓冲模式下恢复遗留的历史记录日志段并启动批量写入线程
+    - 重新排队超时的导入任务，并把排队中的任务提交到线程池
+    
+    Args:
+        app: create_app 创建的应用实例
+    """
+    from app.services.history_writer import history_writer
+    from app.services.import_job_service import ImportJobService
+    
+    history_writer.start()
+    with app.app_context():
+        ImportJobService.resume_pending()
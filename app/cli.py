@@ -0,0 +1,84 @@
+"""
+命令行工具模块
+注册 flask 命令行子命令（运维用）
+"""
+import click
+
+from app import db
+
+
+def register_commands(app):
+    """
+    注册命令行子命令
+
+    Args:
+        app: Flask 应用实例
+    """
+
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index_command():
+        """从 accounts 表全量重建账号全文索引"""
+        from app.utils.search_index import rebuild_search_index
+
+        if rebuild_search_index(db.engine):
+            click.echo('账号全文索引重建完成')
+        else:
+            click.echo('当前数据库不支持 FTS5 全文索引，已跳过')
+
+    @app.cli.command('rebuild-stats')
+    def rebuild_stats_command():
+        """根据账号及历史记录全量重建库存统计"""
+        from app.services.stats_service import StatsService
+
+        StatsService.rebuild()
+        click.echo('库存统计重建完成')
+
+    @app.cli.command('purge-orphan-history')
+    def purge_orphan_history_command():
+        """删除账号已不存在的历史记录"""
+        from app.services.account_service import AccountService
+
+        deleted = AccountService.purge_orphan_history()
+        click.echo(f'已删除 {deleted} 条孤立历史记录')
+
+    @app.cli.command('archive-history')
+    @click.option('--retain-per-field', type=int, default=None,
+                  help='每个账号每个字段保留的最近记录数（默认读取 HISTORY_RETAIN_PER_FIELD）')
+    @click.option('--retain-days', type=int, default=None,
+                  help='保留最近多少天内的全部记录（默认读取 HISTORY_RETAIN_DAYS）')
+    def archive_history_command(retain_per_field, retain_days):
+        """将超出保留策略的历史记录移入归档文件"""
+        from app.services.history_archive_service import HistoryArchiveService
+
+        if retain_per_field is None:
+            retain_per_field = app.config['HISTORY_RETAIN_PER_FIELD']
+        if retain_days is None:
+            retain_days = app.config['HISTORY_RETAIN_DAYS']
+        try:
+            result = HistoryArchiveService.archive(retain_per_field, retain_days)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        click.echo(f"已归档 {result['archived']} 条历史记录，清理 {result['purged']} 条孤立归档记录")
+
+    @app.cli.command('migrate')
+    @click.option('--status', is_flag=True, help='只显示当前版本及尚未执行的迁移')
+    def migrate_command(status):
+        """执行尚未执行的数据库迁移（包括建索引等耗时迁移）"""
+        from app.migrations import (LATEST_VERSION, current_version, pending_migrations,
+                                    refresh_capabilities, upgrade)
+
+        version = current_version()
+        pending = pending_migrations(version)
+        click.echo(f'当前结构版本 {version}，最新版本 {LATEST_VERSION}')
+        if status:
+            for step in pending:
+                click.echo(f"  待执行 {step.version}: {step.description}{'（耗时）' if step.heavy else ''}")
+            return
+        if not pending:
+            click.echo('数据库结构已是最新')
+            return
+
+        applied = upgrade(on_step=lambda step: click.echo(f'执行迁移 {step.version}: {step.description}'))
+        if applied:
+            refresh_capabilities(app)
+        click.echo(f'迁移完成，当前结构版本 {current_version()}')
@@ -16,6 +16,82 @@ class Config:
     # 数据库配置
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'instance', 'accounts.db')
+    
+    # SQLite 调优配置（仅对文件数据库生效）
+    SQLITE_PRAGMAS = {
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),  # 读写互不阻塞
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),  # WAL 下崩溃安全，减少 fsync
+        'cache_size': -int(os.environ.get('SQLITE_CACHE_SIZE_KB', 65536)),  # 每个连接的页缓存（负数单位为 KB）
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 268435456)),  # 内存映射读取的字节数
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),  # 等待锁的毫秒数
+        'foreign_keys': 'ON' if os.environ.get('SQLITE_FOREIGN_KEYS', '1') == '1' else 'OFF',
+        'temp_store': 'MEMORY'
+    }
+    # 查询使用独立只读连接、写事务使用 BEGIN IMMEDIATE
+    SQLITE_SEPARATE_READS = os.environ.get('SQLITE_SEPARATE_READS', '1') == '1'
+    
+    # 连接池配置（读、写引擎各自一个连接池）
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),  # 等待空闲连接的秒数
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', -1))  # 连接最长使用秒数（-1 不回收）
+    }
+    
+    # 查询结果缓存配置
+    QUERY_CACHE_ENABLED = os.environ.get('QUERY_CACHE_ENABLED', '1') == '1'
+    QUERY_CACHE_MAX_ENTRIES = int(os.environ.get('QUERY_CACHE_MAX_ENTRIES', 256))  # 最大条目数
+    QUERY_CACHE_MAX_ROWS = int(os.environ.get('QUERY_CACHE_MAX_ROWS', 200000))  # 缓存的总行数上限
+    QUERY_CACHE_TTL = int(os.environ.get('QUERY_CACHE_TTL', 30))  # 条目有效期（秒）
+    
+    # 后台导入任务配置
+    IMPORT_JOB_DIR = os.environ.get('IMPORT_JOB_DIR') or \
+        os.path.join(basedir, 'instance', 'import_jobs')  # 导入数据暂存目录
+    IMPORT_WORKERS = int(os.environ.get('IMPORT_WORKERS', 2))  # 导入线程数
+    IMPORT_JOB_CHUNK_SIZE = int(os.environ.get('IMPORT_JOB_CHUNK_SIZE', 500))  # 每块账号数量
+    IMPORT_MAX_DECOMPRESSED_BYTES = int(os.environ.get('IMPORT_MAX_DECOMPRESSED_BYTES', 512 * 1024 * 1024))  # gzip 上传解压后的上限
+    
+    # 历史记录写后缓冲配置
+    HISTORY_WRITE_BEHIND = os.environ.get('HISTORY_WRITE_BEHIND', '0') == '1'  # 是否开启
+    HISTORY_FLUSH_INTERVAL_MS = int(os.environ.get('HISTORY_FLUSH_INTERVAL_MS', 200))  # 批量写入间隔（毫秒）
+    HISTORY_FLUSH_BATCH = int(os.environ.get('HISTORY_FLUSH_BATCH', 500))  # 积累多少条立即写入
+    HISTORY_QUEUE_MAX = int(os.environ.get('HISTORY_QUEUE_MAX', 10000))  # 缓冲区上限，超出时直接写入
+    HISTORY_JOURNAL_DIR = os.environ.get('HISTORY_JOURNAL_DIR') or \
+        os.path.join(basedir, 'instance', 'history_journal')  # 未写入记录的日志目录
+    
+    # 历史记录保留与归档配置（超出保留条数且早于保留天数的记录移入归档文件）
+    HISTORY_RETAIN_PER_FIELD = int(os.environ.get('HISTORY_RETAIN_PER_FIELD', 20))  # 每个字段保留的最近条数
+    HISTORY_RETAIN_DAYS = int(os.environ.get('HISTORY_RETAIN_DAYS', 90))  # 保留最近多少天内的全部记录
+    HISTORY_ARCHIVE_PATH = os.environ.get('HISTORY_ARCHIVE_PATH') or \
+        os.path.join(basedir, 'instance', 'history_archive.db')  # 归档 SQLite 文件
+    
+    # 登录令牌配置（HMAC 签名，校验无需查询数据库）
+    AUTH_REQUIRED = os.environ.get('AUTH_REQUIRED', '1') == '1'  # API 是否需要登录
+    AUTH_TOKEN_TTL = int(os.environ.get('AUTH_TOKEN_TTL', 7 * 24 * 60 * 60))  # 令牌有效期（秒）
+    
+    # 登录失败记录配置（sqlite 为多进程共享的独立文件，memory 为进程内存储）
+    LOGIN_ATTEMPT_STORE = os.environ.get('LOGIN_ATTEMPT_STORE', 'sqlite')
+    LOGIN_ATTEMPT_DB = os.environ.get('LOGIN_ATTEMPT_DB') or \
+        os.path.join(basedir, 'instance', 'login_attempts.db')
+    LOGIN_ATTEMPT_MAX_ENTRIES = int(os.environ.get('LOGIN_ATTEMPT_MAX_ENTRIES', 100000))  # 记录条数上限
+    
+    # 前置的可信反向代理层数：为 0 时直接对外服务，忽略可被伪造的 X-Forwarded-For；
+    # 部署在 nginx 等代理之后时设为代理层数，按该层数从 X-Forwarded-For 取客户端 IP
+    TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', 0))
+    
+    # API 限流配置（按客户端 IP 的令牌桶，预算格式为 "每秒请求数/突发上限"）
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+    RATE_LIMITS = {
+        'default': os.environ.get('RATE_LIMIT_DEFAULT', '10/50'),  # 未单独指定的接口
+        'totp': os.environ.get('RATE_LIMIT_TOTP', '2/20'),  # 获取 2FA 验证码
+        'stream': os.environ.get('RATE_LIMIT_STREAM', '0.2/5'),  # 建立验证码推送连接
+        'heavy': os.environ.get('RATE_LIMIT_HEAVY', '0.2/5'),  # 导入、导出及批量操作
+        'auth': os.environ.get('RATE_LIMIT_AUTH', '0.2/5')  # 登录
+    }
+    RATE_LIMIT_MAX_CLIENTS = int(os.environ.get('RATE_LIMIT_MAX_CLIENTS', 10000))  # 令牌桶数量上限
+    
+    # 2FA 验证码推送配置
+    CODE_STREAM_KEEPALIVE = int(os.environ.get('CODE_STREAM_KEEPALIVE', 15))  # 心跳间隔（秒）
 
 
 class DevelopmentConfig(Config):
@@ -26,12 +102,20 @@ class DevelopmentConfig(Config):
 class ProductionConfig(Config):
     """生产环境配置"""
     DEBUG = False
+    SQLALCHEMY_ENGINE_OPTIONS = dict(
+        Config.SQLALCHEMY_ENGINE_OPTIONS,
+        pool_size=int(os.environ.get('DB_POOL_SIZE', 10))
+    )
     
 
 class TestingConfig(Config):
     """测试环境配置"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_ENGINE_OPTIONS = {}  # 内存数据库使用 StaticPool，不支持连接池参数
+    IMPORT_WORKERS = 1
+    HISTORY_ARCHIVE_PATH = None
+    LOGIN_ATTEMPT_STORE = 'memory'
 
 
 # 配置映射
@@ -0,0 +1,174 @@
+"""
+数据库迁移模块
+schema_version 表记录当前数据库结构版本，迁移按版本号顺序执行，每步单独提交。
+
+应用启动时只做一次版本检查：
+- 版本已是最新：不做任何修改
+- 全新数据库：执行全部迁移（空表上建索引很快）
+- 已有数据库落后：只执行排在第一个耗时迁移之前的轻量迁移，其余提示运行 flask migrate
+"""
+from sqlalchemy import Column, Integer, MetaData, Table, CheckConstraint
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import OperationalError
+
+from app import db
+from app.migrations.versions import MIGRATIONS, SOLD_STATUS_BACKFILL_VERSION, ARCHIVE_MARKS_VERSION
+from app.utils.search_index import FTS_TABLE, search_index_exists
+from app.utils.sqlite_tuning import READ_ENGINE_KEY
+
+# 最新的结构版本号
+LATEST_VERSION = MIGRATIONS[-1].version if MIGRATIONS else 0
+
+# 结构版本表（只有一行）
+version_metadata = MetaData()
+schema_version = Table(
+    'schema_version', version_metadata,
+    Column('id', Integer, primary_key=True, autoincrement=False),
+    Column('version', Integer, nullable=False),
+    CheckConstraint('id = 1')
+)
+
+
+def _read_version(conn):
+    """读取结构版本号（版本表不存在时为 0）"""
+    try:
+        version = conn.execute(
+            db.select(schema_version.c.version).where(schema_version.c.id == 1)
+        ).scalar()
+    except OperationalError:
+        return 0
+    return version or 0
+
+
+def _write_version(conn, version):
+    """写入结构版本号"""
+    schema_version.create(conn, checkfirst=True)
+    stmt = sqlite_insert(schema_version).values(id=1, version=version)
+    conn.execute(stmt.on_conflict_do_update(
+        index_elements=[schema_version.c.id], set_={'version': version}
+    ))
+
+
+def current_version():
+    """
+    当前数据库的结构版本号
+
+    Returns:
+        版本号；从未执行过迁移的数据库为 0
+    """
+    version = _read_version(db.session.connection())
+    db.session.rollback()
+    return version
+
+
+def pending_migrations(version=None):
+    """
+    尚未执行的迁移
+
+    Args:
+        version: 当前版本号（缺省时查询数据库）
+
+    Returns:
+        Migration 列表
+    """
+    if version is None:
+        version = current_version()
+    return [step for step in MIGRATIONS if step.version > version]
+
+
+def upgrade(include_heavy=True, on_step=None):
+    """
+    按顺序执行尚未执行的迁移
+
+    每一步开始前在写事务中重新读取版本号，其他进程已执行的步骤会被跳过。
+
+    Args:
+        include_heavy: 是否执行耗时迁移；为 False 时遇到第一个耗时迁移即停止
+        on_step: 每步执行前的回调，参数为 Migration
+
+    Returns:
+        本次执行的 Migration 列表
+    """
+    applied = []
+    for step in MIGRATIONS:
+        if _read_version(db.session.connection()) >= step.version:
+            db.session.rollback()
+            continue
+        if step.heavy and not include_heavy:
+            db.session.rollback()
+            break
+        if on_step:
+            on_step(step)
+        try:
+            step.apply()
+            _write_version(db.session.connection(), step.version)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        applied.append(step)
+    return applied
+
+
+def _probe(conn):
+    """
+    一次查询读取结构版本号及全文索引是否存在
+
+    Returns:
+        (版本号, 全文索引是否存在)；版本表不存在时返回 None
+    """
+    if conn.dialect.name != 'sqlite':
+        return _read_version(conn), False
+    try:
+        row = conn.exec_driver_sql(
+            'SELECT version, EXISTS(SELECT 1 FROM sqlite_master '
+            f"WHERE type='table' AND name='{FTS_TABLE}') "
+            'FROM schema_version WHERE id = 1'
+        ).first()
+    except OperationalError:
+        return None
+    return (row[0], bool(row[1])) if row else None
+
+
+def _set_capabilities(app, version, fts):
+    """记录依赖迁移的查询能力：全文索引是否可用、空的出售状态是否已补全、归档标记是否可用"""
+    app.extensions['account_fts'] = fts
+    app.extensions['sold_status_backfilled'] = version >= SOLD_STATUS_BACKFILL_VERSION
+    app.extensions['archive_marks'] = version >= ARCHIVE_MARKS_VERSION
+
+
+def refresh_capabilities(app):
+    """
+    重新检测依赖迁移的查询能力（执行迁移后调用，需在应用上下文中）
+
+    Args:
+        app: Flask 应用实例
+    """
+    conn = db.session.connection()
+    _set_capabilities(app, _read_version(conn), search_index_exists(conn))
+    db.session.rollback()
+
+
+def init_schema(app):
+    """
+    应用启动时检查结构版本，按需执行迁移，并记录依赖迁移的查询能力
+
+    Args:
+        app: Flask 应用实例
+    """
+    with app.app_context():
+        with (app.extensions.get(READ_ENGINE_KEY) or db.engine).connect() as conn:
+            state = _probe(conn)
+        if state is not None and state[0] >= LATEST_VERSION:
+            _set_capabilities(app, *state)
+            return
+
+        fresh = state is None and not db.inspect(db.engine).has_table('accounts')
+        upgrade(include_heavy=fresh)
+        pending = pending_migrations()
+        if pending:
+            app.logger.warning(
+                '数据库有 %d 个迁移尚未执行（%s），请运行 flask --app run migrate',
+                len(pending), '、'.join(step.description for step in pending)
+            )
+        refresh_capabilities(app)
@@ -0,0 +1,135 @@
+"""
+数据库迁移版本定义
+按版本号顺序登记每一步迁移。每一步都必须可重复执行（已执行过的部分跳过），
+多个进程同时启动或中途中断后重新执行都不会出错。
+
+heavy 标记的迁移会扫描大表（重建统计、建索引、构建全文索引），应用启动时不会自动执行，
+需运行 flask migrate 显式完成
+"""
+from app import db
+from app.models import account, account_history, data_version, import_job, inventory_stats  # noqa: F401  注册全部模型
+
+# 已登记的迁移（按版本号排序）
+MIGRATIONS = []
+
+
+class Migration:
+    """单个迁移步骤"""
+
+    def __init__(self, version, description, apply, heavy=False):
+        self.version = version
+        self.description = description
+        self.apply = apply
+        self.heavy = heavy
+
+    def __repr__(self):
+        return f'<Migration {self.version} {self.description}>'
+
+
+def migration(version, description, heavy=False):
+    """
+    登记迁移步骤的装饰器
+
+    被装饰的函数在 db.session 的事务中执行，由迁移执行器负责提交。
+
+    Args:
+        version: 版本号（必须大于已登记的所有版本）
+        description: 迁移说明
+        heavy: 是否为需要显式执行的耗时迁移
+    """
+    def decorator(func):
+        if MIGRATIONS and version <= MIGRATIONS[-1].version:
+            raise ValueError(f'迁移版本号必须递增: {version}')
+        MIGRATIONS.append(Migration(version, description, func, heavy))
+        return func
+    return decorator
+
+
+@migration(1, '创建数据表')
+def create_tables():
+    """创建尚不存在的数据表（已有的表不做修改）"""
+    db.metadata.create_all(db.session.connection())
+
+
+@migration(2, '初始化库存统计', heavy=True)
+def init_stats():
+    """
+    根据现有账号全量构建计数器
+
+    迁移执行前的写操作已经增量累加过计数器，计数器存在也不代表统计完整，
+    因此总是全量重建。
+    """
+    from app.services.stats_service import StatsService
+
+    StatsService.rebuild()
+
+
+@migration(3, '补建声明的索引并删除旧版历史记录索引', heavy=True)
+def create_indexes():
+    """
+    为已存在的表补建模型中声明的索引
+
+    旧版 migrate_history.py 创建的单列索引已被 account_history 的组合索引覆盖，一并删除。
+    """
+    conn = db.session.connection()
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+    for name in ('idx_account_history_account_id', 'idx_account_history_changed_at'):
+        conn.exec_driver_sql(f'DROP INDEX IF EXISTS {name}')
+
+
+@migration(4, '创建账号全文索引', heavy=True)
+def create_search_index():
+    """创建 FTS5 全文索引及同步触发器，并从 accounts 表全量构建"""
+    from app.utils.search_index import create_search_index as create
+
+    create(db.session.connection())
+
+
+@migration(5, '创建账号筛选排序组合索引并补全空的出售状态', heavy=True)
+def create_account_indexes():
+    """
+    为 accounts 创建 (created_at, id)、(sold_status, created_at, id)、(status, created_at, id) 索引
+
+    旧数据中为空的出售状态统一为 unsold，未售出筛选只需等值条件即可使用组合索引。
+    """
+    from app.models.account import Account
+    from app.models.data_version import DataVersion
+
+    conn = db.session.connection()
+    for index in Account.__table__.indexes:
+        index.create(conn, checkfirst=True)
+    updated = conn.execute(
+        db.update(Account.__table__)
+        .where(Account.__table__.c.sold_status.is_(None))
+        .values(sold_status='unsold')
+    ).rowcount
+    if updated:
+        DataVersion.bump()
+
+
+@migration(6, '记录账号归档历史的最新时间', heavy=True)
+def create_archive_marks():
+    """
+    创建 archived_history_marks 表并按已有的归档文件补全
+
+    执行前读取历史时每页都会查询归档文件，执行后只在主库记录不足以确定当页结果时查询。
+    """
+    from app.models.account_history import ArchivedHistoryMark
+    from app.services.history_archive_service import HistoryArchiveService
+
+    conn = db.session.connection()
+    marks = ArchivedHistoryMark.__table__
+    marks.create(conn, checkfirst=True)
+    conn.execute(db.delete(marks))
+    newest = HistoryArchiveService.newest_per_account()
+    if newest:
+        conn.execute(db.insert(marks), newest)
+
+
+# 执行到该版本后出售状态不再为空，未售出筛选无需 IS NULL 条件
+SOLD_STATUS_BACKFILL_VERSION = 5
+
+# 执行到该版本后 archived_history_marks 与归档文件一致，读取历史时可按需跳过归档文件
+ARCHIVE_MARKS_VERSION = 6
@@ -23,6 +23,13 @@ class Account(db.Model):
         updated_at: 更新时间
     """
     __tablename__ = 'accounts'
+    __table_args__ = (
+        # 列表、分页和导出按 (created_at, id) 排序
+        db.Index('ix_accounts_created', 'created_at', 'id'),
+        # 按出售状态 / 账号状态筛选后再按创建时间排序
+        db.Index('ix_accounts_sold_created', 'sold_status', 'created_at', 'id'),
+        db.Index('ix_accounts_status_created', 'status', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     email = db.Column(db.String(255), unique=True, nullable=False, index=True)
@@ -54,5 +61,31 @@ class Account(db.Model):
             'createdAt': self.created_at.strftime('%Y-%m-%d') if self.created_at else ''
         }
     
+    @classmethod
+    def serialized_columns(cls):
+        """
+        与 to_dict 输出一致的列表达式（按 to_dict 的键顺序命名）
+        
+        空值补齐和日期格式化都在 SQL 中完成，查询结果可直接转为字典，
+        无需构造 ORM 对象，也不必逐行调用 strftime。
+        
+        Returns:
+            带标签的列表达式列表
+        """
+        return [
+            cls.id.label('id'),
+            cls.email.label('email'),
+            cls.password.label('password'),
+            db.func.coalesce(cls.recovery, '').label('recovery'),
+            db.func.coalesce(cls.secret, '').label('secret'),
+            db.func.coalesce(cls.remark, '').label('remark'),
+            cls.status.label('status'),
+            db.func.coalesce(cls.sold_status, 'unsold').label('soldStatus'),
+            # 日期以 'YYYY-MM-DD HH:MM:SS[.ffffff]' 文本存储，截取日期部分
+            db.func.coalesce(
+                db.func.substr(db.cast(cls.created_at, db.String), 1, 10), ''
+            ).label('createdAt')
+        ]
+    
     def __repr__(self):
         return f'<Account {self.email}>'
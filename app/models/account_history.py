@@ -9,6 +9,14 @@ from datetime import datetime
 class AccountHistory(db.Model):
     """账号修改历史记录"""
     __tablename__ = 'account_history'
+    __table_args__ = (
+        # 单账号历史按时间倒序分页（索引末尾隐含 id，可直接按 changed_at, id 排序）
+        db.Index('ix_account_history_account_changed', 'account_id', 'changed_at'),
+        # 全局审计按字段和时间范围查询
+        db.Index('ix_account_history_field_changed', 'field_name', 'changed_at'),
+        # 全局审计不限字段时按时间倒序分页
+        db.Index('ix_account_history_changed', 'changed_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     account_id = db.Column(db.Integer, db.ForeignKey('accounts.id'), nullable=False)
@@ -31,6 +39,18 @@ class AccountHistory(db.Model):
             'changedAt': self.changed_at.strftime('%Y-%m-%d %H:%M:%S') if self.changed_at else None
         }
     
+    @classmethod
+    def serialized_columns(cls):
+        """与 to_dict 输出一致的列表达式，时间格式化在 SQL 中完成"""
+        return [
+            cls.id.label('id'),
+            cls.account_id.label('accountId'),
+            cls.field_name.label('fieldName'),
+            cls.old_value.label('oldValue'),
+            cls.new_value.label('newValue'),
+            db.func.substr(db.cast(cls.changed_at, db.String), 1, 19).label('changedAt')
+        ]
+    
     @staticmethod
     def get_field_display_name(field_name):
         """获取字段的中文显示名称"""
@@ -40,3 +60,16 @@ class AccountHistory(db.Model):
             'recovery': '恢复邮箱'
         }
         return names.get(field_name, field_name)
+
+
+class ArchivedHistoryMark(db.Model):
+    """
+    账号已归档历史记录中最新的修改时间
+    
+    由归档任务维护。分页读取历史时，主库当页记录都比它新即可不读取归档文件；
+    没有记录的账号没有归档历史。
+    """
+    __tablename__ = 'archived_history_marks'
+    
+    account_id = db.Column(db.Integer, primary_key=True)
+    newest_changed_at = db.Column(db.DateTime, nullable=False)  # 已归档记录中最新的修改时间
@@ -0,0 +1,51 @@
+"""
+数据版本号模型
+每次写操作递增版本号，用于生成 ETag 和判断缓存是否过期
+"""
+from app import db
+
+
+class DataVersion(db.Model):
+    """
+    数据版本号
+
+    Attributes:
+        name: 数据范围名称（如 accounts，涵盖账号及其历史记录）
+        version: 当前版本号，每次写入递增
+    """
+    __tablename__ = 'data_versions'
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    @staticmethod
+    def bump(name='accounts'):
+        """
+        在当前事务中递增版本号（随业务写操作一起提交）
+
+        Args:
+            name: 数据范围名称
+        """
+        db.session.execute(
+            db.text(
+                'INSERT INTO data_versions (name, version) VALUES (:name, 1) '
+                'ON CONFLICT(name) DO UPDATE SET version = version + 1'
+            ),
+            {'name': name}
+        )
+
+    @staticmethod
+    def current(name='accounts'):
+        """
+        读取当前版本号（单行主键查询，不加载 ORM 对象）
+
+        Args:
+            name: 数据范围名称
+
+        Returns:
+            版本号，从未写入时为 0
+        """
+        version = db.session.execute(
+            db.select(DataVersion.version).where(DataVersion.name == name)
+        ).scalar()
+        return version or 0
@@ -0,0 +1,95 @@
+"""
+导入任务模型
+记录后台批量导入任务的状态和进度
+"""
+import json
+from datetime import datetime
+
+from app import db
+
+
+class ImportJob(db.Model):
+    """
+    后台导入任务
+
+    Attributes:
+        id: 任务ID（UUID）
+        status: 状态 (queued/running/completed/failed)
+        mode: 导入模式 (insert/upsert)
+        source_path: 待导入数据的暂存文件路径
+        total_rows: 暂存文件总行数
+        processed_rows: 已提交的行数（断点续传从此处继续）
+        start_offset: 本次运行开始时的已提交行数（用于计算速度）
+        success_count: 成功导入数量
+        updated_count: 更新模式下已更新的账号数量
+        unchanged_count: 更新模式下无变化的账号数量
+        failed_count: 失败数量
+        failed_emails: 失败邮箱（JSON 数组，数量有上限）
+        error: 任务失败原因
+        created_at: 创建时间
+        started_at: 本次运行开始时间
+        heartbeat_at: 最近一次提交进度的时间
+        finished_at: 结束时间
+    """
+    __tablename__ = 'import_jobs'
+
+    id = db.Column(db.String(32), primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)
+    mode = db.Column(db.String(20), nullable=False, default='insert')
+    source_path = db.Column(db.String(512), nullable=False)
+    total_rows = db.Column(db.Integer, nullable=False, default=0)
+    processed_rows = db.Column(db.Integer, nullable=False, default=0)
+    start_offset = db.Column(db.Integer, nullable=False, default=0)
+    success_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_count = db.Column(db.Integer, nullable=False, default=0)
+    unchanged_count = db.Column(db.Integer, nullable=False, default=0)
+    failed_count = db.Column(db.Integer, nullable=False, default=0)
+    failed_emails = db.Column(db.Text, nullable=False, default='[]')
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        """
+        转换为字典（包含处理速度和预计剩余时间）
+
+        Returns:
+            任务状态字典
+        """
+        rows_per_second = 0
+        if self.started_at and self.status == 'running':
+            elapsed = (datetime.utcnow() - self.started_at).total_seconds()
+            if elapsed > 0:
+                rows_per_second = (self.processed_rows - self.start_offset) / elapsed
+        elif self.started_at and self.finished_at:
+            elapsed = (self.finished_at - self.started_at).total_seconds()
+            if elapsed > 0:
+                rows_per_second = (self.processed_rows - self.start_offset) / elapsed
+
+        eta = None
+        if self.status == 'running' and rows_per_second > 0:
+            eta = int((self.total_rows - self.processed_rows) / rows_per_second)
+
+        def fmt(value):
+            return value.strftime('%Y-%m-%d %H:%M:%S') if value else None
+
+        return {
+            'id': self.id,
+            'status': self.status,
+            'mode': self.mode,
+            'totalRows': self.total_rows,
+            'processedRows': self.processed_rows,
+            'successCount': self.success_count,
+            'updatedCount': self.updated_count,
+            'unchangedCount': self.unchanged_count,
+            'failedCount': self.failed_count,
+            'failedEmails': json.loads(self.failed_emails or '[]'),
+            'rowsPerSecond': round(rows_per_second, 1),
+            'eta': eta,
+            'error': self.error,
+            'createdAt': fmt(self.created_at),
+            'startedAt': fmt(self.started_at),
+            'finishedAt': fmt(self.finished_at)
+        }
@@ -0,0 +1,43 @@
+"""
+库存统计模型
+保存增量维护的账号计数器和每日出售汇总
+"""
+from app import db
+
+
+class InventoryCounter(db.Model):
+    """
+    库存计数器
+
+    Attributes:
+        name: 计数器名称（total、status:<状态>、sold_status:<出售状态>）
+        value: 当前计数
+    """
+    __tablename__ = 'inventory_counters'
+
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+
+class DailySales(db.Model):
+    """
+    每日出售汇总（由出售状态变更历史累计）
+
+    Attributes:
+        day: 日期
+        sold: 当天标记为已售出的次数
+        unsold: 当天撤回为未售出的次数
+    """
+    __tablename__ = 'daily_sales'
+
+    day = db.Column(db.Date, primary_key=True)
+    sold = db.Column(db.Integer, nullable=False, default=0)
+    unsold = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'date': self.day.strftime('%Y-%m-%d'),
+            'sold': self.sold,
+            'unsold': self.unsold
+        }
@@ -2,18 +2,34 @@
 API 路由模块
 提供账号管理的 RESTful API
 """
-from flask import Blueprint, request, jsonify
-from app.services.account_service import AccountService
-from app.services.auth_service import AuthService
-from app.models.account_history import AccountHistory
+import math
+import time
+from datetime import datetime
+
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from app.services.account_service import (
+    AccountService, DEFAULT_PAGE_SIZE, DEFAULT_HISTORY_PAGE_SIZE, account_cache
+)
+from app.services.auth_service import AuthService, AUTH_COOKIE
+from app.services.stats_service import StatsService
+from app.services.import_job_service import ImportJobService
+from app.services.code_stream_service import code_broadcaster
+from app.services.history_writer import history_writer
+from app.utils.export import EXPORT_FORMATS, iter_export, gzip_stream
+from app.utils.etag import versioned_etag
+from app.utils.import_parser import DecompressedTooLarge, parse_line, iter_text_lines
+from app.utils.rate_limiter import rate_limiter
 
 api_bp = Blueprint('api', __name__)
 
 
 def get_client_ip():
-    """获取客户端真实 IP"""
-    if request.headers.get('X-Forwarded-For'):
-        return request.headers.get('X-Forwarded-For').split(',')[0].strip()
+    """
+    获取客户端 IP
+    
+    配置 TRUSTED_PROXY_COUNT 时 ProxyFix 已按可信代理层数从 X-Forwarded-For 还原 remote_addr；
+    未配置时该请求头可由客户端任意伪造，只使用连接的对端地址
+    """
     return request.remote_addr or '127.0.0.1'
 
 
@@ -35,20 +51,161 @@ def error_response(message='操作失败', code=400):
     }), code
 
 
+# 单独设置限流预算的端点（其余使用 default 预算）
+RATE_LIMIT_BUDGETS = {
+    'api.get_2fa_code': 'totp',
+    'api.get_2fa_codes': 'totp',
+    'api.stream_2fa_codes': 'stream',
+    'api.export_accounts': 'heavy',
+    'api.batch_import': 'heavy',
+    'api.import_accounts_text': 'heavy',
+    'api.bulk_update_accounts': 'heavy',
+    'api.bulk_delete_accounts': 'heavy',
+    'api.login': 'auth'
+}
+
+
+@api_bp.before_request
+def limit_rate():
+    """按客户端 IP 限流（先于登录校验执行，未登录的请求同样计入）"""
+    if request.method == 'OPTIONS':
+        return None
+    budget = RATE_LIMIT_BUDGETS.get(request.endpoint, 'default')
+    retry_after = rate_limiter.acquire(get_client_ip(), budget)
+    if retry_after:
+        response, code = error_response('请求过于频繁，请稍后重试', 429)
+        response.headers['Retry-After'] = str(math.ceil(retry_after))
+        return response, code
+    return None
+
+
+# 无需登录即可访问的端点
+PUBLIC_ENDPOINTS = {'api.login', 'api.check_auth'}
+
+
+def get_auth_token():
+    """从 Authorization: Bearer 请求头或登录 Cookie 中读取令牌"""
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        return header[7:].strip()
+    return request.cookies.get(AUTH_COOKIE)
+
+
+@api_bp.before_request
+def require_auth():
+    """校验登录令牌（登录及封禁检查接口除外）"""
+    if not current_app.config['AUTH_REQUIRED'] or request.method == 'OPTIONS' \
+            or request.endpoint in PUBLIC_ENDPOINTS:
+        return None
+    if not AuthService.verify_token(get_auth_token()):
+        return error_response('未登录或登录已过期', 401)
+    return None
+
+
+def get_import_mode():
+    """
+    从查询参数中读取导入模式
+    
+    Raises:
+        ValueError: 模式无效
+    """
+    mode = request.args.get('mode', 'insert')
+    if mode not in ('insert', 'upsert'):
+        raise ValueError(f'不支持的导入模式: {mode}')
+    return mode
+
+
+def get_account_filters():
+    """从查询参数中提取账号筛选条件"""
+    return {
+        'search': request.args.get('search', ''),
+        'sold_status': request.args.get('sold_status', ''),
+        'status': request.args.get('status', ''),
+        'start_date': request.args.get('start_date', ''),
+        'end_date': request.args.get('end_date', '')
+    }
+
+
 @api_bp.route('/accounts', methods=['GET'])
+@versioned_etag()
 def get_accounts():
     """
-    获取所有账号列表
+    获取账号列表
+    
+    传入 cursor 或 limit 时按 (created_at, id) 键集分页返回一页数据，
+    否则返回全部符合条件的账号。
     
     Query Params:
         search: 搜索关键词（可选）
+        sold_status: 出售状态 sold/unsold（可选）
+        status: 账号状态 pro/inactive（可选）
+        start_date: 创建日期起始 YYYY-MM-DD（可选）
+        end_date: 创建日期截止 YYYY-MM-DD，包含当天（可选）
+        cursor: 上一页返回的 nextCursor（可选）
+        limit: 每页条数（可选）
+        with_total: 为 1 时返回符合条件的总数（可选）
+    
+    Returns:
+        账号列表，或包含 items、nextCursor、total 的分页结果
+    """
+    filters = get_account_filters()
+    
+    try:
+        if 'cursor' in request.args or 'limit' in request.args:
+            limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+            page = AccountService.get_accounts_page(
+                filters,
+                cursor=request.args.get('cursor', ''),
+                limit=limit,
+                with_total=request.args.get('with_total') == '1'
+            )
+            return success_response(data=page)
+        
+        accounts = AccountService.get_all_accounts(filters)
+        return success_response(data=accounts)
+    except ValueError as e:
+        return error_response(str(e))
+
+
+@api_bp.route('/accounts/export', methods=['GET'])
+def export_accounts():
+    """
+    流式导出账号
+    
+    逐批读取数据库并边读边写响应，内存占用与导出数量无关。
+    
+    Query Params:
+        format: 导出格式 ndjson/csv/text（默认 ndjson）
+                text 为「邮箱——密码——恢复邮箱——2FA密钥」，可直接重新导入
+        gzip: 为 1 时以 gzip 压缩输出（可选）
+        其余筛选参数同 GET /accounts
     
     Returns:
-        账号列表
+        导出文件下载流
     """
-    search = request.args.get('search', '')
-    accounts = AccountService.get_all_accounts(search)
-    return success_response(data=accounts)
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return error_response(f'不支持的导出格式: {fmt}')
+    
+    try:
+        rows = AccountService.iter_accounts(get_account_filters())
+    except ValueError as e:
+        return error_response(str(e))
+    
+    content_type, extension = EXPORT_FORMATS[fmt]
+    filename = f"accounts-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{extension}"
+    
+    chunks = iter_export(rows, fmt)
+    if request.args.get('gzip') == '1':
+        chunks = gzip_stream(chunks)
+        content_type = 'application/gzip'
+        filename += '.gz'
+    
+    return Response(
+        stream_with_context(chunks),
+        mimetype=content_type,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
 
 
 @api_bp.route('/accounts', methods=['POST'])
@@ -88,11 +245,16 @@ def batch_import():
     """
     批量导入账号
     
+    Query Params:
+        async: 为 1 时创建后台导入任务并立即返回任务信息（可选）
+        mode: insert 跳过已存在的邮箱（默认）；upsert 更新已存在账号的
+              密码、2FA 密钥和恢复邮箱（可选）
+    
     Request Body:
         accounts: 账号列表数组
     
     Returns:
-        导入结果统计
+        导入结果统计，或后台任务信息
     """
     data = request.get_json()
     if not data or 'accounts' not in data:
@@ -103,15 +265,111 @@ def batch_import():
         return error_response('导入列表为空')
     
     try:
-        result = AccountService.batch_import(accounts)
+        mode = get_import_mode()
+        if request.args.get('async') == '1':
+            job = ImportJobService.create_from_accounts(accounts, mode)
+            return success_response(data=job, message='导入任务已创建'), 202
+        
+        result = AccountService.batch_import(accounts, mode=mode)
         return success_response(
             data=result,
             message=f"成功导入 {result['success_count']} 个账号"
         )
+    except ValueError as e:
+        return error_response(str(e))
     except Exception as e:
         return error_response(f'批量导入失败: {str(e)}', 500)
 
 
+@api_bp.route('/accounts/import', methods=['POST'])
+def import_accounts_text():
+    """
+    流式导入账号文本
+    
+    请求体为原始导入文本（或其 gzip 压缩文件），每行一个账号，
+    格式同导入页：邮箱——密码——恢复邮箱——2FA密钥——备注。
+    服务端边接收边解析，按块写入数据库，不受请求体大小限制；
+    gzip 文件解压后超过 IMPORT_MAX_DECOMPRESSED_BYTES 时停止并返回 413。
+    
+    示例:
+        curl --data-binary @accounts.txt.gz http://localhost:8002/api/accounts/import
+    
+    Query Params:
+        async: 为 1 时创建后台导入任务并立即返回任务信息（可选）
+        mode: 导入模式 insert/upsert，同批量导入（可选）
+    
+    Returns:
+        导入结果统计，或后台任务信息
+    """
+    try:
+        mode = get_import_mode()
+        if request.args.get('async') == '1':
+            job = ImportJobService.create_from_stream(request.stream, mode)
+            return success_response(data=job, message='导入任务已创建'), 202
+        
+        lines = iter_text_lines(request.stream, current_app.config['IMPORT_MAX_DECOMPRESSED_BYTES'])
+        records = (parse_line(line) for line in lines)
+        result = AccountService.import_stream(records, mode=mode)
+        return success_response(
+            data=result,
+            message=f"成功导入 {result['success_count']} 个账号"
+        )
+    except DecompressedTooLarge as e:
+        return error_response(str(e), 413)
+    except ValueError as e:
+        return error_response(str(e))
+    except Exception as e:
+        return error_response(f'导入失败: {str(e)}', 500)
+
+
+@api_bp.route('/import-jobs', methods=['GET'])
+def list_import_jobs():
+    """
+    获取最近的后台导入任务
+    
+    Returns:
+        任务列表
+    """
+    return success_response(data=ImportJobService.list_jobs())
+
+
+@api_bp.route('/import-jobs/<job_id>', methods=['GET'])
+def get_import_job(job_id):
+    """
+    获取后台导入任务进度
+    
+    Path Params:
+        job_id: 任务ID
+    
+    Returns:
+        任务状态、已处理行数、成功/失败数量、处理速度和预计剩余秒数
+    """
+    job = ImportJobService.get_job(job_id)
+    if job is None:
+        return error_response('任务不存在', 404)
+    return success_response(data=job)
+
+
+@api_bp.route('/import-jobs/<job_id>/resume', methods=['POST'])
+def resume_import_job(job_id):
+    """
+    从最后提交的块继续执行失败的导入任务
+    
+    Path Params:
+        job_id: 任务ID
+    
+    Returns:
+        任务信息
+    """
+    try:
+        job = ImportJobService.resume_job(job_id)
+        if job is None:
+            return error_response('任务不存在', 404)
+        return success_response(data=job, message='任务已重新排队')
+    except ValueError as e:
+        return error_response(str(e))
+
+
 @api_bp.route('/accounts/<int:account_id>', methods=['PUT'])
 def update_account(account_id):
     """
@@ -205,6 +463,93 @@ def toggle_sold_status(account_id):
         return error_response(f'出售状态更新失败: {str(e)}', 500)
 
 
+def get_bulk_target(data):
+    """
+    从请求体中提取批量操作目标
+    
+    Returns:
+        (ids, filters) 元组，filters 键同 GET /accounts 的筛选参数
+    """
+    ids = data.get('ids') or []
+    if not isinstance(ids, list):
+        raise ValueError('ids 必须为数组')
+    filters = data.get('filter') or {}
+    return ids, {
+        key: filters.get(key, '')
+        for key in ('search', 'sold_status', 'status', 'start_date', 'end_date')
+    }
+
+
+@api_bp.route('/accounts/bulk/<action>', methods=['PATCH'])
+def bulk_update_accounts(action):
+    """
+    批量修改账号（单个事务、单条 UPDATE）
+    
+    Path Params:
+        action: sold（出售状态）/ status（账号状态）/ remark（备注）
+    
+    Request Body:
+        ids: 账号ID数组（与 filter 二选一）
+        filter: 筛选条件，键同 GET /accounts 的筛选参数
+        soldStatus: action 为 sold 时的新出售状态 sold/unsold
+        status: action 为 status 时的新状态 pro/inactive
+        remark: action 为 remark 时的新备注
+    
+    Returns:
+        实际修改的账号数量
+    """
+    fields = {
+        'sold': ('sold_status', 'soldStatus'),
+        'status': ('status', 'status'),
+        'remark': ('remark', 'remark')
+    }
+    if action not in fields:
+        return error_response('不支持的批量操作', 404)
+    
+    data = request.get_json()
+    if not data:
+        return error_response('请求数据为空')
+    
+    field, body_key = fields[action]
+    if body_key not in data:
+        return error_response(f'缺少参数 {body_key}')
+    
+    try:
+        ids, filters = get_bulk_target(data)
+        result = AccountService.bulk_set_field(field, data[body_key], ids, filters)
+        return success_response(data=result, message=f"已更新 {result['affected']} 个账号")
+    except ValueError as e:
+        return error_response(str(e))
+    except Exception as e:
+        return error_response(f'批量更新失败: {str(e)}', 500)
+
+
+@api_bp.route('/accounts/bulk/delete', methods=['POST'])
+def bulk_delete_accounts():
+    """
+    批量删除账号及其历史记录（单个事务）
+    
+    Request Body:
+        ids: 账号ID数组（与 filter 二选一）
+        filter: 筛选条件，键同 GET /accounts 的筛选参数
+    
+    Returns:
+        删除的账号数量及历史记录数量
+    """
+    data = request.get_json()
+    if not data:
+        return error_response('请求数据为空')
+    
+    try:
+        ids, filters = get_bulk_target(data)
+        result = AccountService.bulk_delete(ids, filters)
+        return success_response(data=result, message=f"已删除 {result['affected']} 个账号")
+    except ValueError as e:
+        return error_response(str(e))
+    except Exception as e:
+        return error_response(f'批量删除失败: {str(e)}', 500)
+
+
 @api_bp.route('/accounts/<int:account_id>/2fa', methods=['GET'])
 def get_2fa_code(account_id):
     """
@@ -225,7 +570,95 @@ def get_2fa_code(account_id):
         return error_response(f'获取验证码失败: {str(e)}', 500)
 
 
+@api_bp.route('/accounts/2fa/batch', methods=['POST'])
+def get_2fa_codes():
+    """
+    批量获取账号的 2FA 验证码
+    
+    Request Body:
+        ids: 账号ID数组
+    
+    Returns:
+        每个账号的当前验证码和下一时间窗口验证码，以及共同的剩余有效时间
+    """
+    data = request.get_json()
+    if not data or not isinstance(data.get('ids'), list):
+        return error_response('请提供账号ID数组')
+    
+    try:
+        return success_response(data=AccountService.get_2fa_codes(data['ids']))
+    except ValueError as e:
+        return error_response(str(e))
+    except Exception as e:
+        return error_response(f'获取验证码失败: {str(e)}', 500)
+
+
+@api_bp.route('/accounts/2fa/stream', methods=['GET'])
+def stream_2fa_codes():
+    """
+    订阅账号 2FA 验证码推送（Server-Sent Events）
+    
+    连接建立后立即推送一次当前验证码，之后在每个 30 秒窗口开始时推送新验证码，
+    空闲期间定期发送心跳注释。每条 codes 事件的数据格式同 POST /accounts/2fa/batch。
+    需要登录时，登录令牌到期后发送一条 expired 事件并关闭连接。
+    
+    Query Params:
+        ids: 逗号分隔的账号ID
+    
+    Returns:
+        text/event-stream 响应
+    """
+    raw_ids = [i for i in request.args.get('ids', '').split(',') if i.strip()]
+    try:
+        account_ids = AccountService.parse_2fa_ids(raw_ids)
+    except ValueError as e:
+        return error_response(str(e))
+    if not account_ids:
+        return error_response('请提供账号ID')
+    
+    # 先订阅再计算首次推送，避免错过两者之间的窗口切换
+    subscription = code_broadcaster.subscribe(account_ids)
+    try:
+        now = time.time()
+        codes = AccountService.load_2fa_codes(set(account_ids), now)
+        initial = AccountService.build_2fa_payload(account_ids, codes, now)
+    except Exception as e:
+        code_broadcaster.unsubscribe(subscription)
+        return error_response(f'获取验证码失败: {str(e)}', 500)
+    
+    dumps = current_app.json.dumps
+    keepalive = current_app.config['CODE_STREAM_KEEPALIVE']
+    # 连接建立时已通过 require_auth 校验，这里只记下令牌的过期时间
+    expires_at = AuthService.token_expires_at(get_auth_token()) \
+        if current_app.config['AUTH_REQUIRED'] else None
+    
+    def generate():
+        try:
+            payload = initial
+            while True:
+                if expires_at is not None and time.time() >= expires_at:
+                    yield 'event: expired\ndata: {}\n\n'
+                    return
+                if payload is None:
+                    yield ': keepalive\n\n'
+                else:
+                    yield f'event: codes\ndata: {dumps(payload)}\n\n'
+                timeout = keepalive
+                if expires_at is not None:
+                    timeout = max(0, min(timeout, expires_at - time.time()))
+                payload = subscription.get(timeout)
+        finally:
+            code_broadcaster.unsubscribe(subscription)
+    
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @api_bp.route('/accounts/<int:account_id>/history', methods=['GET'])
+@versioned_etag()
 def get_account_history(account_id):
     """
     获取账号修改历史记录
@@ -233,19 +666,133 @@ def get_account_history(account_id):
     Path Params:
         account_id: 账号ID
     
+    Query Params:
+        cursor: 分页游标（可选）
+        limit: 每页条数（可选）
+        传入 cursor 或 limit 时按时间倒序分页返回 {items, nextCursor}，否则返回全部记录
+    
     Returns:
         账号的修改历史列表
     """
+    cursor = request.args.get('cursor')
+    limit = request.args.get('limit', type=int)
+    
     try:
-        # 获取该账号的所有历史记录，按时间倒序
-        history = AccountHistory.query.filter_by(account_id=account_id)\
-            .order_by(AccountHistory.changed_at.desc()).all()
-        
-        return success_response(data=[h.to_dict() for h in history])
+        if cursor or limit:
+            history = AccountService.get_account_history_page(
+                account_id, cursor=cursor, limit=limit or DEFAULT_HISTORY_PAGE_SIZE
+            )
+        else:
+            # 获取该账号的所有历史记录，按时间倒序
+            history = AccountService.get_account_history(account_id)
+        return success_response(data=history)
+    except ValueError as e:
+        return error_response(str(e))
     except Exception as e:
         return error_response(f'获取历史记录失败: {str(e)}', 500)
 
 
+@api_bp.route('/history', methods=['GET'])
+@versioned_etag()
+def search_history():
+    """
+    跨账号查询修改历史（审计）
+    
+    Query Params:
+        field: 逗号分隔的字段名 password/secret/recovery/sold_status（可选）
+        start_date: 开始日期 YYYY-MM-DD（可选）
+        end_date: 结束日期 YYYY-MM-DD，包含当天（可选）
+        account_ids: 逗号分隔的账号ID（可选）
+        cursor: 分页游标（可选）
+        limit: 每页条数（可选）
+    
+    Returns:
+        {items, nextCursor}，items 按修改时间倒序并附带账号邮箱
+    """
+    def split(name):
+        return [v.strip() for v in request.args.get(name, '').split(',') if v.strip()]
+    
+    filters = {
+        'fields': split('field'),
+        'account_ids': split('account_ids'),
+        'start_date': request.args.get('start_date', ''),
+        'end_date': request.args.get('end_date', '')
+    }
+    limit = request.args.get('limit', DEFAULT_HISTORY_PAGE_SIZE, type=int)
+    
+    try:
+        page = AccountService.search_history(filters, cursor=request.args.get('cursor'), limit=limit)
+        return success_response(data=page)
+    except ValueError as e:
+        return error_response(str(e))
+    except Exception as e:
+        return error_response(f'查询历史记录失败: {str(e)}', 500)
+
+
+@api_bp.route('/accounts/history/batch', methods=['POST'])
+def get_latest_history():
+    """
+    批量获取多个账号最近的修改记录
+    
+    Request Body:
+        ids: 账号ID数组
+        limit: 每个账号返回的条数（可选，默认 5）
+    
+    Returns:
+        账号ID -> 最近修改记录列表
+    """
+    data = request.get_json()
+    if not data or not isinstance(data.get('ids'), list):
+        return error_response('请提供账号ID数组')
+    
+    try:
+        limit = int(data.get('limit', 5))
+    except (TypeError, ValueError):
+        return error_response('limit 参数格式错误')
+    
+    try:
+        return success_response(data=AccountService.get_latest_history(data['ids'], limit))
+    except ValueError as e:
+        return error_response(str(e))
+    except Exception as e:
+        return error_response(f'获取历史记录失败: {str(e)}', 500)
+
+
+@api_bp.route('/stats', methods=['GET'])
+@versioned_etag()
+def get_stats():
+    """
+    获取库存统计
+    
+    Query Params:
+        days: 每日出售汇总的天数（默认 30）
+    
+    Returns:
+        总数、各状态数量及每日出售汇总
+    """
+    days = request.args.get('days', 30, type=int)
+    try:
+        return success_response(data=StatsService.get_stats(days))
+    except Exception as e:
+        return error_response(f'获取统计失败: {str(e)}', 500)
+
+
+@api_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    获取运行指标
+    
+    Returns:
+        历史记录写入队列、查询缓存、验证码推送和限流的统计信息（仅当前进程）
+    """
+    return success_response(data={
+        'historyWriter': history_writer.stats(),
+        'queryCache': account_cache.stats(),
+        'codeStream': code_broadcaster.stats(),
+        'rateLimiter': rate_limiter.stats()
+    })
+
+
 @api_bp.route('/auth/login', methods=['POST'])
 def login():
     """
@@ -255,7 +802,7 @@ def login():
         password: 管理员密码
     
     Returns:
-        登录结果
+        登录结果，成功时包含 token 和 expiresAt（过期时间戳），并设置登录 Cookie
     """
     client_ip = get_client_ip()
     
@@ -280,7 +827,15 @@ def login():
     if AuthService.verify_password(password):
         # 登录成功，清除失败记录
         AuthService.clear_failed_attempts(client_ip)
-        return success_response(message='登录成功')
+        token, expires_at = AuthService.issue_token()
+        response = success_response(data={'token': token, 'expiresAt': expires_at},
+                                    message='登录成功')
+        # 浏览器通过 HttpOnly Cookie 携带令牌（包括 EventSource 和下载链接），
+        # 其他客户端使用返回的令牌设置 Authorization: Bearer 请求头
+        response.set_cookie(AUTH_COOKIE, token, max_age=current_app.config['AUTH_TOKEN_TTL'],
+                            path='/api', httponly=True, secure=request.is_secure,
+                            samesite='Strict')
+        return response
     else:
         # 登录失败，记录尝试
         is_now_banned, remaining_attempts = AuthService.record_failed_attempt(client_ip)
@@ -2,39 +2,299 @@
 账号服务模块
 提供账号相关的业务逻辑处理
 """
+import base64
+import binascii
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
 from app import db
 from app.models.account import Account
 from app.models.account_history import AccountHistory
+from app.models.data_version import DataVersion
+from app.services.stats_service import StatsService, status_key, sold_key
+from app.services.history_writer import history_writer
+from app.services.history_archive_service import HistoryArchiveService
 from app.utils.totp import generate_totp, get_remaining_seconds
+from app.utils.search_index import MIN_TERM_LENGTH, match_ids
+from app.utils.query_cache import QueryCache
+from app.utils.sqlite_tuning import use_write_engine
+
+# 分页配置
+DEFAULT_PAGE_SIZE = 50  # 默认每页条数
+MAX_PAGE_SIZE = 500  # 每页最大条数
+
+# 历史记录分页配置
+DEFAULT_HISTORY_PAGE_SIZE = 100  # 默认每页条数
+MAX_HISTORY_PER_ACCOUNT = 50  # 批量获取时每个账号最多返回的条数
+
+# 记录修改历史的字段
+HISTORY_FIELDS = ('password', 'secret', 'recovery', 'sold_status')
+
+# 导出时每批从数据库游标读取的行数
+EXPORT_BATCH_SIZE = 1000
+
+# 批量导入时每块的账号数量（同时受 SQLite 单条语句参数个数限制）
+IMPORT_CHUNK_SIZE = 500
+
+# 更新模式下可被导入数据覆盖的字段
+UPSERT_FIELDS = ('password', 'secret', 'recovery')
+
+# 批量操作支持的字段及允许的取值（None 表示不限）
+BULK_FIELDS = {
+    'sold_status': ('sold', 'unsold'),
+    'status': ('pro', 'inactive'),
+    'remark': None
+}
+BULK_FIELD_DEFAULTS = {'sold_status': 'unsold'}  # 空值按默认值比较
+BULK_MAX_IDS = 5000  # 按ID批量操作时的最大数量
+
+# 流式导入时最多返回的失败邮箱数量
+MAX_REPORTED_FAILURES = 1000
+
+# 账号列表及历史记录查询缓存（由 create_app 按配置初始化）
+account_cache = QueryCache()
 
 
 class AccountService:
     """账号服务类"""
     
     @staticmethod
-    def get_all_accounts(search=''):
+    def _commit_changes():
         """
-        获取所有账号（支持搜索）
+        提交写操作
+        
+        在同一事务中递增数据版本号，提交后清空查询缓存。
+        """
+        DataVersion.bump()
+        db.session.commit()
+        account_cache.clear()
+    
+    @staticmethod
+    def _cache_key(*parts, filters=None):
+        """生成缓存键：数据版本号 + 归一化后的查询参数"""
+        normalized = tuple(sorted(
+            (name, str(value).strip()) for name, value in (filters or {}).items() if value
+        ))
+        return (DataVersion.current(),) + parts + (normalized,)
+    
+    @staticmethod
+    def _parse_date(value, field):
+        """
+        解析 YYYY-MM-DD 格式的日期
+        
+        Raises:
+            ValueError: 日期格式错误
+        """
+        try:
+            return datetime.strptime(value, '%Y-%m-%d')
+        except (TypeError, ValueError):
+            raise ValueError(f'{field}格式错误，应为 YYYY-MM-DD')
+    
+    @staticmethod
+    def _apply_filters(query, filters):
+        """
+        为账号查询附加筛选条件
         
         Args:
-            search: 搜索关键词
+            query: Account 查询对象
+            filters: 筛选条件字典（search/sold_status/status/start_date/end_date）
         
         Returns:
-            账号字典列表
+            附加条件后的查询对象
         """
-        query = Account.query
-        
+        search = (filters.get('search') or '').strip()
         if search:
-            search_pattern = f'%{search}%'
-            query = query.filter(
-                db.or_(
-                    Account.email.ilike(search_pattern),
-                    Account.remark.ilike(search_pattern)
+            if current_app.extensions.get('account_fts') and len(search) >= MIN_TERM_LENGTH:
+                # 走 FTS5 trigram 索引，避免前置通配符导致全表扫描
+                query = query.filter(Account.id.in_(match_ids(search)))
+            else:
+                # 关键词过短或全文索引不可用时退回 LIKE 匹配
+                search_pattern = f'%{search}%'
+                query = query.filter(
+                    db.or_(
+                        Account.email.ilike(search_pattern),
+                        Account.remark.ilike(search_pattern),
+                        Account.recovery.ilike(search_pattern)
+                    )
                 )
+        
+        sold_status = filters.get('sold_status')
+        if sold_status == 'unsold' and not current_app.extensions.get('sold_status_backfilled'):
+            # 尚未执行补全迁移的旧数据中出售状态可能为空，按未售出处理
+            query = query.filter(db.or_(Account.sold_status == 'unsold',
+                                        Account.sold_status.is_(None)))
+        elif sold_status:
+            # 空的出售状态已由迁移统一为 unsold，等值条件可直接走组合索引
+            query = query.filter(Account.sold_status == sold_status)
+        
+        if filters.get('status'):
+            query = query.filter(Account.status == filters['status'])
+        
+        if filters.get('start_date'):
+            start = AccountService._parse_date(filters['start_date'], '开始日期')
+            query = query.filter(Account.created_at >= start)
+        if filters.get('end_date'):
+            # 结束日期包含当天
+            end = AccountService._parse_date(filters['end_date'], '结束日期')
+            query = query.filter(Account.created_at < end + timedelta(days=1))
+        
+        return query
+    
+    @staticmethod
+    def _encode_cursor(created_at, account_id):
+        """
+        将 (created_at, id) 编码为分页游标
+        
+        Args:
+            created_at: 创建时间（datetime 或数据库中的时间文本）
+            account_id: 账号ID
+        """
+        if isinstance(created_at, datetime):
+            created_at = created_at.isoformat()
+        raw = f'{created_at}|{account_id}'
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+    
+    @staticmethod
+    def _decode_cursor(cursor):
+        """
+        解析分页游标
+        
+        Returns:
+            (created_at, id) 元组
+        
+        Raises:
+            ValueError: 游标无效
+        """
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            raw = base64.urlsafe_b64decode(padded.encode()).decode()
+            created_at, account_id = raw.rsplit('|', 1)
+            return datetime.fromisoformat(created_at), int(account_id)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise ValueError('无效的分页游标')
+    
+    @staticmethod
+    def _fetch_dicts(stmt):
+        """执行 Core 查询并将每行转换为字典（键顺序同 select 的列顺序）"""
+        result = db.session.execute(stmt)
+        keys = list(result.keys())
+        return [dict(zip(keys, row)) for row in result]
+    
+    @staticmethod
+    def get_all_accounts(filters=None):
+        """
+        获取所有账号（支持搜索和筛选）
+        
+        Args:
+            filters: 筛选条件字典，见 _apply_filters
+        
+        Returns:
+            账号字典列表（与缓存共享，调用方不得修改）
+        """
+        filters = filters or {}
+        
+        def load():
+            stmt = db.select(*Account.serialized_columns())
+            stmt = AccountService._apply_filters(stmt, filters)
+            return AccountService._fetch_dicts(stmt.order_by(Account.created_at.asc()))
+        
+        key = AccountService._cache_key('accounts', filters=filters)
+        return account_cache.get_or_load(key, load)
+    
+    @staticmethod
+    def get_accounts_page(filters=None, cursor=None, limit=DEFAULT_PAGE_SIZE, with_total=False):
+        """
+        按 (created_at, id) 键集分页获取账号
+        
+        Args:
+            filters: 筛选条件字典，见 _apply_filters
+            cursor: 上一页返回的游标（为空表示第一页）
+            limit: 每页条数
+            with_total: 是否统计符合条件的总数
+        
+        Returns:
+            包含 items、nextCursor、total 的字典（与缓存共享，调用方不得修改）
+        
+        Raises:
+            ValueError: 游标或筛选条件无效
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        filters = filters or {}
+        key = AccountService._cache_key('page', cursor or '', limit, bool(with_total),
+                                        filters=filters)
+        return account_cache.get_or_load(
+            key, lambda: AccountService._load_page(filters, cursor, limit, with_total)
+        )
+    
+    @staticmethod
+    def _load_page(filters, cursor, limit, with_total):
+        """执行键集分页查询，参数见 get_accounts_page"""
+        total = None
+        if with_total:
+            count_stmt = db.select(db.func.count()).select_from(Account)
+            total = db.session.execute(
+                AccountService._apply_filters(count_stmt, filters)
+            ).scalar()
+        
+        columns = Account.serialized_columns()
+        # 额外取出原始创建时间文本用于生成游标（不解析为 datetime）
+        stmt = db.select(*columns, db.cast(Account.created_at, db.String))
+        stmt = AccountService._apply_filters(stmt, filters)
+        if cursor:
+            cursor_at, cursor_id = AccountService._decode_cursor(cursor)
+            stmt = stmt.where(
+                db.tuple_(Account.created_at, Account.id) > (cursor_at, cursor_id)
             )
         
-        accounts = query.order_by(Account.created_at.asc()).all()
-        return [acc.to_dict() for acc in accounts]
+        # 多取一条用于判断是否还有下一页
+        stmt = stmt.order_by(Account.created_at.asc(), Account.id.asc()).limit(limit + 1)
+        rows = db.session.execute(stmt).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        keys = [column.key for column in columns]
+        next_cursor = None
+        if has_more:
+            last = rows[-1]
+            next_cursor = AccountService._encode_cursor(last[-1], last.id)
+        
+        return {
+            'items': [dict(zip(keys, row)) for row in rows],
+            'nextCursor': next_cursor,
+            'total': total
+        }
+    
+    @staticmethod
+    def iter_accounts(filters=None, batch_size=EXPORT_BATCH_SIZE):
+        """
+        以服务端游标逐批迭代符合条件的账号（用于流式导出）
+        
+        只选取导出所需的列，内存占用与账号总数无关。
+        
+        Args:
+            filters: 筛选条件字典，见 _apply_filters
+            batch_size: 每批读取的行数
+        
+        Returns:
+            惰性迭代的结果集，每行字段与 Account 列同名
+        
+        Raises:
+            ValueError: 筛选条件无效
+        """
+        stmt = db.select(
+            Account.id, Account.email, Account.password, Account.recovery,
+            Account.secret, Account.remark, Account.status,
+            Account.sold_status, Account.created_at
+        )
+        stmt = AccountService._apply_filters(stmt, filters or {})
+        stmt = stmt.order_by(Account.created_at.asc(), Account.id.asc())\
+            .execution_options(yield_per=batch_size)
+        
+        return db.session.execute(stmt)
     
     @staticmethod
     def get_account_by_id(account_id):
@@ -63,6 +323,7 @@ class AccountService:
         Raises:
             ValueError: 邮箱已存在
         """
+        use_write_engine(db.session)
         # 检查邮箱是否已存在
         existing = Account.query.filter_by(email=data['email']).first()
         if existing:
@@ -78,62 +339,289 @@ class AccountService:
         )
         
         db.session.add(account)
-        db.session.commit()
+        StatsService.adjust(StatsService.account_deltas(account.status, 'unsold'))
+        AccountService._commit_changes()
         
         return account.to_dict()
     
     @staticmethod
-    def batch_import(accounts):
+    def _normalize_import_row(data):
+        """
+        整理一条导入数据
+        
+        Returns:
+            可直接写入 accounts 表的字段字典；缺少邮箱时返回 None
+        """
+        email = (data.get('email') or '').strip()
+        if not email:
+            return None
+        return {
+            'email': email,
+            'password': data.get('password') or '',
+            'recovery': data.get('recovery') or '',
+            'secret': data.get('secret') or '',
+            'remark': data.get('remark') or ''
+        }
+    
+    @staticmethod
+    def _diff_existing(rows, existing):
+        """
+        计算更新模式下已存在账号需要修改的字段
+        
+        只比较导入数据中非空的密码、2FA 密钥和恢复邮箱。
+        
+        Args:
+            rows: 导入数据字典列表
+            existing: {邮箱: 数据库中的账号行}
+        
+        Returns:
+            (更新参数列表, 历史记录参数列表, 无变化的账号数量)
+        """
+        now = datetime.now()
+        updated_at = datetime.utcnow()
+        updates = []
+        history = []
+        unchanged = 0
+        for row in rows:
+            current = existing.get(row['email'])
+            if current is None:
+                continue
+            changes = {
+                field: row[field] for field in UPSERT_FIELDS
+                if row[field] and row[field] != getattr(current, field)
+            }
+            if not changes:
+                unchanged += 1
+                continue
+            params = {field: getattr(current, field) for field in UPSERT_FIELDS}
+            params.update(changes, account_id=current.id, updated_at=updated_at)
+            updates.append(params)
+            history.extend({
+                'account_id': current.id,
+                'field_name': field,
+                'old_value': getattr(current, field),
+                'new_value': value,
+                'changed_at': now
+            } for field, value in changes.items())
+        return updates, history, unchanged
+    
+    @staticmethod
+    def import_chunk(rows, return_accounts=True, before_commit=None, mode='insert'):
+        """
+        以集合方式导入一批账号并提交
+        
+        一次 IN 查询找出已存在的邮箱，其余账号以单条 executemany
+        INSERT ... ON CONFLICT DO NOTHING 写入，并发导入的同名邮箱同样会被跳过。
+        更新模式下，已存在账号变化的字段以一次 executemany UPDATE 写入，
+        对应的历史记录在内存中比对生成，再以一次 executemany INSERT 写入。
+        
+        Args:
+            rows: _normalize_import_row 整理后的字段字典列表（邮箱不重复）
+            return_accounts: 是否返回新建账号的字典
+            before_commit: 提交前在同一事务中调用的函数，参数为本块结果
+                           （用于与导入进度一起原子提交）
+            mode: insert 跳过已存在的邮箱；upsert 更新已存在账号的
+                  密码、2FA 密钥和恢复邮箱
+        
+        Returns:
+            包含 success_count、updated_count、unchanged_count、failed_emails、
+            accounts、seconds 的字典
+        """
+        use_write_engine(db.session)
+        started = time.perf_counter()
+        emails = [row['email'] for row in rows]
+        existing = {
+            row.email: row for row in db.session.execute(
+                db.select(Account.id, Account.email, *[getattr(Account, f) for f in UPSERT_FIELDS])
+                .where(Account.email.in_(emails))
+            )
+        }
+        
+        now = datetime.utcnow()
+        params = [
+            dict(row, status='inactive', sold_status='unsold', created_at=now, updated_at=now)
+            for row in rows if row['email'] not in existing
+        ]
+        
+        inserted = []
+        if params:
+            stmt = sqlite_insert(Account.__table__)\
+                .on_conflict_do_nothing(index_elements=['email'])\
+                .returning(*Account.serialized_columns())
+            result = db.session.execute(stmt, params)
+            keys = list(result.keys())
+            inserted = [dict(zip(keys, row)) for row in result]
+        
+        updates, history, unchanged = [], [], 0
+        if mode == 'upsert' and existing:
+            updates, history, unchanged = AccountService._diff_existing(rows, existing)
+            if updates:
+                accounts_table = Account.__table__
+                db.session.execute(
+                    db.update(accounts_table)
+                    .where(accounts_table.c.id == db.bindparam('account_id')),
+                    updates
+                )
+                history_writer.record(history)
+        
+        handled = {account['email'] for account in inserted}
+        if mode == 'upsert':
+            handled.update(existing)
+        chunk_result = {
+            'success_count': len(inserted),
+            'updated_count': len(updates),
+            'unchanged_count': unchanged,
+            'failed_emails': [email for email in emails if email not in handled],
+            'accounts': inserted if return_accounts else []
+        }
+        
+        if before_commit:
+            before_commit(chunk_result)
+        if inserted or updates:
+            if inserted:
+                StatsService.adjust(StatsService.account_deltas('inactive', 'unsold', len(inserted)))
+            AccountService._commit_changes()
+        elif before_commit:
+            db.session.commit()
+        else:
+            db.session.rollback()
+        
+        chunk_result['seconds'] = round(time.perf_counter() - started, 4)
+        return chunk_result
+    
+    @staticmethod
+    def batch_import(accounts, chunk_size=IMPORT_CHUNK_SIZE, mode='insert'):
         """
         批量导入账号
         
+        数据先在内存中去重，再按块写入并逐块提交。重复的邮箱计为失败；
+        已存在的邮箱在 insert 模式下计为失败，在 upsert 模式下更新变化的字段。
+        
         Args:
             accounts: 账号数据列表
+            chunk_size: 每块账号数量
+            mode: 导入模式 insert/upsert，见 import_chunk
         
         Returns:
-            导入结果统计
+            导入结果统计，chunks 为每块的耗时明细
         """
-        success_count = 0
-        failed_count = 0
-        failed_emails = []
-        imported_accounts = []
+        result = {
+            'success_count': 0,
+            'updated_count': 0,
+            'unchanged_count': 0,
+            'failed_count': 0,
+            'failed_emails': [],
+            'accounts': [],
+            'chunks': []
+        }
         
+        def flush(chunk):
+            chunk_result = AccountService.import_chunk(chunk, mode=mode)
+            result['success_count'] += chunk_result['success_count']
+            result['updated_count'] += chunk_result['updated_count']
+            result['unchanged_count'] += chunk_result['unchanged_count']
+            result['failed_emails'].extend(chunk_result['failed_emails'])
+            result['accounts'].extend(chunk_result['accounts'])
+            result['chunks'].append({
+                'index': len(result['chunks']),
+                'rows': len(chunk),
+                'inserted': chunk_result['success_count'],
+                'updated': chunk_result['updated_count'],
+                'skipped': len(chunk_result['failed_emails']),
+                'seconds': chunk_result['seconds']
+            })
+        
+        seen = set()
+        chunk = []
         for data in accounts:
-            try:
-                # 跳过已存在的邮箱
-                existing = Account.query.filter_by(email=data.get('email', '')).first()
-                if existing:
-                    failed_count += 1
-                    failed_emails.append(data.get('email', '未知'))
-                    continue
-                
-                account = Account(
-                    email=data.get('email', ''),
-                    password=data.get('password', ''),
-                    recovery=data.get('recovery', ''),
-                    secret=data.get('secret', ''),
-                    remark=data.get('remark', ''),
-                    status='inactive'  # 导入的账号默认为未开启状态
-                )
-                
-                db.session.add(account)
-                success_count += 1
-                imported_accounts.append(account)
-                
-            except Exception as e:
-                failed_count += 1
-                failed_emails.append(data.get('email', '未知'))
-        
-        # 提交所有成功的记录
-        if success_count > 0:
-            db.session.commit()
+            row = AccountService._normalize_import_row(data)
+            if row is None or row['email'] in seen:
+                # 缺少邮箱或与本次导入中的前一条重复
+                result['failed_emails'].append(row['email'] if row else '未知')
+                continue
+            seen.add(row['email'])
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk = []
+        if chunk:
+            flush(chunk)
         
-        return {
-            'success_count': success_count,
-            'failed_count': failed_count,
-            'failed_emails': failed_emails,
-            'accounts': [acc.to_dict() for acc in imported_accounts]
+        result['failed_count'] = len(result['failed_emails'])
+        return result
+    
+    @staticmethod
+    def import_stream(records, chunk_size=IMPORT_CHUNK_SIZE, result=None, on_chunk=None,
+                      mode='insert'):
+        """
+        流式导入账号
+        
+        逐条消费 records，凑满一块即写入并提交，内存占用只与块大小有关。
+        块内重复的邮箱在内存中去重，跨块重复的邮箱由唯一约束跳过。
+        
+        Args:
+            records: 账号数据字典的迭代器（如 parse_line 的输出，空行为 None）
+            chunk_size: 每块账号数量
+            result: 累计结果的初始值（断点续传时传入已完成部分的统计）
+            on_chunk: 每块提交前在同一事务中调用的函数，
+                      参数为 (已消费的记录数, 累计结果)
+            mode: 导入模式 insert/upsert，见 import_chunk
+        
+        Returns:
+            导入结果统计，failed_emails 最多保留 MAX_REPORTED_FAILURES 条
+        """
+        started = time.perf_counter()
+        result = result or {
+            'success_count': 0,
+            'updated_count': 0,
+            'unchanged_count': 0,
+            'failed_count': 0,
+            'failed_emails': []
         }
+        result.update(chunk_count=0, seconds=0)
+        consumed = 0
+        
+        def fail(email):
+            result['failed_count'] += 1
+            if len(result['failed_emails']) < MAX_REPORTED_FAILURES:
+                result['failed_emails'].append(email)
+        
+        def before_commit(chunk_result):
+            result['success_count'] += chunk_result['success_count']
+            result['updated_count'] += chunk_result['updated_count']
+            result['unchanged_count'] += chunk_result['unchanged_count']
+            for email in chunk_result['failed_emails']:
+                fail(email)
+            if on_chunk:
+                on_chunk(consumed, result)
+        
+        def flush(chunk):
+            AccountService.import_chunk(list(chunk.values()), return_accounts=False,
+                                        before_commit=before_commit, mode=mode)
+            result['chunk_count'] += 1
+        
+        chunk = {}
+        for data in records:
+            consumed += 1
+            if data is None:
+                continue
+            row = AccountService._normalize_import_row(data)
+            if row is None or row['email'] in chunk:
+                fail(row['email'] if row else '未知')
+                continue
+            chunk[row['email']] = row
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk = {}
+        if chunk:
+            flush(chunk)
+        elif on_chunk:
+            # 末尾只有空行或无效行时，也要记录最终进度
+            on_chunk(consumed, result)
+            db.session.commit()
+        
+        result['seconds'] = round(time.perf_counter() - started, 3)
+        return result
     
     @staticmethod
     def update_account(account_id, data):
@@ -147,6 +635,7 @@ class AccountService:
         Returns:
             更新后的账号字典或 None
         """
+        use_write_engine(db.session)
         account = Account.query.get(account_id)
         if not account:
             return None
@@ -157,50 +646,49 @@ class AccountService:
             if existing:
                 raise ValueError(f"邮箱 {data['email']} 已被其他账号使用")
         
-        # 更新字段并记录历史
-        tracked_fields = ['password', 'secret', 'recovery']  # 需要跟踪的字段
+        # 更新字段并记录历史（跟踪密码、2FA 密钥和恢复邮箱）
+        history = []
         
         if 'email' in data:
             account.email = data['email']
         if 'password' in data:
             if data['password'] != account.password:
                 # 记录密码修改历史
-                history = AccountHistory(
-                    account_id=account_id,
-                    field_name='password',
-                    old_value=account.password,
-                    new_value=data['password']
-                )
-                db.session.add(history)
+                history.append({
+                    'account_id': account_id,
+                    'field_name': 'password',
+                    'old_value': account.password,
+                    'new_value': data['password']
+                })
             account.password = data['password']
         if 'recovery' in data:
             if data['recovery'] != account.recovery:
                 # 记录恢复邮箱修改历史
-                history = AccountHistory(
-                    account_id=account_id,
-                    field_name='recovery',
-                    old_value=account.recovery,
-                    new_value=data['recovery']
-                )
-                db.session.add(history)
+                history.append({
+                    'account_id': account_id,
+                    'field_name': 'recovery',
+                    'old_value': account.recovery,
+                    'new_value': data['recovery']
+                })
             account.recovery = data['recovery']
         if 'secret' in data:
             if data['secret'] != account.secret:
                 # 记录 2FA 密钥修改历史
-                history = AccountHistory(
-                    account_id=account_id,
-                    field_name='secret',
-                    old_value=account.secret,
-                    new_value=data['secret']
-                )
-                db.session.add(history)
+                history.append({
+                    'account_id': account_id,
+                    'field_name': 'secret',
+                    'old_value': account.secret,
+                    'new_value': data['secret']
+                })
             account.secret = data['secret']
         if 'remark' in data:
             account.remark = data['remark']
-        if 'status' in data:
+        if 'status' in data and data['status'] != account.status:
+            StatsService.adjust({status_key(account.status): -1, status_key(data['status']): 1})
             account.status = data['status']
         
-        db.session.commit()
+        history_writer.record(history)
+        AccountService._commit_changes()
         return account.to_dict()
     
     @staticmethod
@@ -214,14 +702,174 @@ class AccountService:
         Returns:
             是否删除成功
         """
+        use_write_engine(db.session)
         account = Account.query.get(account_id)
         if not account:
             return False
         
+        # 先删除该账号的历史记录，避免留下孤立记录
+        db.session.execute(
+            db.delete(AccountHistory).where(AccountHistory.account_id == account_id)
+        )
         db.session.delete(account)
-        db.session.commit()
+        StatsService.adjust(StatsService.account_deltas(account.status, account.sold_status, -1))
+        AccountService._commit_changes()
         return True
     
+    @staticmethod
+    def _bulk_target(ids=None, filters=None):
+        """
+        生成批量操作的目标条件
+        
+        Args:
+            ids: 账号ID列表
+            filters: 筛选条件字典，见 _apply_filters（ids 为空时使用）
+        
+        Returns:
+            可用于 WHERE 的条件表达式
+        
+        Raises:
+            ValueError: 未指定目标或数量超限
+        """
+        if ids:
+            if len(ids) > BULK_MAX_IDS:
+                raise ValueError(f'单次最多操作 {BULK_MAX_IDS} 个账号')
+            try:
+                return Account.id.in_([int(i) for i in ids])
+            except (TypeError, ValueError):
+                raise ValueError('账号ID格式错误')
+        if filters and any(filters.values()):
+            subquery = AccountService._apply_filters(db.select(Account.id), filters)
+            return Account.id.in_(subquery)
+        raise ValueError('请指定账号ID列表或筛选条件')
+    
+    @staticmethod
+    def bulk_set_field(field, value, ids=None, filters=None):
+        """
+        批量修改账号的出售状态、状态或备注
+        
+        在一个事务中以单条 UPDATE 修改所有值不同的目标账号，
+        出售状态的变更历史以一次 executemany 写入，并同步更新统计。
+        
+        Args:
+            field: 字段名 sold_status/status/remark
+            value: 新值
+            ids: 账号ID列表
+            filters: 筛选条件字典（ids 为空时使用）
+        
+        Returns:
+            包含 affected（实际修改的账号数量）的字典
+        
+        Raises:
+            ValueError: 字段、取值或目标无效
+        """
+        use_write_engine(db.session)
+        if field not in BULK_FIELDS:
+            raise ValueError(f'不支持批量修改字段: {field}')
+        allowed = BULK_FIELDS[field]
+        if allowed and value not in allowed:
+            raise ValueError(f"{field} 只能为 {'/'.join(allowed)}")
+        
+        column = getattr(Account, field)
+        current = db.func.coalesce(column, BULK_FIELD_DEFAULTS.get(field, ''))
+        condition = db.and_(AccountService._bulk_target(ids, filters), current != value)
+        
+        changed = db.session.execute(
+            db.select(Account.id, column).where(condition)
+        ).all()
+        if not changed:
+            db.session.rollback()
+            return {'affected': 0}
+        
+        db.session.execute(
+            db.update(Account).where(condition)
+            .values({field: value, 'updated_at': datetime.utcnow()})
+            .execution_options(synchronize_session=False)
+        )
+        
+        if field == 'sold_status':
+            changed_at = datetime.now()
+            history_writer.record([{
+                'account_id': account_id,
+                'field_name': 'sold_status',
+                'old_value': old_value,
+                'new_value': value,
+                'changed_at': changed_at
+            } for account_id, old_value in changed])
+            if value == 'sold':
+                StatsService.record_sales(changed_at.date(), sold=len(changed))
+            else:
+                StatsService.record_sales(changed_at.date(), unsold=len(changed))
+        
+        if field in ('sold_status', 'status'):
+            key = sold_key if field == 'sold_status' else status_key
+            deltas = Counter({key(value): len(changed)})
+            deltas.subtract(Counter(key(old_value) for _, old_value in changed))
+            StatsService.adjust(deltas)
+        
+        AccountService._commit_changes()
+        return {'affected': len(changed)}
+    
+    @staticmethod
+    def bulk_delete(ids=None, filters=None):
+        """
+        批量删除账号及其历史记录（单个事务）
+        
+        Args:
+            ids: 账号ID列表
+            filters: 筛选条件字典（ids 为空时使用）
+        
+        Returns:
+            包含 affected（删除的账号数量）和 history_deleted 的字典
+        
+        Raises:
+            ValueError: 目标无效
+        """
+        use_write_engine(db.session)
+        target = AccountService._bulk_target(ids, filters)
+        
+        grouped = db.session.execute(
+            db.select(Account.status, Account.sold_status, db.func.count())
+            .where(target).group_by(Account.status, Account.sold_status)
+        ).all()
+        affected = sum(count for _, _, count in grouped)
+        if not affected:
+            db.session.rollback()
+            return {'affected': 0, 'history_deleted': 0}
+        
+        history_deleted = db.session.execute(
+            db.delete(AccountHistory)
+            .where(AccountHistory.account_id.in_(db.select(Account.id).where(target)))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.execute(
+            db.delete(Account).where(target).execution_options(synchronize_session=False)
+        )
+        
+        deltas = Counter()
+        for status, sold_status, count in grouped:
+            deltas.update(StatsService.account_deltas(status, sold_status, -count))
+        StatsService.adjust(deltas)
+        
+        AccountService._commit_changes()
+        return {'affected': affected, 'history_deleted': history_deleted}
+    
+    @staticmethod
+    def purge_orphan_history():
+        """
+        删除账号已不存在的历史记录（清理旧版本删除账号时遗留的数据）
+        
+        Returns:
+            删除的记录数量
+        """
+        deleted = db.session.execute(
+            db.delete(AccountHistory)
+            .where(AccountHistory.account_id.not_in(db.select(Account.id)))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        AccountService._commit_changes()
+        return deleted
+    
     @staticmethod
     def toggle_status(account_id):
         """
@@ -233,13 +881,16 @@ class AccountService:
         Returns:
             更新后的账号字典或 None
         """
+        use_write_engine(db.session)
         account = Account.query.get(account_id)
         if not account:
             return None
         
         # 切换状态
-        account.status = 'inactive' if account.status == 'pro' else 'pro'
-        db.session.commit()
+        new_status = 'inactive' if account.status == 'pro' else 'pro'
+        StatsService.adjust({status_key(account.status): -1, status_key(new_status): 1})
+        account.status = new_status
+        AccountService._commit_changes()
         
         return account.to_dict()
     
@@ -254,6 +905,7 @@ class AccountService:
         Returns:
             更新后的账号字典或 None
         """
+        use_write_engine(db.session)
         account = Account.query.get(account_id)
         if not account:
             return None
@@ -266,17 +918,346 @@ class AccountService:
         account.sold_status = new_status
         
         # 记录售出状态变更历史
-        history = AccountHistory(
-            account_id=account_id,
-            field_name='sold_status',
-            old_value=old_status,
-            new_value=new_status
-        )
-        db.session.add(history)
-        db.session.commit()
+        changed_at = datetime.now()
+        history_writer.record([{
+            'account_id': account_id,
+            'field_name': 'sold_status',
+            'old_value': old_status,
+            'new_value': new_status,
+            'changed_at': changed_at
+        }])
+        
+        # 更新出售统计
+        StatsService.adjust({sold_key(old_status): -1, sold_key(new_status): 1})
+        if new_status == 'sold':
+            StatsService.record_sales(changed_at.date(), sold=1)
+        else:
+            StatsService.record_sales(changed_at.date(), unsold=1)
+        AccountService._commit_changes()
         
         return account.to_dict()
     
+    @staticmethod
+    def get_account_history(account_id):
+        """
+        获取账号修改历史记录（按时间倒序）
+        
+        Args:
+            account_id: 账号ID
+        
+        Returns:
+            历史记录字典列表（与缓存共享，调用方不得修改）
+        """
+        def load():
+            columns = AccountHistory.serialized_columns()
+            stmt = db.select(*columns, db.cast(AccountHistory.changed_at, db.String))\
+                .where(AccountHistory.account_id == account_id)\
+                .order_by(AccountHistory.changed_at.desc(), AccountHistory.id.desc())
+            rows = db.session.execute(stmt).all()
+            if HistoryArchiveService.may_have_archived(account_id):
+                rows = AccountService._merge_archived(rows, HistoryArchiveService.fetch(account_id))
+            keys = [column.key for column in columns]
+            return [dict(zip(keys, row)) for row in rows]
+        
+        key = AccountService._cache_key('history', account_id)
+        return account_cache.get_or_load(key, load)
+    
+    @staticmethod
+    def get_account_history_page(account_id, cursor=None, limit=DEFAULT_HISTORY_PAGE_SIZE):
+        """
+        按 (changed_at, id) 倒序键集分页获取账号修改历史
+        
+        先查询主库；主库记录不足一页，或账号归档记录中最新的修改时间不早于本页之后的第一条主库记录时，
+        才用同一游标查询归档文件并合并，翻页时透明地延续到归档记录。
+        
+        Args:
+            account_id: 账号ID
+            cursor: 上一页返回的游标（为空表示第一页）
+            limit: 每页条数
+        
+        Returns:
+            包含 items、nextCursor 的字典（与缓存共享，调用方不得修改）
+        
+        Raises:
+            ValueError: 游标无效
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        
+        def load():
+            columns = AccountHistory.serialized_columns()
+            stmt = db.select(*columns, db.cast(AccountHistory.changed_at, db.String))\
+                .where(AccountHistory.account_id == account_id)
+            position = None
+            if cursor:
+                position = AccountService._decode_cursor(cursor)
+                stmt = stmt.where(db.tuple_(AccountHistory.changed_at, AccountHistory.id) < position)
+            stmt = stmt.order_by(AccountHistory.changed_at.desc(), AccountHistory.id.desc())\
+                .limit(limit + 1)
+            rows = db.session.execute(stmt).all()
+            # 主库多取的一条决定了本页范围：归档记录都比它旧时不会出现在本页
+            boundary = rows[limit][-1] if len(rows) > limit else None
+            if HistoryArchiveService.may_have_archived(
+                    account_id, datetime.fromisoformat(boundary) if boundary else None):
+                rows = AccountService._merge_archived(
+                    rows, HistoryArchiveService.fetch(account_id, position, limit + 1)
+                )
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            
+            keys = [column.key for column in columns]
+            next_cursor = None
+            if has_more:
+                last = rows[-1]
+                next_cursor = AccountService._encode_cursor(last[-1], last.id)
+            return {
+                'items': [dict(zip(keys, row)) for row in rows],
+                'nextCursor': next_cursor
+            }
+        
+        key = AccountService._cache_key('history_page', account_id, cursor or '', limit)
+        return account_cache.get_or_load(key, load)
+    
+    @staticmethod
+    def search_history(filters=None, cursor=None, limit=DEFAULT_HISTORY_PAGE_SIZE):
+        """
+        跨账号查询修改历史（按 changed_at, id 倒序键集分页，只查询主库）
+        
+        Args:
+            filters: 筛选条件字典
+                fields: 字段名列表（见 HISTORY_FIELDS）
+                start_date / end_date: YYYY-MM-DD，结束日期包含当天
+                account_ids: 账号ID列表
+            cursor: 上一页返回的游标（为空表示第一页）
+            limit: 每页条数
+        
+        Returns:
+            包含 items（附带账号邮箱）、nextCursor 的字典（与缓存共享，调用方不得修改）
+        
+        Raises:
+            ValueError: 筛选条件或游标无效
+        """
+        filters = filters or {}
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        
+        fields = tuple(filters.get('fields') or ())
+        unknown = [f for f in fields if f not in HISTORY_FIELDS]
+        if unknown:
+            raise ValueError(f"不支持的字段: {', '.join(unknown)}")
+        
+        account_ids = filters.get('account_ids') or ()
+        if len(account_ids) > MAX_PAGE_SIZE:
+            raise ValueError(f'单次最多查询 {MAX_PAGE_SIZE} 个账号的历史记录')
+        try:
+            account_ids = tuple(sorted({int(i) for i in account_ids}))
+        except (TypeError, ValueError):
+            raise ValueError('账号ID格式错误')
+        
+        conditions = []
+        if fields:
+            conditions.append(AccountHistory.field_name.in_(fields))
+        if account_ids:
+            conditions.append(AccountHistory.account_id.in_(account_ids))
+        if filters.get('start_date'):
+            start = AccountService._parse_date(filters['start_date'], '开始日期')
+            conditions.append(AccountHistory.changed_at >= start)
+        if filters.get('end_date'):
+            # 结束日期包含当天
+            end = AccountService._parse_date(filters['end_date'], '结束日期')
+            conditions.append(AccountHistory.changed_at < end + timedelta(days=1))
+        if cursor:
+            conditions.append(
+                db.tuple_(AccountHistory.changed_at, AccountHistory.id)
+                < AccountService._decode_cursor(cursor)
+            )
+        
+        def load():
+            columns = AccountHistory.serialized_columns()
+            columns.insert(2, Account.email.label('email'))
+            stmt = db.select(*columns, db.cast(AccountHistory.changed_at, db.String))\
+                .select_from(AccountHistory)\
+                .outerjoin(Account, Account.id == AccountHistory.account_id)\
+                .where(*conditions)\
+                .order_by(AccountHistory.changed_at.desc(), AccountHistory.id.desc())\
+                .limit(limit + 1)
+            rows = db.session.execute(stmt).all()
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            
+            keys = [column.key for column in columns]
+            next_cursor = None
+            if has_more:
+                last = rows[-1]
+                next_cursor = AccountService._encode_cursor(last[-1], last.id)
+            return {
+                'items': [dict(zip(keys, row)) for row in rows],
+                'nextCursor': next_cursor
+            }
+        
+        key = AccountService._cache_key(
+            'history_search', fields, account_ids, filters.get('start_date') or '',
+            filters.get('end_date') or '', cursor or '', limit
+        )
+        return account_cache.get_or_load(key, load)
+    
+    @staticmethod
+    def _merge_archived(rows, archived):
+        """
+        合并主库与归档的历史记录行（两者均按时间倒序，行末为原始时间文本）
+        
+        Returns:
+            按 (changed_at, id) 倒序排列的行列表
+        """
+        if not archived:
+            return rows
+        return sorted(rows + archived, key=lambda row: (row[-1] or '', row.id), reverse=True)
+    
+    @staticmethod
+    def get_latest_history(account_ids, limit=5):
+        """
+        一次查询获取多个账号各自最近的修改记录
+        
+        只查询主库：归档的记录都不在各字段最近的保留条数之内。
+        
+        Args:
+            account_ids: 账号ID列表
+            limit: 每个账号返回的条数
+        
+        Returns:
+            账号ID（字符串）-> 历史记录列表（按时间倒序）的字典，
+            没有记录的账号对应空列表（与缓存共享，调用方不得修改）
+        
+        Raises:
+            ValueError: ID 格式错误或数量超限
+        """
+        if len(account_ids) > MAX_PAGE_SIZE:
+            raise ValueError(f'单次最多获取 {MAX_PAGE_SIZE} 个账号的历史记录')
+        try:
+            account_ids = sorted({int(i) for i in account_ids})
+        except (TypeError, ValueError):
+            raise ValueError('账号ID格式错误')
+        limit = max(1, min(limit, MAX_HISTORY_PER_ACCOUNT))
+        
+        def load():
+            result = {str(i): [] for i in account_ids}
+            if not account_ids:
+                return result
+            
+            # 对每个账号用关联子查询沿 (account_id, changed_at) 索引倒序取前 limit 条 ID，
+            # 避免窗口函数对全部记录排序
+            recent = db.aliased(AccountHistory)
+            latest_ids = db.select(recent.id)\
+                .where(recent.account_id == Account.id)\
+                .order_by(recent.changed_at.desc(), recent.id.desc())\
+                .limit(limit)
+            columns = AccountHistory.serialized_columns()
+            stmt = db.select(*columns, db.cast(AccountHistory.changed_at, db.String))\
+                .select_from(Account)\
+                .join(AccountHistory, AccountHistory.id.in_(latest_ids))\
+                .where(Account.id.in_(account_ids))
+            rows = db.session.execute(stmt).all()
+            rows.sort(key=lambda row: (row[-1], row.id), reverse=True)
+            keys = [column.key for column in columns]
+            for row in rows:
+                result[str(row.accountId)].append(dict(zip(keys, row)))
+            return result
+        
+        key = AccountService._cache_key('history_latest', tuple(account_ids), limit)
+        return account_cache.get_or_load(key, load)
+    
+    @staticmethod
+    def parse_2fa_ids(account_ids):
+        """
+        校验批量获取验证码的账号ID列表
+        
+        Args:
+            account_ids: 账号ID列表
+        
+        Returns:
+            整数账号ID列表
+        
+        Raises:
+            ValueError: ID 格式错误或数量超限
+        """
+        if len(account_ids) > MAX_PAGE_SIZE:
+            raise ValueError(f'单次最多获取 {MAX_PAGE_SIZE} 个账号的验证码')
+        try:
+            return [int(i) for i in account_ids]
+        except (TypeError, ValueError):
+            raise ValueError('账号ID格式错误')
+    
+    @staticmethod
+    def load_2fa_codes(account_ids, now):
+        """
+        通过一次 IN 查询读取密钥，计算当前及下一时间窗口的验证码
+        
+        Args:
+            account_ids: 账号ID集合
+            now: 计算验证码的时间戳
+        
+        Returns:
+            账号ID -> {id, code, nextCode} 的字典（未配置或密钥无效的账号不包含在内）
+        """
+        if not account_ids:
+            return {}
+        rows = db.session.execute(
+            db.select(Account.id, Account.secret).where(Account.id.in_(list(account_ids)))
+        ).all()
+        
+        codes = {}
+        for account_id, secret in rows:
+            if not secret:
+                continue
+            try:
+                codes[account_id] = {
+                    'id': account_id,
+                    'code': generate_totp(secret, now, account_id),
+                    'nextCode': generate_totp(secret, now + 30, account_id)
+                }
+            except ValueError:
+                continue
+        return codes
+    
+    @staticmethod
+    def build_2fa_payload(account_ids, codes, now):
+        """
+        按请求的账号ID组装批量验证码结果
+        
+        Args:
+            account_ids: 请求的账号ID列表
+            codes: load_2fa_codes 的返回值（可包含其他账号）
+            now: 计算验证码的时间戳
+        
+        Returns:
+            包含 codes（[{id, code, nextCode}]）、expiry（当前验证码剩余秒数）
+            和 missing（不存在、未配置或密钥无效的账号ID）的字典
+        """
+        return {
+            'codes': [codes[i] for i in account_ids if i in codes],
+            'expiry': get_remaining_seconds(now),
+            'missing': [i for i in account_ids if i not in codes]
+        }
+    
+    @staticmethod
+    def get_2fa_codes(account_ids):
+        """
+        批量获取多个账号的当前及下一时间窗口的 2FA 验证码
+        
+        所有密钥通过一次 IN 查询读取，验证码基于同一时间点计算。
+        
+        Args:
+            account_ids: 账号ID列表
+        
+        Returns:
+            验证码结果字典（见 build_2fa_payload）
+        
+        Raises:
+            ValueError: ID 格式错误或数量超限
+        """
+        account_ids = AccountService.parse_2fa_ids(account_ids)
+        now = time.time()
+        codes = AccountService.load_2fa_codes(set(account_ids), now)
+        return AccountService.build_2fa_payload(account_ids, codes, now)
+    
     @staticmethod
     def get_2fa_code(account_id):
         """
@@ -293,7 +1274,7 @@ class AccountService:
             return None
         
         try:
-            code = generate_totp(account.secret)
+            code = generate_totp(account.secret, account_id=account.id)
             remaining = get_remaining_seconds()
             
             return {
@@ -2,9 +2,15 @@
 认证服务模块
 处理管理员登录和 IP 封禁逻辑
 """
-import time
+import base64
 import hashlib
-from threading import Lock
+import hmac
+import time
+from functools import lru_cache
+
+from flask import current_app
+
+from app.utils.attempt_store import MemoryAttemptStore, SqliteAttemptStore
 
 # 管理员密码（可以修改为您想要的密码）
 ADMIN_PASSWORD = "admin123"
@@ -12,18 +18,50 @@ ADMIN_PASSWORD = "admin123"
 # IP 封禁配置
 MAX_FAILED_ATTEMPTS = 3  # 最大失败次数
 BAN_DURATION = 24 * 60 * 60  # 封禁时长（秒）= 24小时
+ATTEMPT_WINDOW = 60 * 60  # 距上次失败超过该时长（秒）后重新计数
 
 # 盐值验证有效时间范围（秒）- 允许前后 60 秒的误差
 SALT_VALID_RANGE = 10
 
-# 存储登录尝试记录 {ip: {'attempts': 0, 'last_attempt': timestamp, 'banned_until': timestamp}}
-login_attempts = {}
-lock = Lock()
+# 登录令牌的 Cookie 名称及签名版本
+AUTH_COOKIE = 'auth_token'
+TOKEN_VERSION = 'v1'
+
+# 登录尝试记录存储（由 init_app 按配置替换）
+_store = MemoryAttemptStore(ATTEMPT_WINDOW, MAX_FAILED_ATTEMPTS, BAN_DURATION)
 
 
 class AuthService:
     """认证服务类"""
     
+    @staticmethod
+    def init_app(app):
+        """
+        按配置创建登录尝试记录存储
+        
+        LOGIN_ATTEMPT_STORE 为 sqlite 时使用多进程共享的 SQLite 文件，
+        为 memory 时使用进程内存储（封禁只在当前进程有效，重启后清空）。
+        
+        Args:
+            app: Flask 应用实例
+        
+        Raises:
+            ValueError: 存储类型无效
+        """
+        global _store
+        kind = app.config['LOGIN_ATTEMPT_STORE']
+        max_entries = app.config['LOGIN_ATTEMPT_MAX_ENTRIES']
+        if kind == 'sqlite':
+            _store = SqliteAttemptStore(
+                app.config['LOGIN_ATTEMPT_DB'], ATTEMPT_WINDOW, MAX_FAILED_ATTEMPTS,
+                BAN_DURATION, max_entries=max_entries, pragmas=app.config['SQLITE_PRAGMAS']
+            )
+        elif kind == 'memory':
+            _store = MemoryAttemptStore(ATTEMPT_WINDOW, MAX_FAILED_ATTEMPTS, BAN_DURATION,
+                                        max_entries=max_entries)
+        else:
+            raise ValueError(f'不支持的登录尝试记录存储: {kind}')
+    
     @staticmethod
     def is_ip_banned(ip):
         """
@@ -35,18 +73,11 @@ class AuthService:
         Returns:
             (is_banned, remaining_seconds) 元组
         """
-        with lock:
-            if ip not in login_attempts:
-                return False, 0
-            
-            record = login_attempts[ip]
-            banned_until = record.get('banned_until', 0)
-            
-            if banned_until > time.time():
-                remaining = int(banned_until - time.time())
-                return True, remaining
-            
-            return False, 0
+        now = time.time()
+        banned_until = _store.banned_until(ip, now)
+        if banned_until:
+            return True, int(banned_until - now)
+        return False, 0
     
     @staticmethod
     def record_failed_attempt(ip):
@@ -59,31 +90,10 @@ class AuthService:
         Returns:
             (is_now_banned, remaining_attempts) 元组
         """
-        with lock:
-            current_time = time.time()
-            
-            if ip not in login_attempts:
-                login_attempts[ip] = {
-                    'attempts': 0,
-                    'last_attempt': 0,
-                    'banned_until': 0
-                }
-            
-            record = login_attempts[ip]
-            
-            # 如果距离上次尝试超过1小时，重置计数
-            if current_time - record['last_attempt'] > 3600:
-                record['attempts'] = 0
-            
-            record['attempts'] += 1
-            record['last_attempt'] = current_time
-            
-            if record['attempts'] >= MAX_FAILED_ATTEMPTS:
-                record['banned_until'] = current_time + BAN_DURATION
-                return True, 0
-            
-            remaining = MAX_FAILED_ATTEMPTS - record['attempts']
-            return False, remaining
+        banned_until, attempts = _store.record_failure(ip, time.time())
+        if banned_until:
+            return True, 0
+        return False, MAX_FAILED_ATTEMPTS - attempts
     
     @staticmethod
     def clear_failed_attempts(ip):
@@ -93,13 +103,7 @@ class AuthService:
         Args:
             ip: 客户端 IP 地址
         """
-        with lock:
-            if ip in login_attempts:
-                login_attempts[ip] = {
-                    'attempts': 0,
-                    'last_attempt': 0,
-                    'banned_until': 0
-                }
+        _store.clear(ip)
     
     @staticmethod
     def verify_password(password):
@@ -157,14 +161,81 @@ class AuthService:
         Returns:
             封禁的 IP 列表
         """
-        with lock:
-            current_time = time.time()
-            banned = []
-            for ip, record in login_attempts.items():
-                if record.get('banned_until', 0) > current_time:
-                    banned.append({
-                        'ip': ip,
-                        'banned_until': record['banned_until'],
-                        'remaining': int(record['banned_until'] - current_time)
-                    })
-            return banned
+        now = time.time()
+        return [{
+            'ip': ip,
+            'banned_until': banned_until,
+            'remaining': int(banned_until - now)
+        } for ip, banned_until in _store.bans(now)]
+    
+    @staticmethod
+    def issue_token(now=None):
+        """
+        签发登录令牌
+        
+        令牌格式为 "版本.过期时间戳.签名"，签名为 HMAC-SHA256，密钥由 SECRET_KEY 和
+        管理员密码派生：任一项修改后已签发的令牌全部失效。
+        
+        Args:
+            now: 签发时间戳（默认当前时间）
+        
+        Returns:
+            (token, expires_at) 元组
+        """
+        now = int(time.time() if now is None else now)
+        expires_at = now + current_app.config['AUTH_TOKEN_TTL']
+        payload = f'{TOKEN_VERSION}.{expires_at}'
+        return f'{payload}.{AuthService._sign(payload)}', expires_at
+    
+    @staticmethod
+    def verify_token(token, now=None):
+        """
+        校验登录令牌（只做一次 HMAC 计算，不查询数据库或共享状态）
+        
+        Args:
+            token: 客户端提交的令牌
+            now: 校验时间戳（默认当前时间）
+        
+        Returns:
+            令牌签名有效且未过期时返回 True
+        """
+        expires_at = AuthService.token_expires_at(token)
+        return expires_at is not None and expires_at > (time.time() if now is None else now)
+    
+    @staticmethod
+    def token_expires_at(token):
+        """
+        读取登录令牌的过期时间（不判断是否已过期）
+        
+        Args:
+            token: 客户端提交的令牌
+        
+        Returns:
+            签名有效时返回过期时间戳，否则返回 None
+        """
+        if not token:
+            return None
+        try:
+            version, expires_at, signature = token.split('.')
+            expires_at = int(expires_at)
+        except ValueError:
+            return None
+        if version != TOKEN_VERSION:
+            return None
+        expected = AuthService._sign(f'{version}.{expires_at}')
+        if not hmac.compare_digest(signature, expected):
+            return None
+        return expires_at
+    
+    @staticmethod
+    def _sign(payload):
+        """计算令牌签名（URL 安全的 base64，无填充）"""
+        key = _token_key(current_app.config['SECRET_KEY'], ADMIN_PASSWORD)
+        digest = hmac.new(key, payload.encode(), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).decode().rstrip('=')
+
+
+@lru_cache(maxsize=4)
+def _token_key(secret_key, password):
+    """由 SECRET_KEY 和管理员密码派生令牌签名密钥"""
+    return hashlib.sha256(f'auth-token\0{secret_key}\0{password}'.encode()).digest()
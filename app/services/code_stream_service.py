@@ -0,0 +1,135 @@
+"""
+2FA 验证码推送服务模块
+客户端通过 SSE 订阅一组账号，后台线程在每个 30 秒窗口开始时
+用一次查询计算所有订阅账号的验证码，再分发给各订阅者。
+负载只随时间窗口数增长，与客户端数量无关
+"""
+import time
+from queue import Queue, Empty, Full
+from threading import Lock, Thread
+
+from app.services.account_service import AccountService
+from app.utils.totp import INTERVAL
+
+# 每个订阅者最多积压的推送数（客户端读取过慢时丢弃最旧的推送）
+QUEUE_SIZE = 2
+
+# 窗口切换后延迟推送的时间（秒），避免因时钟精度落在上一个窗口
+BOUNDARY_DELAY = 0.05
+
+
+class Subscription:
+    """单个客户端的订阅"""
+    __slots__ = ('account_ids', 'queue')
+
+    def __init__(self, account_ids):
+        self.account_ids = account_ids
+        self.queue = Queue(maxsize=QUEUE_SIZE)
+
+    def push(self, payload):
+        """写入推送，队列已满时丢弃最旧的一条"""
+        while True:
+            try:
+                self.queue.put_nowait(payload)
+                return
+            except Full:
+                try:
+                    self.queue.get_nowait()
+                except Empty:
+                    pass
+
+    def get(self, timeout):
+        """
+        等待下一条推送
+
+        Returns:
+            验证码结果字典；超时返回 None
+        """
+        try:
+            return self.queue.get(timeout=timeout)
+        except Empty:
+            return None
+
+
+class CodeBroadcaster:
+    """
+    验证码广播器
+
+    有订阅者时运行一个后台线程，每个窗口开始时计算所有订阅账号的并集，
+    没有订阅者时线程自动退出，下次订阅时重新启动。
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._subscribers = set()
+        self._thread = None
+        self.app = None
+        self.broadcasts = 0
+
+    def init_app(self, app):
+        """绑定应用（后台线程在该应用上下文中查询数据库）"""
+        self.app = app
+
+    def subscribe(self, account_ids):
+        """
+        订阅账号验证码
+
+        Args:
+            account_ids: 账号ID列表
+
+        Returns:
+            Subscription 实例
+        """
+        subscription = Subscription(account_ids)
+        with self._lock:
+            self._subscribers.add(subscription)
+            if self._thread is None:
+                self._thread = Thread(target=self._loop, name='code-broadcaster', daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """取消订阅（客户端断开连接时调用）"""
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def stats(self):
+        """广播统计信息"""
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'accounts': len(set().union(*(s.account_ids for s in self._subscribers))),
+                'broadcasts': self.broadcasts
+            }
+
+    def _loop(self):
+        """等待每个窗口开始并广播，没有订阅者时退出"""
+        while True:
+            now = time.time()
+            boundary = (int(now) // INTERVAL + 1) * INTERVAL
+            time.sleep(boundary - now + BOUNDARY_DELAY)
+
+            with self._lock:
+                subscribers = list(self._subscribers)
+                if not subscribers:
+                    self._thread = None
+                    return
+
+            try:
+                self._broadcast(subscribers, max(time.time(), boundary))
+            except Exception:
+                self.app.logger.exception('2FA 验证码广播失败')
+
+    def _broadcast(self, subscribers, now):
+        """计算订阅账号并集的验证码并分发"""
+        account_ids = set().union(*(s.account_ids for s in subscribers))
+        with self.app.app_context():
+            codes = AccountService.load_2fa_codes(account_ids, now)
+
+        for subscription in subscribers:
+            subscription.push(AccountService.build_2fa_payload(subscription.account_ids, codes, now))
+        self.broadcasts += 1
+
+
+# 全局广播器实例
+code_broadcaster = CodeBroadcaster()
@@ -0,0 +1,262 @@
+"""
+历史记录归档服务模块
+按保留策略将较旧的历史记录移入独立的 SQLite 归档文件，使主库中的
+account_history 保持较小并常驻页缓存；读取历史时与归档记录合并
+"""
+import os
+from datetime import datetime, timedelta
+from threading import Lock
+
+from flask import current_app
+from sqlalchemy import (
+    MetaData, Table, Column, Index, Integer, String, Text, DateTime,
+    create_engine, bindparam, column, table, text
+)
+
+from app import db
+from app.models.account_history import AccountHistory, ArchivedHistoryMark
+from app.models.data_version import DataVersion
+
+# 参与归档的字段（出售状态记录用于重建每日销量统计，始终保留在主库）
+ARCHIVE_FIELDS = ('password', 'secret', 'recovery')
+
+# 每批移动的记录数
+ARCHIVE_BATCH_SIZE = 2000
+
+# 归档任务中 ATTACH 归档文件使用的库名
+_SCHEMA = 'history_archive'
+
+# 归档文件中的表结构（主键沿用原记录 ID，重复归档不会产生重复记录）
+archive_metadata = MetaData()
+archived_history = Table(
+    'account_history', archive_metadata,
+    Column('id', Integer, primary_key=True),
+    Column('account_id', Integer, nullable=False),
+    Column('field_name', String(50), nullable=False),
+    Column('old_value', Text),
+    Column('new_value', Text),
+    Column('changed_at', DateTime),
+    Index('ix_archived_history_account_changed', 'account_id', 'changed_at')
+)
+
+# 归档任务使用的临时表（保存本次需要归档的记录 ID）
+_candidates = table('history_archive_ids', column('id'), schema='temp')
+
+# 归档文件引擎（按路径缓存）
+_engines = {}
+_engines_lock = Lock()
+
+
+class HistoryArchiveService:
+    """历史记录归档服务类"""
+
+    @staticmethod
+    def archive_path():
+        """归档文件路径（未配置时为空）"""
+        return current_app.config.get('HISTORY_ARCHIVE_PATH') or None
+
+    @staticmethod
+    def _engine(create=False):
+        """
+        获取归档文件引擎
+
+        Args:
+            create: 归档文件不存在时是否创建
+
+        Returns:
+            SQLAlchemy 引擎；未配置或文件不存在（且不创建）时返回 None
+        """
+        path = HistoryArchiveService.archive_path()
+        if not path or (not create and not os.path.exists(path)):
+            return None
+        with _engines_lock:
+            engine = _engines.get(path)
+            if engine is None:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                engine = create_engine(f'sqlite:///{path}')
+                archive_metadata.create_all(engine)
+                _engines[path] = engine
+        return engine
+
+    @staticmethod
+    def fetch(account_id, cursor=None, limit=None):
+        """
+        读取账号的归档历史记录（按 changed_at, id 倒序）
+
+        返回的每行列名与 AccountHistory.serialized_columns() 一致，
+        末尾额外附带原始时间文本，供与主库记录合并排序和生成游标。
+
+        Args:
+            account_id: 账号ID
+            cursor: (changed_at, id) 元组，只返回排在其后的记录
+            limit: 最多返回的条数
+
+        Returns:
+            行列表；没有归档文件时返回空列表
+        """
+        engine = HistoryArchiveService._engine()
+        if engine is None:
+            return []
+
+        t = archived_history.c
+        stmt = db.select(
+            t.id.label('id'),
+            t.account_id.label('accountId'),
+            t.field_name.label('fieldName'),
+            t.old_value.label('oldValue'),
+            t.new_value.label('newValue'),
+            db.func.substr(db.cast(t.changed_at, db.String), 1, 19).label('changedAt'),
+            db.cast(t.changed_at, db.String)
+        ).where(t.account_id == account_id)
+        if cursor:
+            stmt = stmt.where(db.tuple_(t.changed_at, t.id) < cursor)
+        stmt = stmt.order_by(t.changed_at.desc(), t.id.desc())
+        if limit:
+            stmt = stmt.limit(limit)
+
+        with engine.connect() as conn:
+            return conn.execute(stmt).all()
+
+    @staticmethod
+    def newest_per_account():
+        """
+        读取每个账号已归档记录中最新的修改时间（用于补全 archived_history_marks）
+
+        Returns:
+            [{account_id, newest_changed_at}] 列表；没有归档文件时返回空列表
+        """
+        engine = HistoryArchiveService._engine()
+        if engine is None:
+            return []
+
+        t = archived_history.c
+        stmt = db.select(t.account_id, db.func.max(t.changed_at).label('newest_changed_at'))\
+            .group_by(t.account_id)
+        with engine.connect() as conn:
+            return [dict(row._mapping) for row in conn.execute(stmt)]
+
+    @staticmethod
+    def may_have_archived(account_id, before=None):
+        """
+        账号是否可能有（早于 before 的）归档记录
+
+        只查询主库中的 archived_history_marks，不打开归档文件；
+        标记尚未补全（迁移未执行）时总是返回 True。
+
+        Args:
+            account_id: 账号ID
+            before: 修改时间；为空时只判断是否有归档记录
+
+        Returns:
+            需要查询归档文件时返回 True
+        """
+        if not current_app.extensions.get('archive_marks'):
+            return True
+        newest = db.session.execute(
+            db.select(ArchivedHistoryMark.newest_changed_at)
+            .where(ArchivedHistoryMark.account_id == account_id)
+        ).scalar()
+        if newest is None:
+            return False
+        return before is None or newest >= before
+
+    @staticmethod
+    def archive(retain_per_field, retain_days, batch_size=ARCHIVE_BATCH_SIZE):
+        """
+        将超出保留策略的历史记录移入归档文件
+
+        同时满足以下条件的记录会被归档：不在该账号该字段最近 retain_per_field 条之内，
+        且早于 retain_days 天前。每批先写入归档再从主库删除，中途中断后重新执行即可。
+        同一批中更新 archived_history_marks，最后清理归档中账号已不存在的记录及其标记。
+
+        Args:
+            retain_per_field: 每个账号每个字段保留的最近记录数
+            retain_days: 保留最近多少天内的全部记录
+            batch_size: 每批移动的记录数
+
+        Returns:
+            包含 archived（归档条数）和 purged（清理的孤立归档条数）的字典
+
+        Raises:
+            ValueError: 未配置归档文件或参数无效
+        """
+        if retain_per_field < 0 or retain_days < 0:
+            raise ValueError('保留条数和保留天数不能为负数')
+        if not current_app.extensions.get('archive_marks'):
+            raise ValueError('归档标记尚未创建，请先运行 flask --app run migrate')
+        if HistoryArchiveService._engine(create=True) is None:
+            raise ValueError('未配置历史归档文件 HISTORY_ARCHIVE_PATH')
+
+        cutoff = datetime.now() - timedelta(days=retain_days)
+        rank = db.func.row_number().over(
+            partition_by=(AccountHistory.account_id, AccountHistory.field_name),
+            order_by=(AccountHistory.changed_at.desc(), AccountHistory.id.desc())
+        ).label('rank')
+        ranked = db.select(AccountHistory.id, AccountHistory.changed_at, rank)\
+            .where(AccountHistory.field_name.in_(ARCHIVE_FIELDS))\
+            .subquery()
+        candidates = db.select(ranked.c.id)\
+            .where(ranked.c.rank > retain_per_field, ranked.c.changed_at < cutoff)
+
+        copy_rows = text(
+            f'INSERT OR IGNORE INTO {_SCHEMA}.account_history '
+            '(id, account_id, field_name, old_value, new_value, changed_at) '
+            'SELECT id, account_id, field_name, old_value, new_value, changed_at '
+            'FROM main.account_history WHERE id IN :ids'
+        ).bindparams(bindparam('ids', expanding=True))
+        update_marks = text(
+            f'INSERT INTO main.{ArchivedHistoryMark.__tablename__} (account_id, newest_changed_at) '
+            'SELECT account_id, max(changed_at) FROM main.account_history '
+            'WHERE id IN :ids GROUP BY account_id '
+            'ON CONFLICT(account_id) DO UPDATE SET '
+            'newest_changed_at = max(newest_changed_at, excluded.newest_changed_at)'
+        ).bindparams(bindparam('ids', expanding=True))
+
+        archived = 0
+        with db.engine.connect() as conn:
+            # ATTACH/DETACH 不能在事务中执行，直接使用底层连接
+            raw = conn.connection.driver_connection
+            raw.execute(f'ATTACH DATABASE ? AS {_SCHEMA}', (HistoryArchiveService.archive_path(),))
+            try:
+                # 先一次性算出候选 ID，避免每批重复执行窗口函数
+                conn.exec_driver_sql('CREATE TEMP TABLE history_archive_ids (id INTEGER PRIMARY KEY)')
+                conn.execute(db.insert(_candidates).from_select(['id'], candidates))
+                conn.commit()
+
+                last_id = 0
+                while True:
+                    ids = conn.execute(
+                        db.select(_candidates.c.id).where(_candidates.c.id > last_id)
+                        .order_by(_candidates.c.id).limit(batch_size)
+                    ).scalars().all()
+                    if not ids:
+                        break
+                    last_id = ids[-1]
+                    conn.execute(copy_rows, {'ids': ids})
+                    conn.execute(update_marks, {'ids': ids})
+                    conn.execute(db.delete(AccountHistory.__table__)
+                                 .where(AccountHistory.__table__.c.id.in_(ids)))
+                    conn.commit()
+                    archived += len(ids)
+
+                purged = conn.exec_driver_sql(
+                    f'DELETE FROM {_SCHEMA}.account_history '
+                    'WHERE account_id NOT IN (SELECT id FROM main.accounts)'
+                ).rowcount
+                conn.exec_driver_sql(
+                    f'DELETE FROM main.{ArchivedHistoryMark.__tablename__} '
+                    'WHERE account_id NOT IN (SELECT id FROM main.accounts)'
+                )
+                conn.commit()
+            finally:
+                conn.rollback()
+                raw.execute('DROP TABLE IF EXISTS temp.history_archive_ids')
+                raw.execute(f'DETACH DATABASE {_SCHEMA}')
+
+        if archived:
+            from app.services.account_service import account_cache
+
+            DataVersion.bump()
+            db.session.commit()
+            account_cache.clear()
+        return {'archived': archived, 'purged': purged}
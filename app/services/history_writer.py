@@ -0,0 +1,390 @@
+"""
+历史记录写入模块
+默认与账号修改在同一事务中写入历史记录。开启写后缓冲（HISTORY_WRITE_BEHIND）且服务进程启动写入器后，
+历史记录在账号修改提交前追加到本地日志段文件并落盘，提交后进入内存缓冲区，由后台线程
+每隔一段时间或积累一定数量后批量写入数据库，缩短用户请求持有 SQLite 写锁的时间。
+事务回滚时在日志段中追加回滚标记；进程崩溃后未写入的记录在下次启动时从日志段恢复
+"""
+import atexit
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+from threading import Condition, Thread
+
+try:
+    import fcntl
+except ImportError:  # Windows 不支持 flock
+    fcntl = None
+
+from sqlalchemy import event
+
+from app import db
+from app.models.account import Account
+from app.models.account_history import AccountHistory
+from app.utils.sqlite_tuning import use_write_engine
+
+# 没有文件锁时，超过该时间（秒）未修改的日志段视为所属进程已退出
+STALE_SECONDS = 120
+
+# 批量写入及去重查询时每条语句的记录数（受 SQLite 参数个数限制）
+WRITE_CHUNK_SIZE = 500
+
+# 会话中等待提交后写入的历史记录
+_PENDING_KEY = 'pending_history'
+
+# 会话中已写入日志、等待事务结束的 (事务标识, 历史记录)
+_JOURNALED_KEY = 'journaled_history'
+
+
+class HistoryWriter:
+    """
+    历史记录写入器
+
+    - record() 在业务会话中调用；同步模式直接插入，写后缓冲模式暂存到会话
+    - 会话提交前暂存的记录带事务标识写入日志段并 fsync，提交后进入缓冲区；
+      提交失败或回滚时追加回滚标记，恢复时跳过该事务的记录
+    - 缓冲区超过上限或日志写入失败时，退回为在同一事务中直接写入数据库
+    - 每次批量写入成功后删除对应的日志段（仍有事务未结束的日志段保留到下次），失败则保留并重试
+    """
+
+    def __init__(self):
+        self._cond = Condition()
+        self._buffer = []
+        self._segment = None
+        self._segments = []
+        self._open_tx = {}  # 已写入日志、尚未提交或回滚的事务标识 -> 所在日志段
+        self._thread = None
+        self._running = False
+        self._token = uuid.uuid4().hex[:12]
+        self._seq = 0
+        self._tx_seq = 0
+        self.app = None
+        self.enabled = False
+        self.flush_interval = 0.2
+        self.flush_batch = 500
+        self.queue_max = 10000
+        self.journal_dir = None
+        self.flushed = 0
+        self.batches = 0
+        self.overflow = 0
+        self.failures = 0
+        self.replayed = 0
+        self.last_flush_ms = 0.0
+
+    def init_app(self, app):
+        """
+        读取配置（不访问文件或数据库，也不启动线程）
+
+        Args:
+            app: Flask 应用实例
+        """
+        self.app = app
+        self.enabled = app.config['HISTORY_WRITE_BEHIND']
+        self.flush_interval = app.config['HISTORY_FLUSH_INTERVAL_MS'] / 1000
+        self.flush_batch = app.config['HISTORY_FLUSH_BATCH']
+        self.queue_max = app.config['HISTORY_QUEUE_MAX']
+        self.journal_dir = app.config['HISTORY_JOURNAL_DIR']
+
+    def start(self):
+        """
+        开启写后缓冲时恢复遗留日志段并启动后台线程（由服务进程启动时调用）
+
+        未启动时 record() 与同步模式相同，直接在业务事务中写入，
+        命令行工具等进程不会产生日志段或后台线程。
+        """
+        if not self.enabled:
+            return
+
+        os.makedirs(self.journal_dir, exist_ok=True)
+        with self.app.app_context():
+            self.replay()
+
+        with self._cond:
+            if self._thread is None:
+                self._running = True
+                self._thread = Thread(target=self._loop, name='history-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.shutdown)
+
+    def record(self, events):
+        """
+        记录字段修改历史（在账号修改所在的会话中调用）
+
+        Args:
+            events: 历史记录字典列表（account_id, field_name, old_value, new_value，
+                    可选 changed_at，缺省为当前时间）
+        """
+        if not events:
+            return
+        now = datetime.now()
+        for item in events:
+            item.setdefault('changed_at', now)
+
+        if not self._running:
+            db.session.execute(db.insert(AccountHistory.__table__), events)
+        else:
+            db.session.info.setdefault(_PENDING_KEY, []).extend(events)
+
+    def prepare(self, events):
+        """
+        将事务中的记录写入日志段并落盘（事务提交前调用）
+
+        Args:
+            events: 历史记录字典列表
+
+        Returns:
+            事务标识；缓冲区已满、写后缓冲已停止或日志写入失败时返回 None，
+            调用方应在同一事务中直接写入数据库
+        """
+        with self._cond:
+            if self._running and len(self._buffer) + len(events) <= self.queue_max:
+                self._tx_seq += 1
+                tx = f'{self._token}-{self._tx_seq}'
+                try:
+                    self._journal([dict(item, tx=tx) for item in events])
+                except OSError:
+                    self.app.logger.exception('历史记录日志写入失败，改为直接写入数据库')
+                else:
+                    self._open_tx[tx] = self._segment
+                    return tx
+
+        self.overflow += len(events)
+        return None
+
+    def commit(self, tx, events):
+        """事务已提交：记录加入缓冲区"""
+        with self._cond:
+            self._open_tx.pop(tx, None)
+            self._buffer.extend(events)
+            if len(self._buffer) >= self.flush_batch:
+                self._cond.notify()
+
+    def abort(self, tx):
+        """事务未提交：在日志段中追加回滚标记，恢复时跳过该事务的记录"""
+        with self._cond:
+            segment = self._open_tx.pop(tx, None)
+            if segment is None or segment.closed:
+                return
+            try:
+                self._append(segment, [{'rollback': tx}])
+            except OSError:
+                self.app.logger.exception('历史记录回滚标记写入失败')
+
+    def flush(self):
+        """
+        将缓冲区中的记录批量写入数据库
+
+        Returns:
+            写入的记录数；失败时记录保留在缓冲区，返回 0
+        """
+        with self._cond:
+            events, self._buffer = self._buffer, []
+            if self._segment is not None:
+                self._segments.append(self._segment)
+                self._segment = None
+            # 仍有事务未结束的日志段不能删除，留到下次写入
+            open_segments = set(map(id, self._open_tx.values()))
+            segments = [s for s in self._segments if id(s) not in open_segments]
+            self._segments = [s for s in self._segments if id(s) in open_segments]
+        if not events and not segments:
+            return 0
+
+        started = time.perf_counter()
+        try:
+            with self.app.app_context():
+                self._write(events)
+        except Exception:
+            self.failures += 1
+            with self._cond:
+                self._buffer[:0] = events
+                self._segments[:0] = segments
+            self.app.logger.exception('历史记录批量写入失败，稍后重试')
+            return 0
+
+        for segment in segments:
+            os.remove(segment.name)
+            segment.close()
+        self.flushed += len(events)
+        self.batches += 1
+        self.last_flush_ms = round((time.perf_counter() - started) * 1000, 2)
+        return len(events)
+
+    def shutdown(self):
+        """停止后台线程并写入剩余记录（进程退出时调用）"""
+        with self._cond:
+            if not self._running:
+                return
+            self._running = False
+            self._cond.notify()
+        self._thread.join(timeout=10)
+        self.flush()
+
+    def replay(self):
+        """
+        恢复遗留日志段中的记录（启动时调用）
+
+        仍被其他进程持有的日志段会被跳过；带回滚标记的事务的记录被丢弃；已写入数据库的
+        记录按 (account_id, field_name, changed_at) 去重，重复恢复不会产生重复记录。
+        """
+        for name in sorted(os.listdir(self.journal_dir)):
+            if not name.endswith('.jsonl'):
+                continue
+            path = os.path.join(self.journal_dir, name)
+            with open(path, encoding='utf-8') as f:
+                if not self._is_orphan(f):
+                    continue
+                events, rolled_back = [], set()
+                for line in f:
+                    try:
+                        item = json.loads(line)
+                    except ValueError:
+                        continue  # 崩溃时未写完的最后一行
+                    if 'rollback' in item:
+                        rolled_back.add(item['rollback'])
+                        continue
+                    item['changed_at'] = datetime.fromisoformat(item['changed_at'])
+                    events.append(item)
+                events = [item for item in events if item.pop('tx', None) not in rolled_back]
+                self._write(events, dedupe=True)
+                self.replayed += len(events)
+                os.remove(path)
+
+    def stats(self):
+        """写入统计信息"""
+        with self._cond:
+            depth = len(self._buffer)
+            segments = len(self._segments) + (self._segment is not None)
+        return {
+            'enabled': self.enabled,
+            'queueDepth': depth,
+            'queueMax': self.queue_max,
+            'journalSegments': segments,
+            'flushed': self.flushed,
+            'batches': self.batches,
+            'overflow': self.overflow,
+            'failures': self.failures,
+            'replayed': self.replayed,
+            'lastFlushMs': self.last_flush_ms
+        }
+
+    def _loop(self):
+        """按时间间隔或缓冲数量触发批量写入"""
+        while True:
+            with self._cond:
+                if self._running and len(self._buffer) < self.flush_batch:
+                    self._cond.wait(self.flush_interval)
+                if not self._running:
+                    return
+            self.flush()
+
+    def _journal(self, events):
+        """追加到当前日志段（需持有锁）"""
+        if self._segment is None:
+            self._seq += 1
+            path = os.path.join(self.journal_dir, f'{self._token}-{self._seq:08d}.jsonl')
+            self._segment = open(path, 'a', encoding='utf-8')
+            if fcntl is not None:
+                fcntl.flock(self._segment, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self._append(self._segment, [
+            dict(item, changed_at=item['changed_at'].isoformat()) for item in events
+        ])
+
+    @staticmethod
+    def _append(segment, items):
+        """向日志段追加若干行并 fsync（需持有锁）"""
+        segment.write(''.join(json.dumps(item, ensure_ascii=False) + '\n' for item in items))
+        segment.flush()
+        os.fsync(segment.fileno())
+
+    @staticmethod
+    def _is_orphan(f):
+        """日志段是否已无进程持有"""
+        if fcntl is not None:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except OSError:
+                return False
+        return time.time() - os.path.getmtime(f.name) > STALE_SECONDS
+
+    @staticmethod
+    def _write(events, dedupe=False):
+        """
+        在独立事务中写入历史记录并递增数据版本号
+
+        已删除账号的记录会被丢弃。
+
+        Args:
+            events: 历史记录字典列表
+            dedupe: 是否跳过数据库中已存在的记录（用于日志恢复）
+        """
+        from app.services.account_service import AccountService
+
+        # 账号是否存在的检查与写入在同一个写事务中，避免为刚删除的账号写入记录
+        use_write_engine(db.session)
+        rows = []
+        for start in range(0, len(events), WRITE_CHUNK_SIZE):
+            chunk = events[start:start + WRITE_CHUNK_SIZE]
+            account_ids = set(db.session.execute(
+                db.select(Account.id).where(Account.id.in_({e['account_id'] for e in chunk}))
+            ).scalars())
+            existing = set()
+            if dedupe:
+                existing = set(db.session.execute(
+                    db.select(AccountHistory.account_id, AccountHistory.field_name,
+                              AccountHistory.changed_at)
+                    .where(AccountHistory.changed_at.in_({e['changed_at'] for e in chunk}))
+                ).all())
+            for e in chunk:
+                key = (e['account_id'], e['field_name'], e['changed_at'])
+                if e['account_id'] in account_ids and key not in existing:
+                    rows.append(e)
+                    if dedupe:
+                        existing.add(key)
+
+        if not rows:
+            db.session.rollback()
+            return
+        for start in range(0, len(rows), WRITE_CHUNK_SIZE):
+            db.session.execute(
+                db.insert(AccountHistory.__table__), rows[start:start + WRITE_CHUNK_SIZE]
+            )
+        AccountService._commit_changes()
+
+
+# 全局写入器实例
+history_writer = HistoryWriter()
+
+
+@event.listens_for(db.session, 'before_commit')
+def _journal_pending(session):
+    """提交前将暂存的历史记录写入日志段；无法写入日志时在同一事务中直接插入"""
+    events = session.info.pop(_PENDING_KEY, None)
+    if not events:
+        return
+    tx = history_writer.prepare(events)
+    if tx is None:
+        session.execute(db.insert(AccountHistory.__table__), events)
+    else:
+        session.info[_JOURNALED_KEY] = (tx, events)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _enqueue_journaled(session):
+    """会话提交后将已写入日志的历史记录加入缓冲区"""
+    journaled = session.info.pop(_JOURNALED_KEY, None)
+    if journaled:
+        history_writer.commit(*journaled)
+
+
+@event.listens_for(db.session, 'after_transaction_end')
+def _discard_pending(session, transaction):
+    """事务未提交就结束（回滚、提交失败或关闭会话）时丢弃暂存的记录并标记日志回滚"""
+    if transaction.parent is not None:
+        return
+    session.info.pop(_PENDING_KEY, None)
+    journaled = session.info.pop(_JOURNALED_KEY, None)
+    if journaled:
+        history_writer.abort(journaled[0])
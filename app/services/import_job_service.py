@@ -0,0 +1,270 @@
+"""
+后台导入任务服务模块
+导入数据先写入暂存文件，由线程池按块导入，进度随每块一起提交，
+进程重启后从最后提交的块继续
+"""
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from threading import Lock
+
+from flask import current_app
+
+from app import db
+from app.models.import_job import ImportJob
+from app.services.account_service import AccountService
+from app.utils.import_parser import parse_line, iter_text_lines
+from app.utils.sqlite_tuning import use_write_engine
+
+# 运行中的任务超过该时间（秒）未提交进度，视为所在进程已退出
+STALE_SECONDS = 120
+
+# 线程池及所属应用（由 init_app 设置）
+_app = None
+_executor = None
+_executor_lock = Lock()
+
+
+class ImportJobService:
+    """后台导入任务服务类"""
+
+    @staticmethod
+    def init_app(app):
+        """
+        绑定应用（线程池在第一次提交任务时创建）
+
+        Args:
+            app: Flask 应用实例
+        """
+        global _app
+        _app = app
+
+    @staticmethod
+    def create_from_accounts(accounts, mode='insert'):
+        """
+        创建导入任务（数据为账号字典列表）
+
+        Args:
+            accounts: 账号数据列表
+            mode: 导入模式 insert/upsert
+
+        Returns:
+            任务字典
+        """
+        job_id = uuid.uuid4().hex
+        path = ImportJobService._spool_path(job_id, 'ndjson')
+        with open(path, 'w', encoding='utf-8') as f:
+            for data in accounts:
+                f.write(json.dumps(data, ensure_ascii=False) + '\n')
+        return ImportJobService._create(job_id, path, len(accounts), mode)
+
+    @staticmethod
+    def create_from_stream(stream, mode='insert'):
+        """
+        创建导入任务（数据为原始导入文本或其 gzip 文件）
+
+        上传内容边接收边解压写入暂存文件，不在内存中保留。
+
+        Args:
+            stream: 二进制上传流
+            mode: 导入模式 insert/upsert
+
+        Returns:
+            任务字典
+
+        Raises:
+            DecompressedTooLarge: 解压后的大小超过 IMPORT_MAX_DECOMPRESSED_BYTES
+        """
+        job_id = uuid.uuid4().hex
+        path = ImportJobService._spool_path(job_id, 'txt')
+        total_rows = 0
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                for line in iter_text_lines(stream, current_app.config['IMPORT_MAX_DECOMPRESSED_BYTES']):
+                    f.write(line + '\n')
+                    total_rows += 1
+        except Exception:
+            os.remove(path)
+            raise
+        return ImportJobService._create(job_id, path, total_rows, mode)
+
+    @staticmethod
+    def get_job(job_id):
+        """
+        获取任务状态
+
+        Returns:
+            任务字典或 None
+        """
+        job = db.session.get(ImportJob, job_id)
+        return job.to_dict() if job else None
+
+    @staticmethod
+    def list_jobs(limit=20):
+        """获取最近的任务列表"""
+        jobs = ImportJob.query.order_by(ImportJob.created_at.desc()).limit(limit).all()
+        return [job.to_dict() for job in jobs]
+
+    @staticmethod
+    def resume_job(job_id):
+        """
+        重新排队失败的任务，从最后提交的块继续
+
+        Returns:
+            任务字典；任务不存在返回 None
+
+        Raises:
+            ValueError: 任务不是失败状态
+        """
+        use_write_engine(db.session)
+        job = db.session.get(ImportJob, job_id)
+        if not job:
+            return None
+        if job.status != 'failed':
+            raise ValueError('只有失败的任务可以继续执行')
+
+        job.status = 'queued'
+        job.error = None
+        job.finished_at = None
+        db.session.commit()
+        ImportJobService._submit(job_id)
+        return job.to_dict()
+
+    @staticmethod
+    def resume_pending():
+        """
+        恢复未完成的任务（服务进程启动时调用）
+
+        超时未更新进度的运行中任务重新排队，所有排队任务提交到线程池。
+        多个进程同时恢复时，由 _run 中的原子认领保证每个任务只执行一次。
+        """
+        stale_before = datetime.utcnow() - timedelta(seconds=STALE_SECONDS)
+        db.session.execute(
+            db.update(ImportJob)
+            .where(ImportJob.status == 'running', ImportJob.heartbeat_at < stale_before)
+            .values(status='queued')
+        )
+        db.session.commit()
+
+        job_ids = db.session.execute(
+            db.select(ImportJob.id).where(ImportJob.status == 'queued')
+            .order_by(ImportJob.created_at.asc())
+        ).scalars().all()
+        for job_id in job_ids:
+            ImportJobService._submit(job_id)
+
+    @staticmethod
+    def _spool_path(job_id, extension):
+        """暂存文件路径"""
+        directory = _app.config['IMPORT_JOB_DIR']
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, f'{job_id}.{extension}')
+
+    @staticmethod
+    def _create(job_id, path, total_rows, mode):
+        """写入任务记录并提交到线程池"""
+        job = ImportJob(id=job_id, source_path=path, total_rows=total_rows, mode=mode)
+        db.session.add(job)
+        db.session.commit()
+        ImportJobService._submit(job_id)
+        return job.to_dict()
+
+    @staticmethod
+    def _submit(job_id):
+        """提交任务到线程池（首次使用时创建线程池）"""
+        global _executor
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=_app.config['IMPORT_WORKERS'],
+                    thread_name_prefix='import-job'
+                )
+        _executor.submit(ImportJobService._run, job_id)
+
+    @staticmethod
+    def _iter_records(path, skip):
+        """从暂存文件逐行读取账号数据，跳过已提交的行"""
+        is_json = path.endswith('.ndjson')
+        with open(path, encoding='utf-8') as f:
+            for index, line in enumerate(f):
+                if index < skip:
+                    continue
+                line = line.rstrip('\n')
+                if is_json:
+                    yield json.loads(line) if line else None
+                else:
+                    yield parse_line(line)
+
+    @staticmethod
+    def _run(job_id):
+        """在线程池中执行任务"""
+        with _app.app_context():
+            try:
+                ImportJobService._process(job_id)
+            except Exception as e:
+                db.session.rollback()
+                db.session.execute(
+                    db.update(ImportJob).where(ImportJob.id == job_id)
+                    .values(status='failed', error=str(e), finished_at=datetime.utcnow())
+                )
+                db.session.commit()
+            finally:
+                db.session.remove()
+
+    @staticmethod
+    def _process(job_id):
+        """认领任务并从最后提交的位置继续导入"""
+        now = datetime.utcnow()
+        claimed = db.session.execute(
+            db.update(ImportJob)
+            .where(ImportJob.id == job_id, ImportJob.status == 'queued')
+            .values(status='running', started_at=now, heartbeat_at=now,
+                    start_offset=ImportJob.processed_rows)
+        ).rowcount
+        db.session.commit()
+        if not claimed:
+            return  # 已被其他进程认领
+
+        job = db.session.get(ImportJob, job_id)
+        skip = job.processed_rows
+        source_path = job.source_path
+        mode = job.mode
+        result = {
+            'success_count': job.success_count,
+            'updated_count': job.updated_count,
+            'unchanged_count': job.unchanged_count,
+            'failed_count': job.failed_count,
+            'failed_emails': json.loads(job.failed_emails or '[]')
+        }
+
+        def on_chunk(consumed, totals):
+            # 与本块账号在同一事务中提交，保证断点位置与已导入数据一致
+            db.session.execute(
+                db.update(ImportJob).where(ImportJob.id == job_id).values(
+                    processed_rows=skip + consumed,
+                    success_count=totals['success_count'],
+                    updated_count=totals['updated_count'],
+                    unchanged_count=totals['unchanged_count'],
+                    failed_count=totals['failed_count'],
+                    failed_emails=json.dumps(totals['failed_emails'], ensure_ascii=False),
+                    heartbeat_at=datetime.utcnow()
+                )
+            )
+
+        AccountService.import_stream(
+            ImportJobService._iter_records(source_path, skip),
+            chunk_size=_app.config['IMPORT_JOB_CHUNK_SIZE'],
+            result=result,
+            on_chunk=on_chunk,
+            mode=mode
+        )
+
+        db.session.execute(
+            db.update(ImportJob).where(ImportJob.id == job_id)
+            .values(status='completed', finished_at=datetime.utcnow())
+        )
+        db.session.commit()
+        if os.path.exists(source_path):
+            os.remove(source_path)
@@ -0,0 +1,161 @@
+"""
+库存统计服务模块
+随账号写操作增量维护计数器，统计查询为 O(1)
+"""
+from collections import Counter
+from datetime import date, timedelta
+
+from app import db
+from app.models.account import Account
+from app.models.account_history import AccountHistory
+from app.models.inventory_stats import InventoryCounter, DailySales
+from app.utils.sqlite_tuning import use_write_engine
+
+# 计数器名称
+TOTAL = 'total'
+
+
+def status_key(status):
+    """账号状态计数器名称（空值按 inactive 计）"""
+    return f"status:{status or 'inactive'}"
+
+
+def sold_key(sold_status):
+    """出售状态计数器名称（空值按 unsold 计）"""
+    return f"sold_status:{sold_status or 'unsold'}"
+
+
+class StatsService:
+    """库存统计服务类"""
+
+    @staticmethod
+    def account_deltas(status, sold_status, count=1):
+        """
+        生成新增（count 为正）或删除（count 为负）账号对应的计数器增量
+
+        Args:
+            status: 账号状态
+            sold_status: 出售状态
+            count: 账号数量
+
+        Returns:
+            {计数器名称: 增量} 字典
+        """
+        return Counter({
+            TOTAL: count,
+            status_key(status): count,
+            sold_key(sold_status): count
+        })
+
+    @staticmethod
+    def adjust(deltas):
+        """
+        在当前事务中累加计数器（随业务写操作一起提交）
+
+        Args:
+            deltas: {计数器名称: 增量} 字典
+        """
+        params = [{'name': name, 'delta': delta} for name, delta in deltas.items() if delta]
+        if not params:
+            return
+        db.session.execute(
+            db.text(
+                'INSERT INTO inventory_counters (name, value) VALUES (:name, :delta) '
+                'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value'
+            ),
+            params
+        )
+
+    @staticmethod
+    def record_sales(day, sold=0, unsold=0):
+        """
+        在当前事务中累加某天的出售状态变更次数
+
+        Args:
+            day: 日期
+            sold: 标记为已售出的次数
+            unsold: 撤回为未售出的次数
+        """
+        if not sold and not unsold:
+            return
+        db.session.execute(
+            db.text(
+                'INSERT INTO daily_sales (day, sold, unsold) VALUES (:day, :sold, :unsold) '
+                'ON CONFLICT(day) DO UPDATE SET '
+                'sold = sold + excluded.sold, unsold = unsold + excluded.unsold'
+            ),
+            {'day': day.isoformat(), 'sold': sold, 'unsold': unsold}
+        )
+
+    @staticmethod
+    def get_stats(days=30):
+        """
+        获取库存统计
+
+        Args:
+            days: 返回最近多少天的每日出售汇总
+
+        Returns:
+            统计字典
+        """
+        counters = dict(db.session.execute(
+            db.select(InventoryCounter.name, InventoryCounter.value)
+        ).all())
+
+        since = date.today() - timedelta(days=max(days, 1) - 1)
+        daily = DailySales.query.filter(DailySales.day >= since)\
+            .order_by(DailySales.day.asc()).all()
+
+        by_status = {name.split(':', 1)[1]: value for name, value in counters.items()
+                     if name.startswith('status:') and value}
+        by_sold = {name.split(':', 1)[1]: value for name, value in counters.items()
+                   if name.startswith('sold_status:') and value}
+
+        return {
+            'total': counters.get(TOTAL, 0),
+            'sold': by_sold.get('sold', 0),
+            'unsold': by_sold.get('unsold', 0),
+            'pro': by_status.get('pro', 0),
+            'inactive': by_status.get('inactive', 0),
+            'byStatus': by_status,
+            'bySoldStatus': by_sold,
+            'dailySales': [d.to_dict() for d in daily]
+        }
+
+    @staticmethod
+    def rebuild():
+        """
+        根据 accounts 和 account_history 全量重建计数器和每日汇总
+
+        用于首次启用统计或数据被直接修改后的校正。
+        """
+        use_write_engine(db.session)
+        deltas = Counter({TOTAL: 0})
+        grouped = db.session.execute(
+            db.select(Account.status, Account.sold_status, db.func.count())
+            .group_by(Account.status, Account.sold_status)
+        ).all()
+        for status, sold_status, count in grouped:
+            deltas.update(StatsService.account_deltas(status, sold_status, count))
+
+        day = db.func.date(AccountHistory.changed_at)
+        sales = db.session.execute(
+            db.select(day, AccountHistory.new_value, db.func.count())
+            .where(AccountHistory.field_name == 'sold_status')
+            .group_by(day, AccountHistory.new_value)
+        ).all()
+
+        db.session.execute(db.delete(InventoryCounter))
+        db.session.execute(db.delete(DailySales))
+        db.session.execute(db.insert(InventoryCounter), [
+            {'name': name, 'value': value} for name, value in deltas.items()
+        ])
+        for day_text, new_value, count in sales:
+            if not day_text:
+                continue
+            day_value = date.fromisoformat(day_text)
+            if new_value == 'sold':
+                StatsService.record_sales(day_value, sold=count)
+            else:
+                StatsService.record_sales(day_value, unsold=count)
+        db.session.commit()
@@ -0,0 +1,242 @@
+"""
+登录尝试记录存储模块
+记录每个 IP 的登录失败次数和封禁截止时间，提供两种实现：
+- MemoryAttemptStore：进程内分片存储，带 TTL 过期和条目数上限
+- SqliteAttemptStore：独立的 SQLite 文件，多个 worker 进程共享封禁状态，重启后保留
+"""
+import os
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from threading import Lock
+
+from sqlalchemy import MetaData, Table, Column, Index, Integer, Float, String, create_engine, text
+
+from app.utils.sqlite_tuning import apply_pragmas
+
+
+class AttemptStore(ABC):
+    """
+    登录尝试记录存储接口
+
+    失败计数在距上次失败超过 window 秒后重新开始；达到 max_attempts 次时封禁 ban_duration 秒。
+    计数过期且未被封禁的记录可以随时清除；超过条目数上限时淘汰最久未失败的计数记录，
+    大量不同 IP 的失败尝试不会挤掉仍在封禁中的记录。封禁记录不设上限、只在到期后清除：
+    每条封禁至少需要 max_attempts 次失败，数量受失败速率和 ban_duration 限制。
+    """
+
+    def __init__(self, window, max_attempts, ban_duration, max_entries):
+        self.window = window
+        self.max_attempts = max_attempts
+        self.ban_duration = ban_duration
+        self.max_entries = max_entries
+
+    @abstractmethod
+    def banned_until(self, ip, now):
+        """
+        IP 的封禁截止时间戳
+
+        Returns:
+            封禁中返回截止时间戳，否则返回 0
+        """
+
+    @abstractmethod
+    def record_failure(self, ip, now):
+        """
+        记录一次登录失败
+
+        Returns:
+            (封禁截止时间戳（未封禁为 0）, 当前失败次数) 元组
+        """
+
+    @abstractmethod
+    def clear(self, ip):
+        """清除 IP 的失败记录和封禁"""
+
+    @abstractmethod
+    def bans(self, now):
+        """
+        当前封禁中的 IP
+
+        Returns:
+            (ip, 封禁截止时间戳) 列表
+        """
+
+
+class _Shard:
+    """内存存储的分片"""
+    __slots__ = ('lock', 'attempts', 'bans')
+
+    def __init__(self):
+        self.lock = Lock()
+        # ip -> (失败次数, 最后失败时间)，按最后失败时间从旧到新排列
+        self.attempts = OrderedDict()
+        # ip -> 封禁截止时间，封禁时长固定，按截止时间从早到晚排列
+        self.bans = OrderedDict()
+
+
+class MemoryAttemptStore(AttemptStore):
+    """
+    进程内分片存储
+
+    按 IP 哈希分片，每个分片一把锁；失败计数和封禁分开保存，
+    查询封禁只需遍历封禁表。过期记录在写入时从两张表的头部清除，
+    超过条目数上限时只淘汰最久未失败的计数记录，封禁在到期前一直保留。
+    """
+
+    def __init__(self, window, max_attempts, ban_duration, max_entries=100000, shards=16):
+        super().__init__(window, max_attempts, ban_duration, max_entries)
+        self._shards = [_Shard() for _ in range(shards)]
+        self._shard_max = max(1, max_entries // shards)
+
+    def _shard(self, ip):
+        return self._shards[zlib.crc32(ip.encode()) % len(self._shards)]
+
+    def banned_until(self, ip, now):
+        shard = self._shard(ip)
+        with shard.lock:
+            until = shard.bans.get(ip, 0)
+        return until if until > now else 0
+
+    def record_failure(self, ip, now):
+        shard = self._shard(ip)
+        with shard.lock:
+            self._expire(shard, now)
+            count, last = shard.attempts.pop(ip, (0, 0))
+            count = count + 1 if now - last <= self.window else 1
+            if count >= self.max_attempts:
+                until = now + self.ban_duration
+                shard.bans.pop(ip, None)
+                shard.bans[ip] = until
+                return until, count
+
+            shard.attempts[ip] = (count, now)
+            while len(shard.attempts) > self._shard_max:
+                shard.attempts.popitem(last=False)
+            return 0, count
+
+    def clear(self, ip):
+        shard = self._shard(ip)
+        with shard.lock:
+            shard.attempts.pop(ip, None)
+            shard.bans.pop(ip, None)
+
+    def bans(self, now):
+        result = []
+        for shard in self._shards:
+            with shard.lock:
+                self._expire(shard, now)
+                result.extend(shard.bans.items())
+        return result
+
+    def _expire(self, shard, now):
+        """清除过期的计数和封禁（需持有分片锁）"""
+        while shard.attempts:
+            ip, (_, last) = next(iter(shard.attempts.items()))
+            if now - last <= self.window:
+                break
+            del shard.attempts[ip]
+        while shard.bans:
+            ip, until = next(iter(shard.bans.items()))
+            if until > now:
+                break
+            del shard.bans[ip]
+
+
+# SQLite 存储的表结构
+attempt_metadata = MetaData()
+login_attempts = Table(
+    'login_attempts', attempt_metadata,
+    Column('ip', String(64), primary_key=True),
+    Column('attempts', Integer, nullable=False),
+    Column('last_attempt', Float, nullable=False),
+    Column('banned_until', Float, nullable=False, default=0),
+    Index('ix_login_attempts_banned', 'banned_until'),
+    Index('ix_login_attempts_last', 'last_attempt')
+)
+
+# 每隔多少次写入清理一次过期记录并检查条目数上限
+_PRUNE_EVERY = 100
+
+
+class SqliteAttemptStore(AttemptStore):
+    """
+    SQLite 文件存储（多进程共享）
+
+    每次失败只执行一条 UPSERT ... RETURNING；查询封禁走主键或 banned_until 索引。
+    每隔 _PRUNE_EVERY 次写入删除过期记录，超过条目数上限时删除最久未失败的未封禁记录。
+    数据库文件和表在第一次使用时创建，创建存储对象本身不访问文件。
+    """
+
+    def __init__(self, path, window, max_attempts, ban_duration, max_entries=100000, pragmas=None):
+        super().__init__(window, max_attempts, ban_duration, max_entries)
+        self.path = path
+        self.pragmas = pragmas or {}
+        self._engine = None
+        self._engine_lock = Lock()
+        self._writes = 0
+
+    @property
+    def engine(self):
+        """SQLite 引擎（第一次访问时创建数据库文件和表）"""
+        if self._engine is None:
+            with self._engine_lock:
+                if self._engine is None:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                    engine = create_engine(f'sqlite:///{self.path}')
+                    # 写事务的第一条语句就是写入，默认的 DEFERRED 即可直接获取写锁
+                    apply_pragmas(engine, self.pragmas)
+                    attempt_metadata.create_all(engine)
+                    self._engine = engine
+        return self._engine
+
+    def banned_until(self, ip, now):
+        with self.engine.connect() as conn:
+            until = conn.execute(
+                text('SELECT banned_until FROM login_attempts WHERE ip = :ip'), {'ip': ip}
+            ).scalar()
+        return until if until and until > now else 0
+
+    def record_failure(self, ip, now):
+        params = {'ip': ip, 'now': now, 'window': self.window,
+                  'max_attempts': self.max_attempts, 'ban_until': now + self.ban_duration}
+        with self.engine.begin() as conn:
+            # 计数过期则从 1 重新开始；达到上限时写入封禁截止时间
+            count, until = conn.execute(text(
+                'INSERT INTO login_attempts (ip, attempts, last_attempt, banned_until) '
+                'VALUES (:ip, 1, :now, CASE WHEN :max_attempts <= 1 THEN :ban_until ELSE 0 END) '
+                'ON CONFLICT (ip) DO UPDATE SET '
+                '  attempts = CASE WHEN :now - last_attempt <= :window THEN attempts + 1 ELSE 1 END, '
+                '  last_attempt = :now, '
+                '  banned_until = CASE WHEN (CASE WHEN :now - last_attempt <= :window '
+                '    THEN attempts + 1 ELSE 1 END) >= :max_attempts THEN :ban_until ELSE banned_until END '
+                'RETURNING attempts, banned_until'
+            ), params).one()
+            self._writes += 1
+            if self._writes % _PRUNE_EVERY == 0:
+                self._prune(conn, now)
+        return (until if until > now else 0), count
+
+    def clear(self, ip):
+        with self.engine.begin() as conn:
+            conn.execute(text('DELETE FROM login_attempts WHERE ip = :ip'), {'ip': ip})
+
+    def bans(self, now):
+        with self.engine.connect() as conn:
+            return [tuple(row) for row in conn.execute(text(
+                'SELECT ip, banned_until FROM login_attempts '
+                'WHERE banned_until > :now ORDER BY banned_until'
+            ), {'now': now})]
+
+    def _prune(self, conn, now):
+        """删除过期记录，超过上限时删除最久未失败的未封禁记录"""
+        conn.execute(text(
+            'DELETE FROM login_attempts WHERE last_attempt < :stale AND banned_until <= :now'
+        ), {'stale': now - self.window, 'now': now})
+        excess = conn.execute(text('SELECT count(*) FROM login_attempts')).scalar() - self.max_entries
+        if excess > 0:
+            conn.execute(text(
+                'DELETE FROM login_attempts WHERE ip IN ('
+                '  SELECT ip FROM login_attempts WHERE banned_until <= :now '
+                '  ORDER BY last_attempt LIMIT :excess)'
+            ), {'now': now, 'excess': excess})
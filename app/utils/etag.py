@@ -0,0 +1,49 @@
+"""
+条件请求工具模块
+基于数据版本号为 GET 接口生成 ETag，未变化时直接返回 304
+"""
+import hashlib
+from functools import wraps
+
+from flask import request, make_response
+
+from app.models.data_version import DataVersion
+
+
+def _make_etag(scope, version):
+    """由版本号、请求路径和查询参数生成 ETag"""
+    args = sorted(request.args.items(multi=True))
+    raw = f'{scope}:{version}:{request.path}:{args}'
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def versioned_etag(scope='accounts'):
+    """
+    为视图函数附加 ETag 条件请求支持
+
+    请求携带的 If-None-Match 与当前版本对应的 ETag 一致时直接返回 304，
+    不执行视图函数，也不查询业务数据。
+
+    Args:
+        scope: 数据版本范围名称，见 DataVersion
+
+    Returns:
+        装饰器
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = _make_etag(scope, DataVersion.current(scope))
+            if request.if_none_match.contains(etag):
+                response = make_response('', 304)
+                response.set_etag(etag)
+                return response
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+                # 允许浏览器缓存，但每次使用前都需重新验证
+                response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,117 @@
+"""
+账号导出工具模块
+将账号行流式编码为 NDJSON / CSV / 文本格式，可选 gzip 压缩
+"""
+import csv
+import io
+import json
+import zlib
+
+# 导出格式: (Content-Type, 文件扩展名)
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+    'text': ('text/plain', 'txt')
+}
+
+# 与导入解析器一致的字段分隔符
+TEXT_DELIMITER = '——'
+
+# CSV 表头
+CSV_HEADER = ['id', 'email', 'password', 'recovery', 'secret', 'remark',
+              'status', 'sold_status', 'created_at']
+
+# 每累积多少行输出一次数据块
+ROWS_PER_CHUNK = 500
+
+
+def _row_to_dict(row):
+    """将账号行转换为与 Account.to_dict 相同结构的字典"""
+    return {
+        'id': row.id,
+        'email': row.email,
+        'password': row.password,
+        'recovery': row.recovery or '',
+        'secret': row.secret or '',
+        'remark': row.remark or '',
+        'status': row.status,
+        'soldStatus': row.sold_status or 'unsold',
+        'createdAt': row.created_at.strftime('%Y-%m-%d') if row.created_at else ''
+    }
+
+
+def _format_ndjson(rows):
+    """每行一个 JSON 对象"""
+    for row in rows:
+        yield json.dumps(_row_to_dict(row), ensure_ascii=False) + '\n'
+
+
+def _format_csv(rows):
+    """CSV 格式（带 BOM，便于 Excel 直接打开中文）"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    yield '\ufeff'
+    writer.writerow(CSV_HEADER)
+    for row in rows:
+        writer.writerow([
+            row.id, row.email, row.password, row.recovery or '', row.secret or '',
+            row.remark or '', row.status, row.sold_status or 'unsold',
+            row.created_at.strftime('%Y-%m-%d %H:%M:%S') if row.created_at else ''
+        ])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _format_text(rows):
+    """邮箱——密码——恢复邮箱——2FA密钥，可直接重新导入"""
+    for row in rows:
+        yield TEXT_DELIMITER.join([
+            row.email, row.password, row.recovery or '', row.secret or ''
+        ]) + '\n'
+
+
+_FORMATTERS = {
+    'ndjson': _format_ndjson,
+    'csv': _format_csv,
+    'text': _format_text
+}
+
+
+def iter_export(rows, fmt):
+    """
+    将账号行编码为指定格式的字节块流
+
+    Args:
+        rows: 账号行迭代器
+        fmt: 导出格式（ndjson/csv/text）
+
+    Yields:
+        UTF-8 编码的数据块
+    """
+    parts = []
+    for part in _FORMATTERS[fmt](rows):
+        parts.append(part)
+        if len(parts) >= ROWS_PER_CHUNK:
+            yield ''.join(parts).encode('utf-8')
+            parts = []
+    if parts:
+        yield ''.join(parts).encode('utf-8')
+
+
+def gzip_stream(chunks):
+    """
+    对字节块流做增量 gzip 压缩
+
+    Args:
+        chunks: 字节块迭代器
+
+    Yields:
+        gzip 压缩后的字节块
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 输出 gzip 格式
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
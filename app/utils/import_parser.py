@@ -0,0 +1,132 @@
+"""
+账号导入解析模块
+服务端逐行解析导入文本，分隔符规则与前端导入页一致
+"""
+import codecs
+import re
+import zlib
+
+# 按优先级识别的字段分隔符：中文破折号、四个横线、两个横线
+DELIMITERS = ('——', '----', '--')
+
+# gzip 文件头
+GZIP_MAGIC = b'\x1f\x8b'
+
+# 每次从上传流读取的字节数
+READ_SIZE = 64 * 1024
+
+# 单行最大长度，防止无换行的数据占满内存
+MAX_LINE_LENGTH = 64 * 1024
+
+_WHITESPACE = re.compile(r'\s')
+
+
+class DecompressedTooLarge(ValueError):
+    """gzip 上传解压后的大小超过上限"""
+
+
+def parse_line(line):
+    """
+    解析一行导入文本
+
+    格式：邮箱——密码——恢复邮箱——2FA密钥——备注（分隔符也可为 ---- 或 --）
+
+    Args:
+        line: 一行文本
+
+    Returns:
+        账号数据字典；空行返回 None
+    """
+    if not line.strip():
+        return None
+
+    parts = [line]  # 无法识别分隔符，整行作为邮箱
+    for delimiter in DELIMITERS:
+        if delimiter in line:
+            parts = line.split(delimiter)
+            break
+
+    def part(index):
+        return parts[index].strip() if len(parts) > index else ''
+
+    return {
+        'email': part(0),
+        'password': part(1),
+        'recovery': part(2),
+        # 自动去除 2FA 密钥中的空格
+        'secret': _WHITESPACE.sub('', part(3)),
+        'remark': part(4)
+    }
+
+
+def _iter_bytes(stream, max_decompressed=None):
+    """
+    读取上传流，检测到 gzip 文件头时边读边解压
+
+    每次解压的输出不超过 READ_SIZE，累计超过 max_decompressed 字节时立即停止，
+    少量压缩数据无法膨胀到任意大小。
+
+    Raises:
+        DecompressedTooLarge: 解压后的大小超过 max_decompressed
+    """
+    first = stream.read(READ_SIZE)
+    if not first.startswith(GZIP_MAGIC):
+        while first:
+            yield first
+            first = stream.read(READ_SIZE)
+        return
+
+    total = 0
+
+    def counted(chunk):
+        nonlocal total
+        total += len(chunk)
+        if max_decompressed is not None and total > max_decompressed:
+            raise DecompressedTooLarge(f'解压后的内容超过 {max_decompressed} 字节上限')
+        return chunk
+
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    data = first
+    while data:
+        while data:
+            yield counted(decompressor.decompress(data, READ_SIZE))
+            if decompressor.eof:
+                # 多段拼接的 gzip 文件：上一段结束后继续解压剩余数据
+                data = decompressor.unused_data
+                if data:
+                    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            else:
+                # 输出达到上限时未处理的输入留在 unconsumed_tail 中
+                data = decompressor.unconsumed_tail
+        data = stream.read(READ_SIZE)
+    yield counted(decompressor.flush())
+
+
+def iter_text_lines(stream, max_decompressed=None):
+    """
+    从上传流中逐行读取文本（支持纯文本或 gzip 压缩文件）
+
+    Args:
+        stream: 二进制文件对象，如 request.stream
+        max_decompressed: gzip 文件解压后的最大字节数（为空不限制）
+
+    Yields:
+        去掉换行符的文本行
+
+    Raises:
+        ValueError: 单行超过 MAX_LINE_LENGTH
+        DecompressedTooLarge: 解压后的大小超过 max_decompressed
+    """
+    decoder = codecs.getincrementaldecoder('utf-8-sig')(errors='replace')
+    pending = ''
+    for data in _iter_bytes(stream, max_decompressed):
+        pending += decoder.decode(data)
+        lines = pending.split('\n')
+        pending = lines.pop()
+        if len(pending) > MAX_LINE_LENGTH:
+            raise ValueError(f'单行内容超过 {MAX_LINE_LENGTH} 个字符')
+        for line in lines:
+            yield line.rstrip('\r')
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending.rstrip('\r')
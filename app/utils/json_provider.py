@@ -0,0 +1,48 @@
+"""
+JSON 序列化模块
+使用 orjson 替换 Flask 默认的 json 序列化，未安装 orjson 时保持默认实现
+"""
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    基于 orjson 的 JSON 提供者
+
+    与默认实现保持相同的输出结构：键排序、日期按 HTTP 日期格式、
+    非调试模式紧凑输出。区别是非 ASCII 字符直接以 UTF-8 输出，不做转义。
+    传入 json.dumps 专有参数时退回标准库实现。
+    """
+
+    @staticmethod
+    def is_available():
+        """orjson 是否已安装"""
+        return orjson is not None
+
+    def _option(self, indent=False):
+        # 日期交给 default 处理，保持与默认实现一致的 HTTP 日期格式
+        option = orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._option()).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=self.default, option=self._option(indent))
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
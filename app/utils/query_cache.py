@@ -0,0 +1,167 @@
+"""
+查询结果缓存模块
+进程内 LRU + TTL 缓存，带内存上限和并发请求合并（single-flight）
+"""
+import time
+from collections import OrderedDict
+from threading import Event, Lock
+
+
+class _Entry:
+    """缓存条目"""
+    __slots__ = ('value', 'weight', 'expires_at')
+
+    def __init__(self, value, weight, expires_at):
+        self.value = value
+        self.weight = weight
+        self.expires_at = expires_at
+
+
+class _Flight:
+    """正在进行中的查询，相同 key 的并发请求等待同一个结果"""
+    __slots__ = ('event', 'value', 'error')
+
+    def __init__(self):
+        self.event = Event()
+        self.value = None
+        self.error = None
+
+
+def default_weight(value):
+    """
+    估算缓存值的占用（按行数计）
+
+    列表按元素个数计算，分页结果按 items 个数计算，其余按 1 计算。
+    """
+    if isinstance(value, dict) and isinstance(value.get('items'), list):
+        return max(1, len(value['items']))
+    if isinstance(value, list):
+        return max(1, len(value))
+    return 1
+
+
+class QueryCache:
+    """
+    查询结果缓存
+
+    - 按最近最少使用淘汰，条目数和总行数均有上限
+    - 条目超过 TTL 后失效
+    - 同一 key 的并发未命中只执行一次查询，其余请求等待并共享结果
+    - clear() 使所有条目失效，进行中的查询结果也不会再写入缓存
+
+    缓存的值会被多个请求共享，调用方不得修改。
+    """
+
+    def __init__(self, max_entries=256, max_rows=200000, ttl=30, enabled=True):
+        self._lock = Lock()
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._generation = 0
+        self._total_weight = 0
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def configure(self, enabled=True, max_entries=256, max_rows=200000, ttl=30):
+        """根据应用配置调整缓存参数（会清空现有缓存）"""
+        with self._lock:
+            self.enabled = enabled
+            self.max_entries = max_entries
+            self.max_rows = max_rows
+            self.ttl = ttl
+        self.clear()
+
+    def get_or_load(self, key, loader, weigh=default_weight):
+        """
+        读取缓存，未命中时调用 loader 查询并写入缓存
+
+        Args:
+            key: 可哈希的缓存键（应包含全部查询参数）
+            loader: 无参查询函数
+            weigh: 计算结果占用行数的函数
+
+        Returns:
+            查询结果
+        """
+        if not self.enabled:
+            return loader()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry.value
+                self._remove(key)
+
+            flight = self._flights.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = _Flight()
+                self._flights[key] = flight
+                self.misses += 1
+            else:
+                self.coalesced += 1
+            generation = self._generation
+
+        if not is_leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                if flight.error is None and generation == self._generation:
+                    self._store(key, flight.value, weigh(flight.value))
+            flight.event.set()
+
+        return flight.value
+
+    def clear(self):
+        """清空缓存（数据写入后调用）"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._flights.clear()
+            self._total_weight = 0
+
+    def stats(self):
+        """缓存统计信息"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'rows': self._total_weight,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced
+            }
+
+    def _store(self, key, value, weight):
+        """写入条目并按上限淘汰最久未使用的条目（需持有锁）"""
+        if weight > self.max_rows:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _Entry(value, weight, time.monotonic() + self.ttl)
+        self._total_weight += weight
+        while len(self._entries) > self.max_entries or self._total_weight > self.max_rows:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    def _remove(self, key):
+        """删除条目（需持有锁）"""
+        entry = self._entries.pop(key)
+        self._total_weight -= entry.weight
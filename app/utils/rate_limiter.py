@@ -0,0 +1,131 @@
+"""
+请求限流模块
+按客户端 IP 和接口预算分别维护令牌桶：令牌以固定速率补充，最多积累到突发上限，
+每个请求消耗一个令牌，令牌不足时拒绝并给出需要等待的秒数
+"""
+import time
+from collections import Counter, OrderedDict
+from threading import Lock
+
+
+def parse_budget(value):
+    """
+    解析 "每秒请求数/突发上限" 格式的预算
+
+    Args:
+        value: 预算字符串，例如 "10/50"
+
+    Returns:
+        (rate, burst) 元组
+
+    Raises:
+        ValueError: 格式无效
+    """
+    try:
+        rate, burst = value.split('/')
+        rate, burst = float(rate), int(burst)
+    except (AttributeError, ValueError):
+        raise ValueError(f'无效的限流预算: {value}')
+    if rate <= 0 or burst < 1:
+        raise ValueError(f'无效的限流预算: {value}')
+    return rate, burst
+
+
+class TokenBucketLimiter:
+    """
+    令牌桶限流器
+
+    - 每个 (预算, 客户端) 只保存 [令牌数, 更新时间] 两个值，按最近访问排序
+    - 空闲到令牌必然已补满的桶与新桶等价，每次请求时从头部清除
+    - 桶数量超过上限时淘汰最久未访问的桶
+    """
+
+    def __init__(self, budgets=None, max_clients=10000, enabled=True):
+        self._lock = Lock()
+        self._buckets = OrderedDict()
+        self.allowed = 0
+        self.rejected = Counter()
+        self.configure(budgets or {'default': (10.0, 50)}, max_clients, enabled)
+
+    def configure(self, budgets, max_clients=10000, enabled=True):
+        """
+        更新配置并清空现有的桶
+
+        Args:
+            budgets: 预算名称 -> (rate, burst) 或 "rate/burst" 字符串，必须包含 default
+            max_clients: 桶数量上限
+            enabled: 是否启用
+
+        Raises:
+            ValueError: 预算格式无效或缺少 default
+        """
+        parsed = {name: parse_budget(value) if isinstance(value, str) else tuple(value)
+                  for name, value in budgets.items()}
+        if 'default' not in parsed:
+            raise ValueError('限流预算必须包含 default')
+        with self._lock:
+            self.budgets = parsed
+            self.max_clients = max_clients
+            self.enabled = enabled
+            # 超过该时长未访问的桶一定已补满，可以直接丢弃
+            self._idle_seconds = max(burst / rate for rate, burst in parsed.values())
+            self._buckets.clear()
+
+    def acquire(self, client, budget='default', now=None):
+        """
+        为客户端消耗一个令牌
+
+        Args:
+            client: 客户端标识（IP）
+            budget: 预算名称（未知名称按 default 处理）
+            now: 当前单调时间（默认 time.monotonic()）
+
+        Returns:
+            允许时返回 0，否则返回需要等待的秒数
+        """
+        if not self.enabled:
+            return 0
+        now = time.monotonic() if now is None else now
+        if budget not in self.budgets:
+            budget = 'default'
+        rate, burst = self.budgets[budget]
+        key = (budget, client)
+
+        with self._lock:
+            self._evict_idle(now)
+            bucket = self._buckets.pop(key, None)
+            tokens = burst if bucket is None else min(burst, bucket[0] + (now - bucket[1]) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+                self.allowed += 1
+            else:
+                wait = (1 - tokens) / rate
+                self.rejected[budget] += 1
+            self._buckets[key] = [tokens, now]
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def stats(self):
+        """限流统计信息"""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'clients': len(self._buckets),
+                'allowed': self.allowed,
+                'rejected': sum(self.rejected.values()),
+                'rejectedByBudget': dict(self.rejected)
+            }
+
+    def _evict_idle(self, now):
+        """清除已空闲到补满的桶（需持有锁）"""
+        while self._buckets:
+            _, (_, updated) = next(iter(self._buckets.items()))
+            if now - updated < self._idle_seconds:
+                break
+            self._buckets.popitem(last=False)
+
+
+# 全局限流器实例（由应用工厂按配置初始化）
+rate_limiter = TokenBucketLimiter()
@@ -0,0 +1,142 @@
+"""
+账号全文索引模块
+基于 SQLite FTS5 trigram 分词器为邮箱、备注、恢复邮箱建立子串索引
+"""
+from sqlalchemy import text, table, column, select
+
+# 全文索引虚拟表名
+FTS_TABLE = 'accounts_fts'
+
+# trigram 分词器以 3 个字符为单位建立索引，更短的关键词无法命中
+MIN_TERM_LENGTH = 3
+
+# 供查询使用的轻量表对象（不注册到 metadata，避免 create_all 建表）
+accounts_fts = table(FTS_TABLE, column('rowid'), column(FTS_TABLE))
+
+# 外部内容表 + 同步触发器，索引内容始终与 accounts 表保持一致
+_DDL = [
+    f'''
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        email, remark, recovery,
+        content='accounts', content_rowid='id', tokenize='trigram'
+    )
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON accounts BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, email, remark, recovery)
+        VALUES (new.id, new.email, new.remark, new.recovery);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON accounts BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, email, remark, recovery)
+        VALUES ('delete', old.id, old.email, old.remark, old.recovery);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF email, remark, recovery ON accounts BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, email, remark, recovery)
+        VALUES ('delete', old.id, old.email, old.remark, old.recovery);
+        INSERT INTO {FTS_TABLE}(rowid, email, remark, recovery)
+        VALUES (new.id, new.email, new.remark, new.recovery);
+    END
+    '''
+]
+
+
+def create_search_index(conn):
+    """
+    在当前事务中创建全文索引表及同步触发器（已存在则跳过）
+
+    新建索引时会从 accounts 表全量构建一次。
+
+    Args:
+        conn: SQLAlchemy 连接
+
+    Returns:
+        全文索引是否可用（非 SQLite 或不支持 FTS5 时返回 False）
+    """
+    if conn.dialect.name != 'sqlite':
+        return False
+
+    exists = search_index_exists(conn)
+    try:
+        for statement in _DDL:
+            conn.execute(text(statement))
+    except Exception:
+        # SQLite 未编译 FTS5 或版本过低（trigram 需要 3.34+）
+        return False
+
+    if not exists:
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    return True
+
+
+def ensure_search_index(engine):
+    """
+    在独立事务中创建全文索引（见 create_search_index）
+
+    Args:
+        engine: SQLAlchemy 引擎
+
+    Returns:
+        全文索引是否可用
+    """
+    with engine.begin() as conn:
+        return create_search_index(conn)
+
+
+def search_index_exists(conn):
+    """全文索引表是否已存在"""
+    if conn.dialect.name != 'sqlite':
+        return False
+    return conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:name"),
+        {'name': FTS_TABLE}
+    ).first() is not None
+
+
+def rebuild_search_index(engine):
+    """
+    从 accounts 表全量重建全文索引（用于已有数据库或索引损坏时）
+
+    Args:
+        engine: SQLAlchemy 引擎
+
+    Returns:
+        是否重建成功
+    """
+    if not ensure_search_index(engine):
+        return False
+
+    with engine.begin() as conn:
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    return True
+
+
+def build_match_query(term):
+    """
+    将搜索关键词转换为 FTS5 短语查询（按字面子串匹配）
+
+    Args:
+        term: 搜索关键词
+
+    Returns:
+        MATCH 表达式字符串
+    """
+    return '"' + term.replace('"', '""') + '"'
+
+
+def match_ids(term):
+    """
+    构造匹配关键词的账号 ID 子查询
+
+    Args:
+        term: 搜索关键词（至少 MIN_TERM_LENGTH 个字符）
+
+    Returns:
+        可用于 Account.id.in_() 的 SELECT 语句
+    """
+    return select(accounts_fts.c.rowid).where(
+        accounts_fts.c[FTS_TABLE].op('MATCH')(build_match_query(term))
+    )
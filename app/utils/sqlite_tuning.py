@@ -0,0 +1,125 @@
+"""
+SQLite 连接调优模块
+- 每个连接建立时设置 PRAGMA（WAL、synchronous、缓存、mmap、busy_timeout、外键）
+- 可选的读写分离：查询使用独立的只读引擎，写事务以 BEGIN IMMEDIATE 开始，
+  提前获取写锁，避免读事务中途升级为写事务时直接返回 database is locked
+"""
+from flask import current_app
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import scoped_session
+from sqlalchemy.sql import Select
+
+# app.extensions 中只读引擎的键名
+READ_ENGINE_KEY = 'sqlite_read_engine'
+
+# 只对整个数据库生效、由写连接设置的 PRAGMA
+_DATABASE_PRAGMAS = ('journal_mode',)
+
+# 会话中标记当前事务已写入（或即将读-改-写）的键
+_WROTE_KEY = 'wrote'
+
+
+def is_file_database(engine):
+    """是否为文件型 SQLite 数据库（内存数据库不做调优）"""
+    return engine.dialect.name == 'sqlite' and engine.url.database not in (None, '', ':memory:')
+
+
+def apply_pragmas(engine, pragmas, begin='DEFERRED', read_only=False):
+    """
+    为引擎注册连接事件：设置 PRAGMA 并显式控制事务开始方式
+
+    Args:
+        engine: SQLAlchemy 引擎
+        pragmas: PRAGMA 名称到取值的字典（值为 None 时跳过）
+        begin: 事务开始方式 DEFERRED/IMMEDIATE
+        read_only: 是否为只读连接（设置 query_only）
+    """
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        # 关闭 pysqlite 的隐式事务，由 begin 事件显式开始
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            if value is None or (read_only and name in _DATABASE_PRAGMAS):
+                continue
+            cursor.execute(f'PRAGMA {name}={value}')
+        if read_only:
+            cursor.execute('PRAGMA query_only=ON')
+        cursor.close()
+
+    @event.listens_for(engine, 'begin')
+    def on_begin(conn):
+        conn.exec_driver_sql(f'BEGIN {begin}')
+
+
+def init_sqlite(app, db):
+    """
+    为文件型 SQLite 数据库应用调优配置，按需创建只读引擎
+
+    Args:
+        app: Flask 应用实例
+        db: SQLAlchemy 扩展实例
+    """
+    app.extensions.pop(READ_ENGINE_KEY, None)
+    engine = db.engine
+    if not is_file_database(engine):
+        return
+
+    pragmas = app.config['SQLITE_PRAGMAS']
+    separate_reads = app.config['SQLITE_SEPARATE_READS']
+    apply_pragmas(engine, pragmas, begin='IMMEDIATE' if separate_reads else 'DEFERRED')
+
+    if separate_reads:
+        read_engine = create_engine(engine.url, **app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+        apply_pragmas(read_engine, pragmas, read_only=True)
+        app.extensions[READ_ENGINE_KEY] = read_engine
+
+
+class RoutingSession(Session):
+    """
+    读写分离会话
+
+    未配置只读引擎时与默认会话相同。配置后，事务中尚未写入时的 SELECT 使用只读引擎；
+    首次写入（包括 flush）或调用 use_write_engine 后，同一事务的后续语句都使用写引擎，
+    保证能读到本事务的修改。
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self.info.get(_WROTE_KEY):
+            read_engine = current_app.extensions.get(READ_ENGINE_KEY)
+            if read_engine is not None:
+                if isinstance(clause, Select) and not self._flushing:
+                    return read_engine
+                self.info[_WROTE_KEY] = True
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def use_write_engine(session):
+    """
+    读-改-写操作开始前调用：当前事务剩余的语句（包括查询）都使用写引擎
+
+    写引擎的事务以 BEGIN IMMEDIATE 开始，第一次读取时即持有写锁，据此计算的修改、
+    历史记录和统计增量在提交前不会被其他连接的写入打乱。本事务中已从只读引擎加载的
+    对象被标记为过期，再次访问时从写引擎重新读取。
+
+    Args:
+        session: RoutingSession 实例或 db.session
+    """
+    if isinstance(session, scoped_session):
+        session = session()
+    if session.info.get(_WROTE_KEY) or READ_ENGINE_KEY not in current_app.extensions:
+        return
+    if session.in_transaction():
+        session.expire_all()
+    else:
+        # 显式开始事务，标记随事务结束（提交、回滚或关闭会话）清除
+        session.begin()
+    session.info[_WROTE_KEY] = True
+
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def _reset_routing(session, transaction):
+    """事务结束后恢复为优先使用只读引擎"""
+    if transaction.parent is None:
+        session.info.pop(_WROTE_KEY, None)
@@ -1,63 +1,200 @@
 """
 TOTP 工具模块
 提供 2FA 验证码生成功能
+
+验证码由 TotpEngine 直接按 RFC 6238（HMAC-SHA1、30 秒、6 位）计算，
+结果与 pyotp 一致：
+- 解码后的密钥按（账号ID, 密钥摘要）缓存在有上限的 LRU 中
+- 每个时间窗口内的验证码只计算一次，同一窗口内的重复请求只是一次字典查找
 """
+import base64
+import hashlib
+import hmac
+import struct
 import time
-import pyotp
+import unicodedata
+from collections import OrderedDict
+from threading import Lock
+
+# 验证码时间窗口（秒）和位数
+INTERVAL = 30
+DIGITS = 6
+
+# 默认缓存的密钥数量上限
+DEFAULT_MAX_KEYS = 10000
+
+# 验证码缓存保留的时间窗口数量
+MAX_WINDOWS = 3
+
+
+class TotpEngine:
+    """
+    带缓存的 TOTP 计算引擎
+
+    - 密钥缓存按最近最少使用淘汰，键中包含密钥摘要，账号密钥修改后自然失效
+    - 验证码缓存只保留当前及相邻的时间窗口，窗口前进时整体丢弃旧窗口
+    """
+
+    def __init__(self, max_keys=DEFAULT_MAX_KEYS):
+        self._lock = Lock()
+        self._keys = OrderedDict()
+        self._windows = {}
+        self.max_keys = max_keys
+
+    def code(self, secret, for_time=None, account_id=None):
+        """
+        计算指定时间的验证码
+
+        Args:
+            secret: TOTP 密钥（Base32 编码，允许空格和小写）
+            for_time: 时间戳（默认为当前时间）
+            account_id: 账号ID（用于区分缓存条目，可为空）
+
+        Returns:
+            6 位数字验证码字符串
+
+        Raises:
+            ValueError: 密钥无效
+        """
+        counter = int(time.time() if for_time is None else for_time) // INTERVAL
+        cache_key = (account_id, hashlib.sha1(secret.encode('utf-8')).digest())
+
+        window = self._windows.get(counter)
+        if window is not None:
+            code = window.get(cache_key)
+            if code is not None:
+                return code
+
+        code = _hotp(self._key(cache_key, secret), counter)
+
+        with self._lock:
+            window = self._windows.get(counter)
+            if window is None:
+                window = self._windows[counter] = {}
+                # 只保留最新的几个窗口（当前窗口及批量接口用到的下一个窗口）
+                while len(self._windows) > MAX_WINDOWS:
+                    del self._windows[min(self._windows)]
+            if len(window) < self.max_keys:
+                window[cache_key] = code
+        return code
+
+    def verify(self, secret, code, for_time=None, account_id=None):
+        """
+        验证验证码（恒定时间比较）
+
+        Returns:
+            验证是否成功
+        """
+        expected = self.code(secret, for_time, account_id)
+        actual = unicodedata.normalize('NFKC', str(code))
+        return hmac.compare_digest(actual.encode('utf-8'), expected.encode('utf-8'))
+
+    def clear(self):
+        """清空全部缓存"""
+        with self._lock:
+            self._keys.clear()
+            self._windows.clear()
+
+    def _key(self, cache_key, secret):
+        """读取或解码密钥字节"""
+        with self._lock:
+            key = self._keys.get(cache_key)
+            if key is not None:
+                self._keys.move_to_end(cache_key)
+                return key
+
+        key = decode_secret(secret)
+
+        with self._lock:
+            self._keys[cache_key] = key
+            while len(self._keys) > self.max_keys:
+                self._keys.popitem(last=False)
+        return key
 
 
-def generate_totp(secret):
+def decode_secret(secret):
+    """
+    将 Base32 密钥解码为字节（去除空格，补齐填充，不区分大小写）
+
+    Raises:
+        ValueError: 密钥包含非法字符
+    """
+    secret = secret.replace(' ', '')
+    missing_padding = len(secret) % 8
+    if missing_padding:
+        secret += '=' * (8 - missing_padding)
+    try:
+        return base64.b32decode(secret, casefold=True)
+    except Exception as e:
+        raise ValueError(str(e))
+
+
+def _hotp(key, counter):
+    """按 RFC 4226 计算计数器对应的验证码"""
+    digest = hmac.new(key, struct.pack('>Q', counter), hashlib.sha1).digest()
+    offset = digest[-1] & 0x0F
+    value = struct.unpack('>I', digest[offset:offset + 4])[0] & 0x7FFFFFFF
+    return str(value % 10 ** DIGITS).zfill(DIGITS)
+
+
+# 全局引擎实例
+totp_engine = TotpEngine()
+
+
+def generate_totp(secret, for_time=None, account_id=None):
     """
     生成 TOTP 验证码
-    
+
     Args:
         secret: TOTP 密钥（Base32 编码）
-    
+        for_time: 计算验证码的时间戳（默认为当前时间）
+        account_id: 账号ID（用于密钥缓存，可为空）
+
     Returns:
         6 位数字验证码字符串
-    
+
     Raises:
         ValueError: 密钥无效
     """
     if not secret:
         raise ValueError('TOTP 密钥不能为空')
-    
+
     try:
-        # 清理密钥中的空格
-        secret = secret.replace(' ', '').upper()
-        totp = pyotp.TOTP(secret)
-        return totp.now()
+        return totp_engine.code(secret, for_time, account_id)
     except Exception as e:
         raise ValueError(f'无效的 TOTP 密钥: {str(e)}')
 
 
-def get_remaining_seconds():
+def get_remaining_seconds(for_time=None):
     """
     获取当前 TOTP 验证码的剩余有效时间
-    
+
+    Args:
+        for_time: 时间戳（默认为当前时间）
+
     Returns:
         剩余秒数（1-30）
     """
-    return 30 - (int(time.time()) % 30)
+    now = time.time() if for_time is None else for_time
+    return INTERVAL - (int(now) % INTERVAL)
 
 
-def verify_totp(secret, code):
+def verify_totp(secret, code, account_id=None):
     """
     验证 TOTP 验证码
-    
+
     Args:
         secret: TOTP 密钥
         code: 用户输入的验证码
-    
+        account_id: 账号ID（用于密钥缓存，可为空）
+
     Returns:
         验证是否成功
     """
     if not secret or not code:
         return False
-    
+
     try:
-        secret = secret.replace(' ', '').upper()
-        totp = pyotp.TOTP(secret)
-        return totp.verify(code)
+        return totp_engine.verify(secret, code, account_id=account_id)
     except Exception:
         return False
@@ -0,0 +1,79 @@
+"""
+账号列表序列化基准测试
+对比 ORM 加载 + to_dict + 标准库 json 与 Core 行查询 + orjson 两条读取路径
+
+用法:
+    python benchmarks/bench_serialization.py [账号数量]
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask.json.provider import DefaultJSONProvider
+
+from app import create_app, db
+from app.models.account import Account
+from app.services.account_service import AccountService
+from app.utils.json_provider import OrjsonProvider
+
+
+def seed(count):
+    """写入测试账号"""
+    base = datetime(2024, 1, 1)
+    rows = [{
+        'email': f'user{i}@gmail.com',
+        'password': f'pass{i}',
+        'recovery': f'recovery{i}@outlook.com',
+        'secret': 'JBSWY3DPEHPK3PXP',
+        'remark': f'批次{i % 100}',
+        'status': 'pro' if i % 3 else 'inactive',
+        'sold_status': 'sold' if i % 2 else 'unsold',
+        'created_at': base + timedelta(seconds=i),
+        'updated_at': base + timedelta(seconds=i)
+    } for i in range(count)]
+    db.session.execute(db.insert(Account), rows)
+    db.session.commit()
+
+
+def timed(label, func, repeat=3):
+    """多次运行取最短耗时"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f'{label:<32}{best * 1000:>10.1f} ms')
+    return best, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    app = create_app('testing')
+
+    with app.app_context():
+        seed(count)
+        default_json = DefaultJSONProvider(app)
+        fast_json = OrjsonProvider(app) if OrjsonProvider.is_available() else default_json
+
+        def orm_path():
+            accounts = Account.query.order_by(Account.created_at.asc()).all()
+            db.session.expunge_all()
+            return default_json.dumps([acc.to_dict() for acc in accounts])
+
+        def core_path():
+            return fast_json.dumps(AccountService.get_all_accounts())
+
+        print(f'账号数量: {count}')
+        orm_time, orm_body = timed('ORM + to_dict + json', orm_path)
+        core_time, core_body = timed('Core 行 + orjson', core_path)
+
+        assert default_json.loads(orm_body) == default_json.loads(core_body), '两条路径输出不一致'
+        print(f'加速比: {orm_time / core_time:.1f}x（输出内容一致）')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+TOTP 验证码计算基准测试
+对比每次构造 pyotp.TOTP 的旧路径与带密钥缓存和窗口缓存的 TotpEngine
+
+用法:
+    python benchmarks/bench_totp.py [密钥数量]
+"""
+import base64
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pyotp
+
+from app.utils.totp import TotpEngine
+
+
+def timed(label, func, repeat=3):
+    """多次运行取最短耗时"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f'{label:<32}{best * 1000:>10.1f} ms')
+    return best, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    secrets = [base64.b32encode(os.urandom(20)).decode().rstrip('=') for _ in range(count)]
+    # 固定在窗口开头，保证各路径处于同一时间窗口
+    now = (int(time.time()) // 30) * 30
+
+    def pyotp_path():
+        return [pyotp.TOTP(secret.replace(' ', '').upper()).at(now) for secret in secrets]
+
+    def engine_cold():
+        engine = TotpEngine(max_keys=count)
+        return engine, [engine.code(secret, now, i) for i, secret in enumerate(secrets)]
+
+    engine, _ = engine_cold()
+
+    def engine_next_window():
+        engine._windows.clear()
+        return [engine.code(secret, now, i) for i, secret in enumerate(secrets)]
+
+    def engine_warm():
+        return [engine.code(secret, now, i) for i, secret in enumerate(secrets)]
+
+    print(f'密钥数量: {count}')
+    base_time, expected = timed('pyotp（每次构造）', pyotp_path)
+    cold_time, (_, cold) = timed('TotpEngine 冷启动', engine_cold)
+    next_time, rolled = timed('TotpEngine 新窗口（密钥已缓存）', engine_next_window)
+    warm_time, warm = timed('TotpEngine 同窗口重复请求', engine_warm)
+
+    assert expected == cold == rolled == warm, '验证码不一致'
+    print(f'加速比: 冷启动 {base_time / cold_time:.1f}x，新窗口 {base_time / next_time:.1f}x，'
+          f'同窗口 {base_time / warm_time:.1f}x（验证码一致）')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+"""
+热点查询执行计划检查
+在临时 SQLite 文件中写入大量账号和历史记录，调用 AccountService 的热点查询，
+捕获实际执行的 SQL 并逐条运行 EXPLAIN QUERY PLAN。出现全表扫描（未使用索引的 SCAN）
+或为排序/分组建立临时 B 树（USE TEMP B-TREE）时以非零状态退出，可在 CI 中作为回归检查。
+关键词搜索走全文索引，命中的账号只能在取出后排序，这类查询只允许为 ORDER BY 建临时 B 树。
+
+最后模拟尚未执行补全迁移的旧数据库（出售状态为空），检查未售出筛选仍包含这些账号，
+并在执行迁移后重新检查执行计划。
+
+用法:
+    python benchmarks/check_query_plans.py [账号数量]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORKDIR = tempfile.mkdtemp(prefix='query-plans-')
+os.environ.update({
+    'DATABASE_URL': 'sqlite:///' + os.path.join(WORKDIR, 'accounts.db'),
+    'HISTORY_ARCHIVE_PATH': os.path.join(WORKDIR, 'history_archive.db'),
+    'IMPORT_JOB_DIR': os.path.join(WORKDIR, 'import_jobs'),
+    'LOGIN_ATTEMPT_DB': os.path.join(WORKDIR, 'login_attempts.db'),
+    'HISTORY_JOURNAL_DIR': os.path.join(WORKDIR, 'history_journal'),
+    'QUERY_CACHE_ENABLED': '0',  # 每次调用都必须真正执行查询
+})
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import create_app, db
+from app.migrations import _write_version, refresh_capabilities, upgrade
+from app.migrations.versions import SOLD_STATUS_BACKFILL_VERSION
+from app.models.account import Account
+from app.models.account_history import AccountHistory
+from app.services.account_service import AccountService
+
+# 允许的 SCAN：FTS5 虚拟表内部扫描、IN 列表及 CTE/子查询结果
+ALLOWED_SCANS = ('SCAN accounts_fts', 'SCAN json_each', 'CONSTANT ROW')
+
+
+def seed(count):
+    """写入 count 个账号及每个账号若干条历史记录"""
+    start = datetime(2024, 1, 1)
+    accounts = [{
+        'email': f'user{i:07d}@example.com',
+        'password': f'pw{i}',
+        'recovery': f'rec{i}@example.com',
+        'secret': 'JBSWY3DPEHPK3PXP',
+        'remark': f'batch-{i % 50}',
+        'status': random.choice(('pro', 'inactive')),
+        'sold_status': random.choice(('sold', 'unsold', 'unsold')),
+        'created_at': start + timedelta(minutes=i),
+        'updated_at': start + timedelta(minutes=i),
+    } for i in range(count)]
+    db.session.execute(db.insert(Account.__table__), accounts)
+
+    history = []
+    for account_id in range(1, count + 1):
+        for n in range(4):
+            history.append({
+                'account_id': account_id,
+                'field_name': ('password', 'secret', 'recovery', 'sold_status')[n],
+                'old_value': 'old',
+                'new_value': 'new',
+                'changed_at': start + timedelta(minutes=account_id, seconds=n),
+            })
+    db.session.execute(db.insert(AccountHistory.__table__), history)
+    db.session.commit()
+
+
+def hot_queries(count):
+    """热点查询：名称 -> 调用 AccountService 的函数"""
+    page = AccountService.get_accounts_page(limit=50)
+    cursor = page['nextCursor']
+    ids = list(range(1, min(count, 200) + 1))
+    history_page = AccountService.get_account_history_page(1, limit=2)
+    audit_page = AccountService.search_history(limit=50)
+
+    return {
+        '账号首页': lambda: AccountService.get_accounts_page(limit=50),
+        '账号翻页': lambda: AccountService.get_accounts_page(cursor=cursor, limit=50),
+        '账号首页（含总数）': lambda: AccountService.get_accounts_page(limit=50, with_total=True),
+        '按出售状态分页': lambda: AccountService.get_accounts_page({'sold_status': 'sold'}, limit=50),
+        '按出售状态翻页': lambda: AccountService.get_accounts_page({'sold_status': 'sold'},
+                                                                 cursor=cursor, limit=50),
+        '未售出分页': lambda: AccountService.get_accounts_page({'sold_status': 'unsold'}, limit=50),
+        '按账号状态分页': lambda: AccountService.get_accounts_page({'status': 'pro'}, limit=50),
+        '按日期范围分页': lambda: AccountService.get_accounts_page(
+            {'start_date': '2024-01-02', 'end_date': '2024-01-05'}, limit=50),
+        # 与 GET /api/accounts 不带分页参数时的调用一致：按设计读取全部行，
+        # 只要求沿 (created_at, id) 索引顺序扫描，不为排序建临时 B 树
+        '全部账号列表': lambda: AccountService.get_all_accounts(),
+        '流式导出': lambda: AccountService.iter_accounts({'sold_status': 'sold'}).fetchmany(10),
+        '批量 2FA 验证码': lambda: AccountService.get_2fa_codes(ids),
+        '单账号历史': lambda: AccountService.get_account_history(1),
+        '单账号历史翻页': lambda: AccountService.get_account_history_page(
+            1, cursor=history_page['nextCursor'], limit=2),
+        '全局审计': lambda: AccountService.search_history(limit=50),
+        '全局审计翻页': lambda: AccountService.search_history(cursor=audit_page['nextCursor'], limit=50),
+        '按字段审计': lambda: AccountService.search_history({'fields': ['password']}, limit=50),
+        '按日期审计': lambda: AccountService.search_history(
+            {'start_date': '2024-01-02', 'end_date': '2024-01-03'}, limit=50),
+        '批量最近修改': lambda: AccountService.get_latest_history(ids[:50]),
+    }
+
+
+def search_queries():
+    """
+    关键词搜索查询：名称 -> 调用 AccountService 的函数
+
+    全文索引按 rowid 返回命中的账号，无法按 (created_at, id) 顺序读取，
+    排序只作用于命中的行；仍要求经由 accounts_fts 命中，不能退化为扫描 accounts。
+    """
+    # 匹配 user0000000 ~ user0000999 的邮箱，足够翻页
+    search = {'search': 'user0000'}
+    cursor = AccountService.get_accounts_page(search, limit=50)['nextCursor']
+
+    return {
+        '搜索分页': lambda: AccountService.get_accounts_page(search, limit=50),
+        '搜索翻页': lambda: AccountService.get_accounts_page(search, cursor=cursor, limit=50),
+        '搜索首页（含总数）': lambda: AccountService.get_accounts_page(search, limit=50, with_total=True),
+        '搜索并筛选出售状态': lambda: AccountService.get_accounts_page(
+            {**search, 'sold_status': 'sold'}, limit=50, with_total=True),
+    }
+
+
+def capture(func):
+    """执行函数并返回期间发出的 SELECT 语句及参数"""
+    statements = []
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            statements.append((statement, parameters))
+
+    event.listen(Engine, 'before_cursor_execute', before_execute)
+    try:
+        func()
+    finally:
+        event.remove(Engine, 'before_cursor_execute', before_execute)
+    return statements
+
+
+def problems(plan, allow_sort=False):
+    """找出执行计划中的全表扫描和临时 B 树（allow_sort 时允许为 ORDER BY 建临时 B 树）"""
+    found = []
+    for detail in plan:
+        if 'USE TEMP B-TREE' in detail:
+            if not (allow_sort and detail == 'USE TEMP B-TREE FOR ORDER BY'):
+                found.append(detail)
+        elif detail.startswith('SCAN') and 'USING' not in detail \
+                and not detail.startswith(ALLOWED_SCANS):
+            found.append(detail)
+    return found
+
+
+def check_plans(name, func, strict=True, allow_sort=False):
+    """
+    检查函数发出的每条查询的执行计划
+
+    Args:
+        name: 查询名称
+        func: 执行查询的函数
+        strict: 为 False 时只输出执行计划，不计入失败
+        allow_sort: 是否允许为 ORDER BY 建临时 B 树（用于关键词搜索）
+
+    Returns:
+        执行计划退化的查询数量
+    """
+    failures = 0
+    for statement, parameters in capture(func):
+        plan = [row[3] for row in db.session.connection().exec_driver_sql(
+            'EXPLAIN QUERY PLAN ' + statement, parameters
+        )]
+        db.session.rollback()
+        bad = problems(plan, allow_sort)
+        status = ('失败' if strict else '允许') if bad else '通过'
+        print(f'[{status}] {name}: {" | ".join(plan)}')
+        if bad and strict:
+            failures += 1
+            print('    ' + ' '.join(statement.split()))
+    return failures
+
+
+def check_legacy(app):
+    """
+    模拟尚未执行出售状态补全迁移的旧数据库
+
+    部分账号的出售状态置空并把结构版本退回补全迁移之前，未售出筛选必须包含这些账号
+    （此时的 OR 条件无法只走组合索引，执行计划只输出不计入失败）；
+    执行迁移后空值被补全，再按正常标准检查执行计划。
+
+    Returns:
+        失败数量
+    """
+    def unsold_total():
+        return AccountService.get_accounts_page({'sold_status': 'unsold'}, limit=50, with_total=True)['total']
+
+    db.session.execute(
+        db.update(Account.__table__).where(Account.__table__.c.id % 7 == 0).values(sold_status=None)
+    )
+    # 除已售出以外都应计为未售出
+    expected = db.session.execute(db.select(db.func.count()).select_from(Account)).scalar() \
+        - db.session.execute(db.select(db.func.count()).where(Account.sold_status == 'sold')).scalar()
+    _write_version(db.session.connection(), SOLD_STATUS_BACKFILL_VERSION - 1)
+    db.session.commit()
+    refresh_capabilities(app)
+
+    failures = 0
+    for stage in ('旧库', '迁移后'):
+        total = unsold_total()
+        ok = total == expected
+        print(f"[{'通过' if ok else '失败'}] {stage}未售出总数: {total}（应为 {expected}）")
+        failures += 0 if ok else 1
+        failures += check_plans(f'{stage}未售出分页',
+                                lambda: AccountService.get_accounts_page({'sold_status': 'unsold'}, limit=50),
+                                strict=stage == '迁移后')
+        if stage == '旧库':
+            upgrade()
+            refresh_capabilities(app)
+    return failures
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    app = create_app()
+    failures = 0
+    with app.app_context():
+        started = time.perf_counter()
+        seed(count)
+        print(f'写入 {count} 个账号、{count * 4} 条历史记录：{time.perf_counter() - started:.1f} s')
+
+        for name, func in hot_queries(count).items():
+            failures += check_plans(name, func)
+        for name, func in search_queries().items():
+            failures += check_plans(name, func, allow_sort=True)
+        failures += check_legacy(app)
+
+    print(f'检查完成，{failures} 条查询的执行计划退化' if failures else '检查完成，全部通过')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -11,22 +11,26 @@ import {
 } from 'lucide-react';
 
 // 导入服务和组件
-import api from './services/api';
+import api, { AUTH_EXPIRED_EVENT } from './services/api';
 import AccountListView from './components/AccountListView';
 import ImportView from './components/ImportView';
 import LoginPage from './components/LoginPage';
+import usePagination from './hooks/usePagination';
 
 const App = () => {
     const [view, setView] = useState('list');
-    const [accounts, setAccounts] = useState([]);
     const [search, setSearch] = useState('');
+    const [debouncedSearch, setDebouncedSearch] = useState('');
+    // 出售状态筛选: 'all' | 'sold' | 'unsold'
+    const [soldFilter, setSoldFilter] = useState('all');
     const [notification, setNotification] = useState(null);
-    const [loading, setLoading] = useState(true);
 
     // Modals state
     const [editingAccount, setEditingAccount] = useState(null);
     const [deletingId, setDeletingId] = useState(null);
-    const [twoFACode, setTwoFACode] = useState({ id: null, code: '', expiry: 0 });
+    // 已点击显示验证码的账号ID；验证码和剩余秒数由后端推送
+    const [revealedIds, setRevealedIds] = useState([]);
+    const [twoFA, setTwoFA] = useState({ codes: {}, missing: [], expiry: 0 });
 
     // 登录状态 - 使用 localStorage 并检查7天有效期
     const [isLoggedIn, setIsLoggedIn] = useState(() => {
@@ -61,39 +65,79 @@ const App = () => {
         localStorage.setItem('darkMode', JSON.stringify(darkMode));
     }, [darkMode]);
 
-    // --- 加载账号数据 ---
+    // 登录失效（接口返回 401）时回到登录页
     useEffect(() => {
-        loadAccounts();
+        const handleExpired = () => setIsLoggedIn(false);
+        window.addEventListener(AUTH_EXPIRED_EVENT, handleExpired);
+        return () => window.removeEventListener(AUTH_EXPIRED_EVENT, handleExpired);
     }, []);
 
-    const loadAccounts = async () => {
-        try {
-            setLoading(true);
-            const data = await api.getAccounts();
-            setAccounts(data);
-        } catch (error) {
-            console.error('加载账号失败:', error);
+    // --- 加载账号数据：搜索和筛选由后端完成，按页请求（登录后才能访问接口） ---
+    useEffect(() => {
+        const timer = setTimeout(() => setDebouncedSearch(search.trim()), 300);
+        return () => clearTimeout(timer);
+    }, [search]);
+
+    const accountFilters = useMemo(() => {
+        const filters = {};
+        if (debouncedSearch) filters.search = debouncedSearch;
+        if (soldFilter !== 'all') filters.sold_status = soldFilter;
+        return filters;
+    }, [debouncedSearch, soldFilter]);
+
+    const pagination = usePagination(api.getAccountsPage, accountFilters, 10, isLoggedIn);
+
+    useEffect(() => {
+        if (pagination.error) {
+            console.error('加载账号失败:', pagination.error);
             showNotification('加载账号失败', 'error');
-        } finally {
-            setLoading(false);
         }
-    };
+    }, [pagination.error]);
+
+    // --- 2FA 验证码推送 ---
+    // 第一次点击时通过一个 SSE 连接订阅当前页所有配置了密钥的账号，
+    // 后端在连接时和每个 30 秒窗口开始时推送整页验证码，翻页后收起并重新订阅
+    const pageTwoFAIds = pagination.paginatedData.filter(acc => acc.secret).map(acc => acc.id).join(',');
+    const streaming = isLoggedIn && view === 'list' && revealedIds.length > 0 && pageTwoFAIds !== '';
 
-    // --- 2FA Countdown Logic ---
     useEffect(() => {
-        let timer;
-        if (twoFACode.expiry > 0) {
-            timer = setInterval(() => {
-                setTwoFACode(prev => ({
-                    ...prev,
-                    expiry: prev.expiry - 1
-                }));
-            }, 1000);
-        } else if (twoFACode.expiry === 0 && twoFACode.id !== null) {
-            setTwoFACode({ id: null, code: '', expiry: 0 });
+        setRevealedIds([]);
+    }, [pageTwoFAIds]);
+
+    useEffect(() => {
+        if (!streaming) return undefined;
+        const source = api.subscribe2FACodes(pageTwoFAIds.split(','), (data) => {
+            setTwoFA({
+                codes: Object.fromEntries(data.codes.map(item => [item.id, item.code])),
+                missing: data.missing,
+                expiry: data.expiry
+            });
+        }, () => {
+            setRevealedIds([]);
+            showNotification('验证码推送连接已断开，请重新获取', 'error');
+        });
+        return () => {
+            source.close();
+            setTwoFA({ codes: {}, missing: [], expiry: 0 });
+        };
+    }, [streaming, pageTwoFAIds]);
+
+    // 本地倒计时只用于显示，到 0 时等待后端推送下一窗口的验证码
+    useEffect(() => {
+        if (twoFA.expiry <= 0) return undefined;
+        const timer = setTimeout(() => {
+            setTwoFA(prev => ({ ...prev, expiry: prev.expiry - 1 }));
+        }, 1000);
+        return () => clearTimeout(timer);
+    }, [twoFA.expiry]);
+
+    // 密钥无效的账号后端不返回验证码
+    useEffect(() => {
+        if (revealedIds.some(id => twoFA.missing.includes(id))) {
+            setRevealedIds(prev => prev.filter(id => !twoFA.missing.includes(id)));
+            showNotification('2FA 密钥无效，无法生成验证码', 'error');
         }
-        return () => clearInterval(timer);
-    }, [twoFACode.expiry, twoFACode.id]);
+    }, [twoFA.missing, revealedIds]);
 
     // --- Helpers ---
     const showNotification = (msg, type = 'success') => {
@@ -111,33 +155,21 @@ const App = () => {
         showNotification(`已复制 ${label} 到剪切板`);
     };
 
-    const generate2FA = async (id, secret) => {
-        try {
-            const result = await api.get2FACode(id);
-            if (result.success) {
-                setTwoFACode({ id, code: result.data.code, expiry: result.data.expiry });
-                showNotification('2FA 验证码已刷新');
-            } else {
-                // 如果后端获取失败（如无密钥），使用前端模拟
-                const mockCode = Math.floor(100000 + Math.random() * 900000).toString();
-                setTwoFACode({ id, code: mockCode, expiry: 30 });
-                showNotification('2FA 验证码已刷新（模拟）');
-            }
-        } catch (error) {
-            // 后端不可用时使用模拟
-            const mockCode = Math.floor(100000 + Math.random() * 900000).toString();
-            setTwoFACode({ id, code: mockCode, expiry: 30 });
-            showNotification('2FA 验证码已刷新');
+    const generate2FA = (id) => {
+        // 只显示后端推送的验证码，不在前端生成任何替代的验证码
+        const account = pagination.paginatedData.find(acc => acc.id === id);
+        if (!account || !account.secret) {
+            showNotification('该账号未配置 2FA 密钥', 'error');
+            return;
         }
+        setRevealedIds(prev => (prev.includes(id) ? prev : [...prev, id]));
     };
 
     const toggleStatus = async (id) => {
         try {
             const result = await api.toggleStatus(id);
             if (result.success) {
-                setAccounts(accounts.map(acc =>
-                    acc.id === id ? result.data : acc
-                ));
+                pagination.updateItem(result.data);
             }
         } catch (error) {
             console.error('切换状态失败:', error);
@@ -157,9 +189,12 @@ const App = () => {
         try {
             const result = await api.toggleSoldStatus(id);
             if (result.success) {
-                setAccounts(accounts.map(acc =>
-                    acc.id === id ? result.data : acc
-                ));
+                // 按出售状态筛选时该账号已不属于当前列表，重新加载当前页
+                if (soldFilter === 'all') {
+                    pagination.updateItem(result.data);
+                } else {
+                    pagination.reload();
+                }
                 const status = result.data.soldStatus === 'sold' ? '已售出' : '未售出';
                 showNotification(`账号已标记为${status}`);
             }
@@ -174,7 +209,7 @@ const App = () => {
         try {
             const result = await api.deleteAccount(deletingId);
             if (result.success) {
-                setAccounts(accounts.filter(acc => acc.id !== deletingId));
+                pagination.reload();
                 showNotification('账号已删除', 'error');
             }
         } catch (error) {
@@ -198,9 +233,7 @@ const App = () => {
         try {
             const result = await api.updateAccount(editingAccount.id, updated);
             if (result.success) {
-                setAccounts(accounts.map(acc =>
-                    acc.id === editingAccount.id ? result.data : acc
-                ));
+                pagination.updateItem(result.data);
                 showNotification('账号信息已更新');
             } else {
                 showNotification(result.message || '更新失败', 'error');
@@ -217,7 +250,7 @@ const App = () => {
             const result = await api.batchImport(importedList);
             if (result.success) {
                 // 重新加载账号列表
-                await loadAccounts();
+                pagination.reload();
                 setView('list');
 
                 // 显示导入结果
@@ -242,13 +275,6 @@ const App = () => {
         }
     };
 
-    const filteredAccounts = useMemo(() => {
-        return accounts.filter(acc =>
-            acc.email.toLowerCase().includes(search.toLowerCase()) ||
-            (acc.remark && acc.remark.toLowerCase().includes(search.toLowerCase()))
-        );
-    }, [accounts, search]);
-
     const globalFontStyle = {
         fontFamily: '"Times New Roman", Times, serif',
     };
@@ -326,17 +352,19 @@ const App = () => {
             <main className="max-w-[1600px] mx-auto px-4 py-8">
                 {view === 'list' ? (
                     <AccountListView
-                        accounts={filteredAccounts}
+                        pagination={pagination}
                         search={search}
                         setSearch={setSearch}
+                        soldFilter={soldFilter}
+                        setSoldFilter={setSoldFilter}
                         copyToClipboard={copyToClipboard}
                         generate2FA={generate2FA}
-                        twoFACode={twoFACode}
+                        revealedIds={revealedIds}
+                        twoFA={twoFA}
                         toggleStatus={toggleStatus}
                         toggleSoldStatus={toggleSoldStatus}
                         onEdit={setEditingAccount}
                         onDelete={setDeletingId}
-                        loading={loading}
                         darkMode={darkMode}
                     />
                 ) : (
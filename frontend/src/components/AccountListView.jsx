@@ -1,4 +1,4 @@
-import React, { useState, useMemo } from 'react';
+import React, { useState } from 'react';
 import {
     Search,
     Mail,
@@ -15,38 +15,33 @@ import {
 } from 'lucide-react';
 import ActionButton from './ActionButton';
 import Pagination from './Pagination';
-import usePagination from '../hooks/usePagination';
 import HistoryDrawer from './HistoryDrawer';
 
 /**
  * 账号列表视图组件
+ * 账号由 pagination（usePagination 返回值）按页从后端加载，搜索和出售状态筛选在后端完成
  */
 const AccountListView = ({
-    accounts,
+    pagination,
     search,
     setSearch,
+    soldFilter,
+    setSoldFilter,
     copyToClipboard,
     generate2FA,
-    twoFACode,
+    revealedIds,
+    twoFA,
     toggleStatus,
     toggleSoldStatus,
     onEdit,
     onDelete,
-    loading,
     onSearchChange,
     darkMode
 }) => {
-    // 筛选状态: 'all' | 'sold' | 'unsold'
-    const [soldFilter, setSoldFilter] = useState('all');
+    const { loading } = pagination;
 
-    // 根据筛选过滤账号
-    const filteredAccounts = useMemo(() => {
-        if (soldFilter === 'all') return accounts;
-        return accounts.filter(acc => acc.soldStatus === soldFilter);
-    }, [accounts, soldFilter]);
-
-    // 使用分页 Hook
-    const pagination = usePagination(filteredAccounts, 10);
+    // 当前筛选条件下的总数只显示在选中的筛选按钮上
+    const filterCount = (filter) => (soldFilter === filter && !loading ? ` (${pagination.totalItems})` : '');
 
     // 历史抽屉状态
     const [historyDrawer, setHistoryDrawer] = useState({ isOpen: false, account: null });
@@ -117,7 +112,7 @@ const AccountListView = ({
                                 ? (darkMode ? 'bg-slate-600 text-white shadow' : 'bg-white text-slate-800 shadow')
                                 : (darkMode ? 'text-slate-400 hover:text-slate-200' : 'text-slate-500 hover:text-slate-700')}`}
                         >
-                            全部 ({accounts.length})
+                            全部{filterCount('all')}
                         </button>
                         <button
                             onClick={() => { setSoldFilter('unsold'); pagination.resetPage(); }}
@@ -125,7 +120,7 @@ const AccountListView = ({
                                 ? 'bg-green-500 text-white shadow'
                                 : (darkMode ? 'text-green-400 hover:bg-green-900/30' : 'text-green-600 hover:bg-green-50')}`}
                         >
-                            未售出 ({accounts.filter(a => a.soldStatus !== 'sold').length})
+                            未售出{filterCount('unsold')}
                         </button>
                         <button
                             onClick={() => { setSoldFilter('sold'); pagination.resetPage(); }}
@@ -133,7 +128,7 @@ const AccountListView = ({
                                 ? 'bg-red-500 text-white shadow'
                                 : (darkMode ? 'text-red-400 hover:bg-red-900/30' : 'text-red-600 hover:bg-red-50')}`}
                         >
-                            已售出 ({accounts.filter(a => a.soldStatus === 'sold').length})
+                            已售出{filterCount('sold')}
                         </button>
                     </div>
                 </div>
@@ -211,18 +206,18 @@ const AccountListView = ({
                                         {/* 2FA 验证 - 点击复制 */}
                                         <td className="px-4 py-4">
                                             <div className="w-[100px] h-10 flex flex-col justify-center">
-                                                {twoFACode.id === acc.id ? (
+                                                {revealedIds.includes(acc.id) && twoFA.codes[acc.id] ? (
                                                     <div className="flex flex-col gap-1 w-full animate-in zoom-in-95">
                                                         <div
-                                                            onClick={() => copyToClipboard(twoFACode.code, '2FA验证码')}
+                                                            onClick={() => copyToClipboard(twoFA.codes[acc.id], '2FA验证码')}
                                                             className="flex items-center justify-between bg-blue-50 text-blue-700 px-2 py-1 rounded-lg border border-blue-100 cursor-pointer hover:bg-blue-100 transition-all"
                                                             title="点击复制2FA验证码">
-                                                            <span className="font-bold tracking-widest text-base">{twoFACode.code}</span>
-                                                            <span className="text-[10px] font-bold tabular-nums opacity-60">{twoFACode.expiry}s</span>
+                                                            <span className="font-bold tracking-widest text-base">{twoFA.codes[acc.id]}</span>
+                                                            <span className="text-[10px] font-bold tabular-nums opacity-60">{twoFA.expiry}s</span>
                                                         </div>
                                                         <div className="h-1 bg-blue-100 rounded-full overflow-hidden">
                                                             <div className="h-full bg-blue-500 transition-all duration-1000 ease-linear"
-                                                                style={{ width: `${(twoFACode.expiry / 30) * 100}%` }}></div>
+                                                                style={{ width: `${(twoFA.expiry / 30) * 100}%` }}></div>
                                                         </div>
                                                     </div>
                                                 ) : (
@@ -242,7 +237,7 @@ const AccountListView = ({
                                                         copyToClipboard(acc.recovery, '恢复邮箱')} />
                                                 </div>
 
-                                                <button onClick={() => generate2FA(acc.id, acc.secret)}
+                                                <button onClick={() => generate2FA(acc.id)}
                                                     className={`p-1.5 rounded-lg transition-all shadow-sm ${darkMode
                                                         ? 'bg-blue-900/50 text-blue-300 hover:bg-blue-500 hover:text-white border border-blue-700/50'
                                                         : 'bg-blue-50 text-blue-600 hover:bg-blue-600 hover:text-white'}`}
@@ -316,7 +311,7 @@ const AccountListView = ({
                     </div>
 
                     {/* 分页组件 */}
-                    {!loading && accounts.length > 0 && (
+                    {!loading && pagination.totalItems > 0 && (
                         <Pagination
                             currentPage={pagination.currentPage}
                             totalPages={pagination.totalPages}
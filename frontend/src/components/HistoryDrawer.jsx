@@ -2,6 +2,9 @@ import React, { useState, useEffect } from 'react';
 import { X, Clock, Key, Mail, Shield, History, ArrowRight, ChevronDown, ChevronUp } from 'lucide-react';
 import api from '../services/api';
 
+// 每次加载的历史记录条数
+const HISTORY_PAGE_SIZE = 100;
+
 /**
  * 历史记录抽屉组件
  * 显示账号的修改历史
@@ -9,6 +12,8 @@ import api from '../services/api';
 const HistoryDrawer = ({ isOpen, onClose, account, darkMode }) => {
     const [history, setHistory] = useState([]);
     const [loading, setLoading] = useState(false);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [expandedFields, setExpandedFields] = useState({});
 
     // 字段名称映射
@@ -36,9 +41,10 @@ const HistoryDrawer = ({ isOpen, onClose, account, darkMode }) => {
     const loadHistory = async () => {
         setLoading(true);
         try {
-            const result = await api.getAccountHistory(account.id);
+            const result = await api.getAccountHistory(account.id, { limit: HISTORY_PAGE_SIZE });
             if (result.success) {
-                setHistory(result.data);
+                setHistory(result.data.items);
+                setNextCursor(result.data.nextCursor);
             }
         } catch (err) {
             console.error('加载历史记录失败:', err);
@@ -47,6 +53,23 @@ const HistoryDrawer = ({ isOpen, onClose, account, darkMode }) => {
         }
     };
 
+    // 加载下一页历史记录
+    const loadMore = async () => {
+        if (!nextCursor) return;
+        setLoadingMore(true);
+        try {
+            const result = await api.getAccountHistory(account.id, { cursor: nextCursor, limit: HISTORY_PAGE_SIZE });
+            if (result.success) {
+                setHistory(prev => [...prev, ...result.data.items]);
+                setNextCursor(result.data.nextCursor);
+            }
+        } catch (err) {
+            console.error('加载历史记录失败:', err);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     // 切换字段展开状态
     const toggleField = (field) => {
         setExpandedFields(prev => ({ ...prev, [field]: !prev[field] }));
@@ -219,6 +242,17 @@ const HistoryDrawer = ({ isOpen, onClose, account, darkMode }) => {
                                     </div>
                                 );
                             })}
+
+                            {/* 加载更多 */}
+                            {nextCursor && (
+                                <button
+                                    onClick={loadMore}
+                                    disabled={loadingMore}
+                                    className={`w-full py-3 rounded-xl text-sm font-bold transition-colors disabled:opacity-50 ${darkMode ? 'bg-slate-700 text-slate-300 hover:bg-slate-600' : 'bg-slate-100 text-slate-600 hover:bg-slate-200'}`}
+                                >
+                                    {loadingMore ? '加载中...' : '加载更早的记录'}
+                                </button>
+                            )}
                         </div>
                     )}
                 </div>
@@ -226,7 +260,7 @@ const HistoryDrawer = ({ isOpen, onClose, account, darkMode }) => {
                 {/* 底部信息 */}
                 <div className={`absolute bottom-0 left-0 right-0 p-4 ${darkMode ? 'bg-slate-800/80 border-t border-slate-700' : 'bg-white/80 border-t border-slate-100'} backdrop-blur-sm`}>
                     <p className={`text-xs text-center ${darkMode ? 'text-slate-500' : 'text-slate-400'}`}>
-                        共 {history.length} 条修改记录
+                        {nextCursor ? `已加载 ${history.length} 条修改记录` : `共 ${history.length} 条修改记录`}
                     </p>
                 </div>
             </div>
@@ -1,33 +1,95 @@
-import { useState, useMemo } from 'react';
+import { useState, useEffect, useRef } from 'react';
 
 /**
- * 分页逻辑 Hook
- * @param {Array} data - 数据数组
+ * 游标分页 Hook：按需向后端请求当前页
+ * 已加载的页及每页的请求游标缓存在内存中，翻回已看过的页不再请求；
+ * 键集分页无法直接跳页，跳到尚未加载的页时从最近一个已知游标依次请求
+ * @param {Function} fetchPage - 请求一页数据，参数为 { ...filters, cursor, limit, with_total }，返回 { items, nextCursor, total }
+ * @param {Object} filters - 筛选条件，变化时清空缓存并回到第一页
  * @param {number} initialPageSize - 初始每页条数，默认10
+ * @param {boolean} enabled - 是否允许请求（如未登录时为 false）
  * @returns {Object} 分页状态和方法
  */
-const usePagination = (data, initialPageSize = 10) => {
+const usePagination = (fetchPage, filters = {}, initialPageSize = 10, enabled = true) => {
     const [currentPage, setCurrentPage] = useState(1);
     const [pageSize, setPageSize] = useState(initialPageSize);
+    const [paginatedData, setPaginatedData] = useState([]);
+    const [totalItems, setTotalItems] = useState(0);
+    const [loading, setLoading] = useState(false);
+    const [error, setError] = useState(null);
+    const [version, setVersion] = useState(0);
 
-    // 计算总页数
-    const totalPages = useMemo(() => {
-        return Math.max(1, Math.ceil(data.length / pageSize));
-    }, [data.length, pageSize]);
+    // 缓存：base 为筛选条件和每页条数，pages 为页码 -> 数据，cursors 为页码 -> 请求游标
+    const cache = useRef({ key: null, base: null, pages: {}, cursors: { 1: '' } });
+    const base = `${JSON.stringify(filters)}|${pageSize}`;
+    const cacheKey = `${base}|${version}`;
 
-    // 当数据或每页条数变化时，确保当前页有效
-    useMemo(() => {
-        if (currentPage > totalPages) {
-            setCurrentPage(Math.max(1, totalPages));
+    useEffect(() => {
+        if (!enabled) {
+            cache.current.key = null;
+            return undefined;
+        }
+        if (cache.current.key !== cacheKey) {
+            const filtersChanged = cache.current.base !== base;
+            cache.current = { key: cacheKey, base, pages: {}, cursors: { 1: '' } };
+            // 筛选条件或每页条数变化时回到第一页；reload 保持当前页
+            if (filtersChanged && currentPage !== 1) {
+                setCurrentPage(1);
+                return undefined;
+            }
         }
-    }, [totalPages, currentPage]);
 
-    // 获取当前页的数据
-    const paginatedData = useMemo(() => {
-        const startIndex = (currentPage - 1) * pageSize;
-        const endIndex = startIndex + pageSize;
-        return data.slice(startIndex, endIndex);
-    }, [data, currentPage, pageSize]);
+        const { pages, cursors } = cache.current;
+        if (pages[currentPage]) {
+            setPaginatedData(pages[currentPage]);
+            return undefined;
+        }
+
+        let cancelled = false;
+        const load = async () => {
+            setLoading(true);
+            setError(null);
+            try {
+                let page = currentPage;
+                while (cursors[page] === undefined) page -= 1;
+                for (; page <= currentPage; page++) {
+                    if (!pages[page]) {
+                        const data = await fetchPage({
+                            ...filters,
+                            cursor: cursors[page],
+                            limit: pageSize,
+                            ...(page === 1 ? { with_total: 1 } : {})
+                        });
+                        if (cancelled) return;
+                        pages[page] = data.items;
+                        if (page === 1) setTotalItems(data.total ?? data.items.length);
+                        if (data.nextCursor) cursors[page + 1] = data.nextCursor;
+                    }
+                    if (cursors[page + 1] === undefined) break;
+                }
+                if (pages[currentPage]) {
+                    setPaginatedData(pages[currentPage]);
+                } else {
+                    // 目标页已不存在（如删除后总数减少），停在最后一页
+                    setCurrentPage(Math.max(1, page));
+                }
+            } catch (err) {
+                if (!cancelled) {
+                    setPaginatedData([]);
+                    setError(err);
+                }
+            } finally {
+                if (!cancelled) setLoading(false);
+            }
+        };
+        load();
+        return () => {
+            cancelled = true;
+        };
+    }, [cacheKey, currentPage, enabled]);
+
+    // 计算总页数
+    const totalPages = Math.max(1, Math.ceil(totalItems / pageSize));
 
     // 跳转到指定页
     const goToPage = (page) => {
@@ -60,17 +122,35 @@ const usePagination = (data, initialPageSize = 10) => {
         setCurrentPage(1);
     };
 
+    // 清空缓存并重新加载当前页（用于删除、导入等改变列表的操作）
+    const reload = () => {
+        setVersion(prev => prev + 1);
+    };
+
+    // 原地替换已加载页中的一条记录（用于编辑、切换状态）
+    const updateItem = (item) => {
+        const { pages } = cache.current;
+        Object.keys(pages).forEach(page => {
+            pages[page] = pages[page].map(row => (row.id === item.id ? item : row));
+        });
+        setPaginatedData(prev => prev.map(row => (row.id === item.id ? item : row)));
+    };
+
     return {
         currentPage,
         pageSize,
         totalPages,
-        totalItems: data.length,
+        totalItems,
         paginatedData,
+        loading,
+        error,
         goToPage,
         nextPage,
         prevPage,
         changePageSize,
         resetPage,
+        reload,
+        updateItem,
         hasNextPage: currentPage < totalPages,
         hasPrevPage: currentPage > 1
     };
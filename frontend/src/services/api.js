@@ -120,6 +120,19 @@ const md5 = (string) => {
     return hex(md51(string));
 };
 
+// 登录失效时（令牌过期或服务端密钥变更）通知应用回到登录页的事件名
+export const AUTH_EXPIRED_EVENT = 'auth-expired';
+
+// 带登录校验的请求：令牌通过 HttpOnly Cookie 自动携带，收到 401 时清除本地登录状态
+const authFetch = async (url, options) => {
+    const res = await fetch(url, options);
+    if (res.status === 401) {
+        localStorage.removeItem('loginData');
+        window.dispatchEvent(new Event(AUTH_EXPIRED_EVENT));
+    }
+    return res;
+};
+
 const api = {
     // 登录验证（带盐值）
     async login(password) {
@@ -138,19 +151,18 @@ const api = {
         return await res.json();
     },
 
-    // 获取所有账号
-    async getAccounts(search = '') {
-        const url = search
-            ? `${API_BASE}/accounts?search=${encodeURIComponent(search)}`
-            : `${API_BASE}/accounts`;
-        const res = await fetch(url);
+    // 分页获取账号（键集分页，params 支持 search/sold_status/status/start_date/end_date/cursor/limit/with_total）
+    async getAccountsPage(params = {}) {
+        const query = new URLSearchParams({ limit: 50, ...params });
+        const res = await authFetch(`${API_BASE}/accounts?${query}`);
         const data = await res.json();
-        return data.success ? data.data : [];
+        if (!data.success) throw new Error(data.message || '加载账号失败');
+        return data.data;
     },
 
     // 批量导入账号
     async batchImport(accounts) {
-        const res = await fetch(`${API_BASE}/accounts/batch`, {
+        const res = await authFetch(`${API_BASE}/accounts/batch`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ accounts })
@@ -160,7 +172,7 @@ const api = {
 
     // 更新账号
     async updateAccount(id, data) {
-        const res = await fetch(`${API_BASE}/accounts/${id}`, {
+        const res = await authFetch(`${API_BASE}/accounts/${id}`, {
             method: 'PUT',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify(data)
@@ -170,7 +182,7 @@ const api = {
 
     // 删除账号
     async deleteAccount(id) {
-        const res = await fetch(`${API_BASE}/accounts/${id}`, {
+        const res = await authFetch(`${API_BASE}/accounts/${id}`, {
             method: 'DELETE'
         });
         return await res.json();
@@ -178,7 +190,7 @@ const api = {
 
     // 切换状态
     async toggleStatus(id) {
-        const res = await fetch(`${API_BASE}/accounts/${id}/status`, {
+        const res = await authFetch(`${API_BASE}/accounts/${id}/status`, {
             method: 'PATCH'
         });
         return await res.json();
@@ -186,21 +198,35 @@ const api = {
 
     // 切换出售状态
     async toggleSoldStatus(id) {
-        const res = await fetch(`${API_BASE}/accounts/${id}/sold`, {
+        const res = await authFetch(`${API_BASE}/accounts/${id}/sold`, {
             method: 'PATCH'
         });
         return await res.json();
     },
 
-    // 获取 2FA 验证码
-    async get2FACode(id) {
-        const res = await fetch(`${API_BASE}/accounts/${id}/2fa`);
-        return await res.json();
+    // 订阅 2FA 验证码推送：连接后立即回调一次，之后每个 30 秒窗口开始时回调；返回 EventSource，调用 close() 取消订阅
+    // 登录令牌到期时服务端发送 expired 事件后断开，按 401 处理；连接被拒绝（浏览器不再重连）时调用 onClosed
+    subscribe2FACodes(ids, onCodes, onClosed) {
+        const source = new EventSource(`${API_BASE}/accounts/2fa/stream?ids=${ids.join(',')}`);
+        source.addEventListener('codes', (event) => onCodes(JSON.parse(event.data)));
+        source.addEventListener('expired', () => {
+            source.close();
+            localStorage.removeItem('loginData');
+            window.dispatchEvent(new Event(AUTH_EXPIRED_EVENT));
+        });
+        source.onerror = () => {
+            if (source.readyState === EventSource.CLOSED && onClosed) onClosed();
+        };
+        return source;
     },
 
-    // 获取账号修改历史记录
-    async getAccountHistory(id) {
-        const res = await fetch(`${API_BASE}/accounts/${id}/history`);
+    // 获取账号修改历史记录（传入 { cursor, limit } 时按时间倒序分页返回 { items, nextCursor }）
+    async getAccountHistory(id, { cursor, limit } = {}) {
+        const params = new URLSearchParams();
+        if (cursor) params.append('cursor', cursor);
+        if (limit) params.append('limit', limit);
+        const query = params.toString();
+        const res = await authFetch(`${API_BASE}/accounts/${id}/history${query ? `?${query}` : ''}`);
         return await res.json();
     }
 };
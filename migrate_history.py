@@ -1,41 +1,13 @@
 """
-数据库迁移脚本 - 添加账号历史记录表
+数据库迁移脚本（兼容旧的部署方式）
+等同于 flask --app run migrate：按版本执行全部尚未执行的迁移，数据库路径读取应用配置
 """
-import sqlite3
-import os
+from app import create_app
+from app.migrations import current_version, upgrade
 
-# 数据库路径
-db_path = os.path.join(os.path.dirname(__file__), 'instance', 'accounts.db')
+app = create_app()
 
-print(f"数据库路径: {db_path}")
-
-# 连接数据库
-conn = sqlite3.connect(db_path)
-cursor = conn.cursor()
-
-# 检查表是否已存在
-cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='account_history'")
-if cursor.fetchone():
-    print("account_history 表已存在，无需迁移")
-else:
-    # 创建账号历史记录表
-    cursor.execute('''
-        CREATE TABLE account_history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            account_id INTEGER NOT NULL,
-            field_name VARCHAR(50) NOT NULL,
-            old_value TEXT,
-            new_value TEXT,
-            changed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (account_id) REFERENCES accounts(id)
-        )
-    ''')
-    
-    # 创建索引以加速查询
-    cursor.execute('CREATE INDEX idx_account_history_account_id ON account_history(account_id)')
-    cursor.execute('CREATE INDEX idx_account_history_changed_at ON account_history(changed_at)')
-    
-    conn.commit()
-    print("数据库迁移成功！account_history 表已创建")
-
-conn.close()
+with app.app_context():
+    print(f"数据库: {app.config['SQLALCHEMY_DATABASE_URI']}")
+    applied = upgrade(on_step=lambda step: print(f'执行迁移 {step.version}: {step.description}'))
+    print(f'数据库迁移完成，当前结构版本 {current_version()}（本次执行 {len(applied)} 步）')
@@ -2,17 +2,20 @@
 应用启动入口
 """
 import os
-from app import create_app
+from app import create_app, start_services
 
 # 确保实例目录存在
 instance_path = os.path.join(os.path.dirname(__file__), 'instance')
 if not os.path.exists(instance_path):
     os.makedirs(instance_path)
 
-# 创建应用实例
+# 创建应用实例（flask --app run 等命令行工具也导入此模块，这里不启动后台服务）
 app = create_app()
 
 if __name__ == '__main__':
+    # 调试模式的重载器会再启动一个子进程，只在实际处理请求的子进程中启动后台服务
+    if not app.debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_services(app)
     print('=' * 50)
     print('谷歌账号管理系统启动中...')
     print('访问地址: http://localhost:8002')